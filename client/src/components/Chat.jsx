@@ -1,12 +1,15 @@
 import React, { useState, useEffect, useRef, useCallback } from 'react';
 import { io } from 'socket.io-client';
+import axios from 'axios';
 import './Chat.css';
 
+const API_URL = 'http://127.0.0.1:5000/api';
 const SOCKET_URL = 'http://127.0.0.1:5000';
 
 const Chat = ({ boardId, authToken }) => {
     const [messages, setMessages] = useState([]);
     const [inputMessage, setInputMessage] = useState('');
+    const [nextCursor, setNextCursor] = useState(null);
     const socketRef = useRef(null);
     const messagesEndRef = useRef(null);
 
@@ -32,13 +35,34 @@ const Chat = ({ boardId, authToken }) => {
         }
     }, [inputMessage, boardId]);
 
+    // History comes newest-first, one page at a time; older pages are prepended
+    const loadHistory = useCallback(async (before = null) => {
+        try {
+            const response = await axios.get(`${API_URL}/boards/${boardId}/chat`, {
+                headers: { Authorization: `Bearer ${authToken}` },
+                params: before ? { before } : {},
+            });
+            const page = [...response.data.messages].reverse();
+            setMessages((prevMessages) => {
+                const seen = new Set(prevMessages.map(msg => msg.id));
+                const older = page.filter(msg => !seen.has(msg.id));
+                return [...older, ...prevMessages];
+            });
+            setNextCursor(response.data.next_cursor);
+        } catch (error) {
+            console.error('Failed to load chat history:', error);
+        }
+    }, [boardId, authToken]);
+
     const setupSocketConnection = useCallback(() => {
         if (!authToken || !boardId) {
             return;
         }
 
         const socket = io(SOCKET_URL, {
-            auth: { token: authToken }
+            auth: { token: authToken },
+            // Lets the load balancer pin every socket of a board to one worker
+            query: { board_id: boardId }
         });
         socketRef.current = socket;
 
@@ -52,6 +76,10 @@ const Chat = ({ boardId, authToken }) => {
             setMessages((prevMessages) => [...prevMessages, data]);
         });
 
+        socket.on('chat_error', (data) => {
+            console.error('Chat message rejected:', data.msg);
+        });
+
         socket.on('disconnect', () => {
             console.log('Chat socket disconnected.');
         });
@@ -63,6 +91,13 @@ const Chat = ({ boardId, authToken }) => {
         };
     }, [boardId, authToken]);
 
+    useEffect(() => {
+        if (authToken && boardId) {
+            setMessages([]);
+            loadHistory();
+        }
+    }, [authToken, boardId, loadHistory]);
+
     useEffect(() => {
         const cleanup = setupSocketConnection();
         return cleanup;
@@ -76,8 +111,13 @@ const Chat = ({ boardId, authToken }) => {
         <div className="chat-container">
             <h3>Real-time Chat</h3>
             <div className="chat-messages">
+                {nextCursor && (
+                    <button type="button" className="load-older" onClick={() => loadHistory(nextCursor)}>
+                        Load older messages
+                    </button>
+                )}
                 {messages.map((msg, index) => (
-                    <div key={index} className="chat-message">
+                    <div key={msg.id ?? index} className="chat-message">
                         <strong>{msg.username}:</strong> {msg.message}
                     </div>
                 ))}
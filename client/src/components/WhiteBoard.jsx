@@ -17,59 +17,171 @@ const Whiteboard = ({ authToken }) => {
     const [message, setMessage] = useState('');
     const [drawingMode, setDrawingMode] = useState(null);
 
-    const syncChanges = useCallback(() => {
-        if (!socketRef.current) return;
+    const seqRef = useRef(0);
+    const applyQueueRef = useRef(Promise.resolve());
+    // True while the canvas holds only the objects in our viewport
+    const partialRef = useRef(false);
+
+    const ensureObjectId = (obj) => {
+        if (!obj.id) {
+            obj.id = crypto.randomUUID();
+        }
+        return obj.id;
+    };
+
+    const serializeObject = (obj) => {
+        const data = obj.toObject(['id']);
+        if (obj.group) {
+            // Objects inside an active selection are positioned relative to it
+            const { translateX, translateY, angle, scaleX, scaleY, skewX, skewY } =
+                fabric.util.qrDecompose(obj.calcTransformMatrix());
+            const origin = obj.translateToOriginPoint(
+                new fabric.Point(translateX, translateY), obj.originX, obj.originY
+            );
+            Object.assign(data, { left: origin.x, top: origin.y, angle, scaleX, scaleY, skewX, skewY });
+        }
+        return data;
+    };
+
+    // Visible region in canvas coordinates, sent as 'bbox' so the server
+    // only ships the objects we can see
+    const viewportBBox = () => {
         const canvas = fabricCanvasRef.current;
-        const canvasState = JSON.stringify(canvas.toJSON());
+        const [zoomX, , , zoomY, panX, panY] = canvas.viewportTransform;
+        const x0 = -panX / zoomX;
+        const y0 = -panY / zoomY;
+        return [x0, y0, x0 + canvas.getWidth() / zoomX, y0 + canvas.getHeight() / zoomY];
+    };
+
+    const sendOps = useCallback((ops) => {
+        if (!socketRef.current || ops.length === 0) return;
         socketRef.current.emit('whiteboard_update', {
             board_id: parseInt(boardId),
-            update_data: { canvasState }
+            ops
         });
     }, [boardId]);
 
+    const handleObjectAdded = useCallback(({ target }) => {
+        if (fabricCanvasRef.current.isRemoteUpdate) return;
+        const id = ensureObjectId(target);
+        sendOps([{ op: 'add', id, object: serializeObject(target) }]);
+    }, [sendOps]);
+
+    const handleObjectModified = useCallback(({ target }) => {
+        if (fabricCanvasRef.current.isRemoteUpdate) return;
+        const objects = target.type === 'activeselection' ? target.getObjects() : [target];
+        sendOps(objects.map(obj => ({ op: 'modify', id: ensureObjectId(obj), object: serializeObject(obj) })));
+    }, [sendOps]);
+
+    const handleObjectRemoved = useCallback(({ target }) => {
+        if (fabricCanvasRef.current.isRemoteUpdate || !target.id) return;
+        sendOps([{ op: 'remove', id: target.id }]);
+    }, [sendOps]);
+
+    const applyRemoteOps = async (ops) => {
+        const canvas = fabricCanvasRef.current;
+        if (!canvas) return;
+        const findObject = (id) => canvas.getObjects().find(obj => obj.id === id);
+
+        for (const op of ops) {
+            const existing = findObject(op.id);
+            if (op.op === 'add' && !existing) {
+                const [obj] = await fabric.util.enlivenObjects([op.object]);
+                canvas.isRemoteUpdate = true;
+                canvas.add(obj);
+                canvas.isRemoteUpdate = false;
+            } else if (op.op === 'modify' && !existing && op.object.type) {
+                // Full object we don't have, e.g. moved in from outside our viewport
+                const [obj] = await fabric.util.enlivenObjects([op.object]);
+                canvas.isRemoteUpdate = true;
+                canvas.add(obj);
+                canvas.isRemoteUpdate = false;
+            } else if (op.op !== 'remove' && existing) {
+                existing.set(op.object);
+                existing.setCoords();
+            } else if (op.op === 'remove' && existing) {
+                canvas.isRemoteUpdate = true;
+                canvas.remove(existing);
+                canvas.isRemoteUpdate = false;
+            }
+        }
+        canvas.requestRenderAll();
+    };
+
+    const loadFullState = async ({ seq, state, bbox, total }) => {
+        const canvas = fabricCanvasRef.current;
+        if (!canvas) return;
+        canvas.isRemoteUpdate = true;
+        await canvas.loadFromJSON(state);
+        canvas.renderAll();
+        canvas.isRemoteUpdate = false;
+        seqRef.current = seq;
+        partialRef.current = Boolean(bbox) && total > state.objects.length;
+    };
+
     const setupSocketConnection = useCallback(() => {
         socketRef.current = io(SOCKET_URL, {
-            auth: { token: authToken }
+            auth: { token: authToken },
+            // Lets the load balancer pin every socket of a board to one worker
+            query: { board_id: boardId }
         });
         socketRef.current.on('connect', () => {
             console.log('Connected to WebSocket!');
-            socketRef.current.emit('join', { board_id: parseInt(boardId) });
+            // Joining delivers the canvas as 'whiteboard_state', cut down to our viewport
+            socketRef.current.emit('join', { board_id: parseInt(boardId), bbox: viewportBBox() });
+        });
+        socketRef.current.on('whiteboard_state', (data) => {
+            applyQueueRef.current = applyQueueRef.current.then(() => loadFullState(data));
+        });
+        socketRef.current.on('whiteboard_ops', (data) => {
+            applyQueueRef.current = applyQueueRef.current.then(() => {
+                if (data.seq <= seqRef.current) return;
+                if (data.from_seq > seqRef.current + 1) {
+                    // We missed a frame; ask for the full canvas instead of guessing
+                    socketRef.current.emit('whiteboard_resync', { board_id: parseInt(boardId), bbox: viewportBBox() });
+                    return;
+                }
+                seqRef.current = data.seq;
+                // Frames merge ops from several clients; skip only the ones we sent
+                const ops = data.ops.filter(op => op.origin !== socketRef.current.id);
+                return applyRemoteOps(ops);
+            });
+        });
+        socketRef.current.on('whiteboard_error', (data) => {
+            console.error('Whiteboard update rejected:', data.msg);
+        });
+        socketRef.current.on('slow_down', (data) => {
+            // The server merges our edits while we're over the limit; if it had to
+            // drop them, our canvas no longer matches and needs the server's copy
+            if (data.event === 'whiteboard_update' && data.resync) {
+                socketRef.current.emit('whiteboard_resync', { board_id: parseInt(boardId), bbox: viewportBBox() });
+            } else {
+                console.warn(`Sending ${data.event} too fast; retry in ${data.retry_after_ms}ms`);
+            }
         });
-        socketRef.current.on('whiteboard_update', (data) => {
-        const canvas = fabricCanvasRef.current;
-        // Use a flag to prevent re-triggering 'object:added' when loading remote data
-        canvas.isRemoteUpdate = true; 
-        canvas.loadFromJSON(data.canvasState, () => {
-        canvas.renderAll();
-        canvas.isRemoteUpdate = false;
-    });
-});
         socketRef.current.on('disconnect', () => {
             console.log('Disconnected from WebSocket.');
         });
     }, [boardId, authToken]);
 
-    const loadWhiteboardState = useCallback(async () => {
-        try {
-            const response = await axios.get(`${API_URL}/boards/${boardId}`, {
-                headers: { Authorization: `Bearer ${authToken}` }
-            });
-            const boardData = response.data.whiteboard_data;
-
-            if (boardData && boardData.length > 0) {
-                fabricCanvasRef.current.loadFromJSON(boardData, () => {
-                    fabricCanvasRef.current.renderAll();
-                });
-            }
-        } catch (error) {
-            setMessage('Failed to load whiteboard.');
-            console.error('Error loading whiteboard:', error);
-        }
-    }, [boardId, authToken]);
+    // Canvas JSON for a full save. With only our viewport loaded, the objects
+    // outside it come from the server's copy so the save doesn't drop them.
+    const fullCanvasState = async () => {
+        const state = fabricCanvasRef.current.toObject(['id']);
+        if (!partialRef.current) return state;
+        const response = await axios.get(`${API_URL}/boards/${boardId}/whiteboard`, {
+            headers: { Authorization: `Bearer ${authToken}` }
+        });
+        const local = new Map(state.objects.map(obj => [obj.id, obj]));
+        const objects = response.data.state.objects.map(obj => local.get(obj.id) || obj);
+        const known = new Set(objects.map(obj => obj.id));
+        objects.push(...state.objects.filter(obj => !known.has(obj.id)));
+        return { ...state, objects };
+    };
 
     const saveWhiteboardState = async () => {
         try {
-            const canvasState = JSON.stringify(fabricCanvasRef.current.toJSON());
+            const canvasState = JSON.stringify(await fullCanvasState());
             await axios.put(
                 `${API_URL}/boards/${boardId}/whiteboard`,
                 { whiteboard_state: canvasState },
@@ -125,14 +237,21 @@ const Whiteboard = ({ authToken }) => {
                 padding: 10,
             });
             fabricCanvasRef.current.add(note);
-            syncChanges();
         }
     };
 
     const clearCanvas = () => {
         if (fabricCanvasRef.current) {
+            // clear() fires 'object:removed' for each object, which sends the remove ops
             fabricCanvasRef.current.clear();
-            syncChanges();
+            if (partialRef.current) {
+                // Objects outside our viewport were never loaded; save an empty canvas
+                axios.put(
+                    `${API_URL}/boards/${boardId}/whiteboard`,
+                    { whiteboard_state: JSON.stringify(fabricCanvasRef.current.toObject(['id'])) },
+                    { headers: { Authorization: `Bearer ${authToken}` } }
+                ).catch(error => console.error('Error clearing whiteboard:', error));
+            }
         }
     };
 
@@ -151,8 +270,6 @@ const deleteSelectedObjects = () => {
 
         canvas.discardActiveObject();
         canvas.renderAll();
-        
-        syncChanges();
     }
 };
 
@@ -164,11 +281,11 @@ useEffect(() => {
         const canvas = new fabric.Canvas(canvasRef.current);
         fabricCanvasRef.current = canvas;
 
-        loadWhiteboardState();
         setupSocketConnection();
 
-        canvas.on('object:modified', syncChanges);
-        canvas.on('object:added', syncChanges);
+        canvas.on('object:modified', handleObjectModified);
+        canvas.on('object:added', handleObjectAdded);
+        canvas.on('object:removed', handleObjectRemoved);
 
         // This return function will now correctly clean up the canvas and socket
         return () => {
@@ -180,7 +297,7 @@ useEffect(() => {
             }
         };
     }
-}, [boardId, authToken, loadWhiteboardState, setupSocketConnection, syncChanges]);
+}, [boardId, authToken, setupSocketConnection, handleObjectAdded, handleObjectModified, handleObjectRemoved]);
    return (
     <div className="whiteboard-page-container">
         <div className="whiteboard-container">
@@ -1,11 +1,19 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token
 from extensions import db
 from models import User
+from password_hasher import password_hasher, PasswordHasherBusy
+from user_search import user_search
 
 auth_bp = Blueprint('auth', __name__)
 
+@auth_bp.errorhandler(PasswordHasherBusy)
+def hasher_busy(e):
+    # Too many hashes already queued; the client should back off and retry
+    response = jsonify({"msg": "Server busy, please try again"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -14,16 +22,23 @@ def register():
         return jsonify({"msg": "Missing credentials"}), 400
     if User.query.filter_by(email=email).first():
         return jsonify({"msg": "User already exists"}), 409
-    
-    new_user = User(username=username, email=email, password_hash=generate_password_hash(password))
+
+    new_user = User(username=username, email=email, password_hash=password_hasher.hash(password))
     db.session.add(new_user)
     db.session.commit()
+    user_search.clear()
     return jsonify({"msg": "User created successfully"}), 201
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
     data = request.get_json()
+    password = data.get('password')
     user = User.query.filter_by(email=data.get('email')).first()
-    if user and check_password_hash(user.password_hash, data.get('password')):
+    if user and password and password_hasher.verify(user.password_hash, password):
+        # Upgrade hashes made with an older PASSWORD_HASH_METHOD while we have the plaintext
+        if password_hasher.needs_rehash(user.password_hash):
+            user.password_hash = password_hasher.hash(password)
+            db.session.commit()
+            password_hasher.rehashed += 1
         return jsonify(access_token=create_access_token(identity=str(user.id)), username=user.username), 200
-    return jsonify({"msg": "Bad credentials"}), 401
\ No newline at end of file
+    return jsonify({"msg": "Bad credentials"}), 401
@@ -1,10 +1,36 @@
-from flask import Blueprint, request, jsonify
+import json
+from datetime import timezone
+from flask import Blueprint, current_app, request, jsonify, make_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from flask_mail import Message
-from extensions import db, mail, serializer
-from models import Board, BoardMember, User, Task
+from itsdangerous import BadSignature, SignatureExpired
+from sqlalchemy import insert
+from extensions import db, serializer, socketio
+from models import Board, BoardMember, User
+from membership_cache import member_cache
+from whiteboard_sync import documents
+from whiteboard_index import parse_bbox
+from whiteboard_store import store
+from whiteboard_fanout import fanout
+from board_changes import board_changes
+from mail_queue import mail_queue
+from db_profile import db_profile
+from serialization import MembershipDTO, select_tasks, select_members, select_memberships
 
 boards_bp = Blueprint('boards', __name__)
+invites_bp = Blueprint('invites', __name__)
+
+INVITE_MAX_AGE = 7 * 24 * 3600
+
+# Fields GET /api/boards can return; clients opt into extras with ?fields=
+BOARD_LIST_FIELDS = {
+    "id": Board.id,
+    "name": Board.name,
+    "owner_id": Board.owner_id,
+    "created_at": Board.created_at,
+    "updated_at": Board.updated_at,
+    "whiteboard_data": Board.whiteboard_data,
+}
+BOARD_LIST_DEFAULT_FIELDS = ["id", "name", "owner_id"]
 
 # Note: The url_prefix='/api/boards' is handled in app.py registration
 
@@ -23,35 +49,65 @@ def create_board():
     db.session.add(new_board)
     db.session.flush() # Gets the board ID before commit
     
-    # Add owner as first member
-    owner_member = BoardMember(board_id=new_board.id, user_id=user_id, role='owner', status='member')
-    db.session.add(owner_member)
-    
-    # Add other initial members if any
+    # Add other initial members if any (one lookup for all requested ids)
+    requested_ids = []
     for member_id in member_ids:
-        if User.query.get(member_id):
-            new_member = BoardMember(board_id=new_board.id, user_id=member_id, role='member', status='member')
-            db.session.add(new_member)
-            
+        try:
+            requested_ids.append(int(member_id))
+        except (TypeError, ValueError):
+            continue
+    existing_ids = set()
+    if requested_ids:
+        existing_ids = {row.id for row in db.session.query(User.id).filter(User.id.in_(requested_ids))}
+
+    # Owner first, then the others; inserted as one executemany
+    member_rows = [{"board_id": new_board.id, "user_id": user_id, "role": 'owner', "status": 'member'}]
+    for member_id in requested_ids:
+        if member_id in existing_ids:
+            member_rows.append({"board_id": new_board.id, "user_id": member_id, "role": 'member', "status": 'member'})
+    db.session.execute(insert(BoardMember), member_rows)
+
+    board_id, board_name = new_board.id, new_board.name
+    board_changes.record(board_id, 'members_added', {
+        'members': [MembershipDTO(row['user_id'], row['role'], row['status']).to_dict() for row in member_rows]
+    })
     db.session.commit()
-    return jsonify({"msg": "Board created successfully", "board_id": new_board.id, "board_name": new_board.name}), 201
+    for row in member_rows:
+        member_cache.invalidate(board_id, row["user_id"])
+    return jsonify({"msg": "Board created successfully", "board_id": board_id, "board_name": board_name}), 201
 
 
 @boards_bp.route('', methods=['GET'])
 @jwt_required()
 def get_boards():
     user_id = int(get_jwt_identity())
-    memberships = BoardMember.query.filter_by(user_id=user_id).all()
+
+    # Summary fields by default; e.g. ?fields=id,name,whiteboard_data for more
+    fields = BOARD_LIST_DEFAULT_FIELDS
+    if request.args.get('fields'):
+        fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in BOARD_LIST_FIELDS]
+        if unknown:
+            return jsonify({"msg": f"Unknown fields: {', '.join(unknown)}"}), 400
+        if 'id' not in fields:
+            fields = ['id'] + fields
+
+    # Single query for all boards the user has a membership row for, selecting only the requested columns
+    # Read-only, so it may be served by the replica
+    member_board_ids = db.select(BoardMember.board_id).where(BoardMember.user_id == user_id)
+    rows = db.session.execute(
+        db.select(*[BOARD_LIST_FIELDS[f].label(f) for f in fields]).where(
+            Board.id.in_(member_board_ids)
+        ).order_by(Board.id),
+        bind_arguments=db_profile.read_options()
+    ).all()
     boards = []
-    for member in memberships:
-        board = Board.query.get(member.board_id)
-        if board:
-            boards.append({
-                "id": board.id,
-                "name": board.name,
-                "owner_id": board.owner_id,
-                "whiteboard_data": board.whiteboard_data,
-            })
+    for row in rows:
+        board = {}
+        for field in fields:
+            value = getattr(row, field)
+            board[field] = value.isoformat() if hasattr(value, 'isoformat') else value
+        boards.append(board)
     return jsonify(boards), 200
 
 
@@ -60,57 +116,128 @@ def get_boards():
 def get_board(board_id):
     user_id = int(get_jwt_identity())
     
-    is_member = BoardMember.query.filter_by(board_id=board_id, user_id=user_id).first()
+    is_member = member_cache.get(board_id, user_id)
     if not is_member:
         return jsonify({"msg": "You are not a member of this board"}), 403
         
-    board = Board.query.get(board_id)
+    board = Board.query.options(db.defer(Board.whiteboard_data)).filter_by(id=board_id).first()
     if not board:
         return jsonify({"msg": "Board not found"}), 404
 
-    tasks_data = []
-    # Assumes tasks_rel is defined in your Board model
-    for task in board.tasks_rel.all():
-        tasks_data.append({
-            "id": task.id,
-            "title": task.title,
-            "description": task.description,
-            "assignee_id": task.assignee_id,
-            "status": task.status,
-            "board_id": task.board_id
+    # Task changes bump board.revision; whiteboard edits advance the op log seq.
+    # Both are read from the database, so a 304 never loads the canvas.
+    whiteboard_seq, whiteboard_updated_at = board_changes.whiteboard_head(board_id, board.whiteboard_seq)
+    etag = f"{board.revision or 0}-{whiteboard_seq}"
+    last_modified = max(filter(None, [board.updated_at, board.created_at, whiteboard_updated_at]))
+    last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        not_modified = request.if_modified_since is not None and last_modified <= request.if_modified_since
+    if not_modified:
+        response = make_response('', 304)
+    else:
+        # Column-only rows straight into DTOs; no ORM entity per task
+        tasks_data = select_tasks(board_id)
+        document = documents.get(board_id, refresh=True)
+        # An edit logged since the query above is in the body, so tag it with that
+        etag = f"{board.revision or 0}-{document.seq}"
+
+        response = jsonify({
+            "id": board.id,
+            "name": board.name,
+            "owner_id": board.owner_id,
+            # Snapshot plus any ops not yet compacted into it
+            "whiteboard_data": current_app.json.dumps(document.snapshot()['state']),
+            "tasks": tasks_data,
+            # Cursor for GET /api/boards/<id>/changes?since=
+            "revision": board.revision or 0
         })
 
-    return jsonify({
-        "id": board.id,
-        "name": board.name,
-        "owner_id": board.owner_id,
-        "whiteboard_data": board.whiteboard_data,
-        "tasks": tasks_data 
-    }), 200
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # Let browsers keep the body but revalidate on every request
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 @boards_bp.route('/<int:board_id>/members', methods=['GET'])
 @jwt_required()
 def get_board_members(board_id):
     user_id = int(get_jwt_identity())
-    is_member = BoardMember.query.filter_by(board_id=board_id, user_id=user_id).first()
+    is_member = member_cache.get(board_id, user_id)
     if not is_member:
         return jsonify({"msg": "You are not a member of this board"}), 403
         
-    memberships = BoardMember.query.filter_by(board_id=board_id).all()
-    members = []
-    for member in memberships:
-        user = User.query.get(member.user_id)
-        if user:
-            members.append({"id": user.id, "username": user.username, "role": member.role})
+    # Join instead of one User lookup per membership row; read-only, so it may be served by the replica
+    members = select_members(board_id, bind_arguments=db_profile.read_options())
     return jsonify(members), 200
 
 
+@boards_bp.route('/<int:board_id>/changes', methods=['GET'])
+@jwt_required()
+def get_board_changes(board_id):
+    user_id = int(get_jwt_identity())
+    is_member = member_cache.get(board_id, user_id)
+    if not is_member:
+        return jsonify({"msg": "You are not a member of this board"}), 403
+
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({"msg": "since must be an integer revision"}), 400
+    # Whiteboard edits have their own cursor, the document seq; without it
+    # only task and membership changes are returned
+    whiteboard_since = request.args.get('whiteboard_since')
+    if whiteboard_since is not None:
+        try:
+            whiteboard_since = int(whiteboard_since)
+        except ValueError:
+            return jsonify({"msg": "whiteboard_since must be an integer seq"}), 400
+
+    changes, whiteboard_changes, revision, whiteboard_seq = board_changes.since(board_id, since, whiteboard_since)
+    if changes is not None:
+        return jsonify({
+            "board_id": board_id,
+            "since": since,
+            "revision": revision,
+            "changes": changes,
+            "whiteboard_since": whiteboard_since,
+            "whiteboard_seq": whiteboard_seq,
+            "whiteboard_changes": whiteboard_changes
+        }), 200
+
+    # The log no longer reaches back to `since` (or the gap is too large to be
+    # worth replaying), so the client gets the whole board instead
+    board = Board.query.options(db.defer(Board.whiteboard_data)).filter_by(id=board_id).first()
+    if not board:
+        return jsonify({"msg": "Board not found"}), 404
+    tasks = select_tasks(board_id)
+    members = select_memberships(board_id)
+    # Read the revision before the document so the snapshot is at least that new
+    revision = board.revision or 0
+    document = documents.get(board_id, refresh=True)
+    whiteboard = document.snapshot()
+    return jsonify({
+        "board_id": board_id,
+        "since": since,
+        "revision": revision,
+        "whiteboard_since": whiteboard_since,
+        "whiteboard_seq": whiteboard['seq'],
+        "snapshot": {
+            "tasks": tasks,
+            "members": members,
+            "whiteboard": whiteboard
+        }
+    }), 200
+
+
 @boards_bp.route('/<int:board_id>/invite', methods=['POST'])
 @jwt_required()
 def invite_member(board_id):
     inviter_id = int(get_jwt_identity())
-    is_inviter_member = BoardMember.query.filter_by(board_id=board_id, user_id=inviter_id).first()
+    is_inviter_member = member_cache.get(board_id, inviter_id)
     
     if not is_inviter_member:
         return jsonify({"msg": "You are not a member of this board"}), 403
@@ -124,32 +251,70 @@ def invite_member(board_id):
     if not user:
         return jsonify({"msg": "User with this email does not exist."}), 404
 
-    if BoardMember.query.filter_by(board_id=board_id, user_id=user.id, status='member').first():
+    existing = member_cache.get(board_id, user.id)
+    if existing and existing.status == 'member':
         return jsonify({"msg": "User is already a member."}), 409
 
     token = serializer.dumps({'board_id': board_id, 'user_id': user.id})
     
     invite = BoardMember(board_id=board_id, user_id=user.id, invite_token=token, role='member', status='invited')
     db.session.add(invite)
-    db.session.commit()
+    board_changes.record(board_id, 'member_invited', MembershipDTO(user.id, 'member', 'invited').to_dict())
             
+    # Queued in the same transaction as the invite; mail_queue's worker sends it
     invite_url = f"http://localhost:5173/accept-invite/{token}"
-    msg = Message("Collabboard Invitation", recipients=[email])
-    msg.body = f"Hello {user.username}, you have been invited to a board on Collabboard. Click here to accept: {invite_url}"
-    
-    # mail.send(msg) # Uncomment when ready to send real emails
+    mail_queue.enqueue(
+        "Collabboard Invitation",
+        [email],
+        f"Hello {user.username}, you have been invited to a board on Collabboard. Click here to accept: {invite_url}"
+    )
+    db.session.commit()
+    member_cache.invalidate(board_id, user.id)
             
     return jsonify({"msg": "Invitation sent successfully."}), 200
 
 
+@boards_bp.route('/<int:board_id>/whiteboard', methods=['GET'])
+@jwt_required()
+def get_whiteboard(board_id):
+    user_id = int(get_jwt_identity())
+    is_member = member_cache.get(board_id, user_id)
+    if not is_member:
+        return jsonify({"msg": "You are not a member of this board"}), 403
+
+    # ?bbox=x0,y0,x1,y1 returns only the objects in that region (in canvas
+    # coordinates); without it the whole canvas. Tile counts cover the whole board.
+    bbox = None
+    if request.args.get('bbox'):
+        try:
+            bbox = parse_bbox(request.args['bbox'])
+        except ValueError as e:
+            return jsonify({"msg": str(e)}), 400
+
+    document = documents.get(board_id, refresh=True)
+    if not document:
+        return jsonify({"msg": "Board not found"}), 404
+    return jsonify(document.region(bbox, tiles=True)), 200
+
+
 @boards_bp.route('/<int:board_id>/whiteboard', methods=['PUT'])
 @jwt_required()
 def update_whiteboard(board_id):
     user_id = int(get_jwt_identity())
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     whiteboard_state = data.get('whiteboard_state')
+    # The canvas is stored and replayed as JSON text, so it has to be a JSON object
+    if isinstance(whiteboard_state, dict):
+        whiteboard_state = json.dumps(whiteboard_state)
+    elif whiteboard_state not in (None, ''):
+        try:
+            valid = isinstance(whiteboard_state, str) and isinstance(json.loads(whiteboard_state), dict)
+        except ValueError:
+            valid = False
+        if not valid:
+            return jsonify({"msg": "whiteboard_state must be a JSON object"}), 400
     
-    is_member = BoardMember.query.filter_by(board_id=board_id, user_id=user_id).first()
+    is_member = member_cache.get(board_id, user_id)
     if not is_member:
         return jsonify({"msg": "You are not a member of this board"}), 403
         
@@ -157,6 +322,38 @@ def update_whiteboard(board_id):
     if not board:
         return jsonify({"msg": "Board not found"}), 404
         
-    board.whiteboard_data = whiteboard_state
+    # The save is logged like any other edit; the compactor folds it into
+    # board.whiteboard_data on its next tick instead of rewriting the row here
+    document = documents.get(board_id)
+    seq = document.replace(whiteboard_state)
+    store.append(board_id, seq, whiteboard_state or '', user_id=user_id, kind='replace')
+    store.request_compaction(board_id)
+
+    # A save replaces the whole canvas, so live clients get a fresh full state
+    # and any ops still buffered for the room are superseded by it
+    fanout.discard(board_id)
+    socketio.emit('whiteboard_state', document.snapshot(), room=str(board_id))
+    return jsonify({"msg": "Whiteboard saved successfully"}), 200
+
+
+# Registered with url_prefix='/api/invites'; the link in the invite e-mail lands here
+@invites_bp.route('/<token>', methods=['GET'])
+def accept_invite(token):
+    try:
+        data = serializer.loads(token, max_age=INVITE_MAX_AGE)
+    except SignatureExpired:
+        return jsonify({"msg": "This invitation has expired."}), 400
+    except BadSignature:
+        return jsonify({"msg": "Invalid invitation link."}), 400
+
+    invite = BoardMember.query.filter_by(invite_token=token).first()
+    if not invite:
+        return jsonify({"msg": "Invitation not found or already used."}), 404
+
+    invite.status = 'member'
+    invite.invite_token = None
+    board_changes.record(invite.board_id, 'member_joined', MembershipDTO(invite.user_id, invite.role, 'member').to_dict())
     db.session.commit()
-    return jsonify({"msg": "Whiteboard saved successfully"}), 200
\ No newline at end of file
+    member_cache.invalidate(data['board_id'], data['user_id'])
+
+    return jsonify({"msg": "Invitation accepted. You are now a member of the board.", "board_id": invite.board_id}), 200
\ No newline at end of file
@@ -0,0 +1,85 @@
+import base64
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import tuple_
+from extensions import db
+from models import ChatMessage, User
+from membership_cache import member_cache
+from chat_archive import chat_archive
+
+chat_bp = Blueprint('chat', __name__)
+
+CHAT_PAGE_SIZE = 50
+CHAT_MAX_PAGE_SIZE = 200
+
+# Note: registered with url_prefix='/api/boards' next to the boards blueprint
+
+
+def encode_cursor(timestamp, message_id):
+    raw = f"{timestamp.isoformat()}|{message_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    timestamp, message_id = raw.split('|')
+    return datetime.fromisoformat(timestamp), int(message_id)
+
+
+# GET /api/boards/<board_id>/chat?before=<cursor>&limit=<n>
+@chat_bp.route('/<int:board_id>/chat', methods=['GET'])
+@jwt_required()
+def get_chat_history(board_id):
+    user_id = int(get_jwt_identity())
+    is_member = member_cache.get(board_id, user_id)
+    if not is_member:
+        return jsonify({"msg": "You are not a member of this board"}), 403
+
+    try:
+        limit = min(max(int(request.args.get('limit', CHAT_PAGE_SIZE)), 1), CHAT_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"msg": "limit must be an integer"}), 400
+
+    # Newest first. The (board_id, timestamp) index also orders by rowid (= id)
+    # on SQLite, so each page is a single index range scan however old it is.
+    query = db.session.query(
+        ChatMessage.id, ChatMessage.user_id, ChatMessage.message, ChatMessage.timestamp
+    ).filter(ChatMessage.board_id == board_id)
+
+    before = request.args.get('before')
+    cursor = None
+    if before:
+        try:
+            cursor = decode_cursor(before)
+        except (ValueError, UnicodeDecodeError):
+            return jsonify({"msg": "Invalid cursor"}), 400
+        query = query.filter(tuple_(ChatMessage.timestamp, ChatMessage.id) < cursor)
+
+    rows = query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        # Out of hot messages; older history continues in the archive (see chat_archive.py)
+        if rows:
+            cursor = (rows[-1].timestamp, rows[-1].id)
+        rows += chat_archive.history(board_id, cursor, limit + 1 - len(rows))
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # One lookup for every author on the page
+    author_ids = {row.user_id for row in rows}
+    usernames = {}
+    if author_ids:
+        usernames = dict(db.session.query(User.id, User.username).filter(User.id.in_(author_ids)).all())
+
+    messages = []
+    for row in rows:
+        messages.append({
+            "id": row.id,
+            "user_id": row.user_id,
+            "username": usernames.get(row.user_id, "Guest"),
+            "message": row.message,
+            "timestamp": row.timestamp.isoformat()
+        })
+
+    next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id) if has_more else None
+    return jsonify({"messages": messages, "next_cursor": next_cursor}), 200
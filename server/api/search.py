@@ -0,0 +1,81 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from extensions import db
+from models import User
+from membership_cache import member_cache
+import search
+
+search_bp = Blueprint('search', __name__)
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+# Matches considered per kind (newest first) before ranking; see search.SEARCH_SQL
+SEARCH_CANDIDATES = 200
+SEARCH_TYPES = {'all': ('tasks', 'messages'), 'tasks': ('tasks',), 'messages': ('messages',)}
+
+# Note: registered with url_prefix='/api/boards' next to the boards blueprint
+
+
+# GET /api/boards/<board_id>/search?q=<text>&type=all|tasks|messages&limit=<n>&offset=<n>&prefix=1
+# prefix=1 also matches a partially typed last word (search-as-you-type)
+# Messages are only searched within the hot window; archived chat (see chat_archive.py) isn't indexed
+@search_bp.route('/<int:board_id>/search', methods=['GET'])
+@jwt_required()
+def search_board(board_id):
+    user_id = int(get_jwt_identity())
+    is_member = member_cache.get(board_id, user_id)
+    if not is_member:
+        return jsonify({"msg": "You are not a member of this board"}), 403
+
+    q = (request.args.get('q') or '').strip()
+    if not q:
+        return jsonify({"msg": "q is required"}), 400
+    kinds = SEARCH_TYPES.get(request.args.get('type', 'all'))
+    if kinds is None:
+        return jsonify({"msg": "type must be one of: all, tasks, messages"}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({"msg": "limit and offset must be integers"}), 400
+    if offset >= SEARCH_CANDIDATES:
+        return jsonify({"msg": f"offset must be below {SEARCH_CANDIDATES}; refine the query instead"}), 400
+    if not search.available():
+        return jsonify({"msg": "Search is only available on SQLite (FTS5)"}), 501
+
+    # Best match first (bm25); snippets are HTML-escaped with matches wrapped in <mark>
+    prefix = request.args.get('prefix') in ('1', 'true')
+    rows, has_more = search.search(board_id, q, kinds, limit, offset, SEARCH_CANDIDATES, prefix)
+
+    # One lookup for the authors of every message on the page
+    user_ids = {row.user_id for row in rows if row.user_id is not None}
+    usernames = {}
+    if user_ids:
+        usernames = dict(db.session.query(User.id, User.username).filter(User.id.in_(user_ids)).all())
+
+    results = []
+    for row in rows:
+        if row.kind == 'task':
+            results.append({
+                "type": "task",
+                "id": row.id,
+                "title": search.render_snippet(row.title),
+                "status": row.status,
+                "snippet": search.render_snippet(row.snippet),
+                "score": -row.rank
+            })
+        else:
+            results.append({
+                "type": "message",
+                "id": row.id,
+                "user_id": row.user_id,
+                "username": usernames.get(row.user_id, "Unknown"),
+                "timestamp": row.timestamp.isoformat(),
+                "snippet": search.render_snippet(row.snippet),
+                "score": -row.rank
+            })
+
+    return jsonify({
+        "results": results,
+        "next_offset": offset + limit if has_more else None
+    }), 200
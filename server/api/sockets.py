@@ -1,7 +1,39 @@
-from flask_socketio import emit, join_room, leave_room
-from flask_jwt_extended import verify_jwt_in_request, jwt_required, get_jwt_identity
-from extensions import db, socketio
-from models import BoardMember, ChatMessage, User
+from flask import current_app, g, request
+from flask_socketio import emit, join_room, leave_room, rooms
+from extensions import socketio
+from socket_auth import socket_sessions, socket_authenticated
+from whiteboard_sync import documents, validate_ops, OpValidationError
+from whiteboard_index import parse_bbox
+from whiteboard_store import store
+from whiteboard_fanout import fanout, frame_room
+import whiteboard_codec as codec
+from chat_writer import chat_writer
+from socket_limits import socket_limits
+from metrics import metrics
+
+
+def apply_whiteboard_ops(board_id, user_id, ops, origin=None):
+    document = documents.get(board_id)
+    if not document:
+        return
+    seq = document.apply(ops)
+    store.append(document.board_id, seq, ops, user_id=user_id)
+    # Buffered and merged with other edits to the room; flushed once per tick.
+    # Ops keep the sender's sid as 'origin' so it can skip its own echo.
+    fanout.push(document.board_id, seq, ops, origin=origin)
+
+
+def initial_state(document, data):
+    # 'whiteboard_state' for join/resync: just the client's viewport if it sent
+    # a valid bbox, otherwise the whole canvas
+    try:
+        bbox = parse_bbox(data['bbox']) if data.get('bbox') is not None else None
+    except ValueError:
+        bbox = None
+    if bbox is None:
+        return document.snapshot()
+    return document.region(bbox)
+
 
 def register_socket_handlers(socketio):
 
@@ -12,68 +44,158 @@ def register_socket_handlers(socketio):
         if not token: return False # Reject connection
 
         try:
-            # Manually verify the JWT token
-            verify_jwt_in_request(locations=["headers"], optional=False)
-            print(f"User {get_jwt_identity()} connected")
+            # Verify the JWT once and bind the identity to this sid for later events
+            session = socket_sessions.bind(request.sid, token)
+            current_app.logger.debug(f"User {session.user_id} connected (sid {request.sid})")
         except Exception:
             return False # Reject connection
 
+    @socketio.on('disconnect')
+    def handle_disconnect(reason=None):
+        socket_sessions.drop(request.sid)
+        socket_limits.drop_sid(request.sid)
+
     @socketio.on('join')
-    @jwt_required()
+    @metrics.timed_event
+    @socket_authenticated
     def on_join(data):
-        user_id = int(get_jwt_identity())
+        user_id = g.socket_session.user_id
         room = data.get('board_id')
         # Check if the user is a valid member before allowing them to join the room
-        is_member = BoardMember.query.filter_by(board_id=room, user_id=user_id, status='member').first()
-        if is_member:
+        if g.socket_session.is_member(room):
             join_room(str(room))
+            # Whiteboard frames come from a per-encoding room; msgpack if asked for and available
+            binary = data.get('encoding') == 'msgpack' and fanout.binary_frames
+            join_room(frame_room(room, binary))
+            leave_room(frame_room(room, not binary))
             emit('status', {'msg': f'User {user_id} has entered the room.'}, room=str(room))
+            # Full canvas goes to the joining client only; everyone else keeps receiving deltas
+            document = documents.get(room)
+            if document:
+                emit('whiteboard_state', dict(initial_state(document, data), encoding='msgpack' if binary else 'json'))
 
     @socketio.on('leave')
-    @jwt_required()
+    @metrics.timed_event
+    @socket_authenticated
     def on_leave(data):
-        user_id = int(get_jwt_identity())
+        user_id = g.socket_session.user_id
         room = data.get('board_id')
         leave_room(str(room))
+        leave_room(frame_room(room))
+        leave_room(frame_room(room, binary=True))
         emit('status', {'msg': f'User {user_id} has left the room.'}, room=str(room))
 
     @socketio.on('chat_message')
-    @jwt_required()
+    @metrics.timed_event
+    @socket_authenticated
     def on_chat_message(data):
-        verify_jwt_in_request()
-        user_id = get_jwt_identity()
+        user_id = g.socket_session.user_id
         room = data.get('board_id')
         message = data.get('message')
         
         if not all([room, message]):
             return
+        if not isinstance(message, str) or len(message) > chat_writer.max_message_length:
+            emit('chat_error', {'msg': f'Messages must be text of at most {chat_writer.max_message_length} characters', 'board_id': room})
+            return
+        try:
+            room = int(room)
+        except (TypeError, ValueError):
+            emit('chat_error', {'msg': 'Invalid board id', 'board_id': room})
+            return
+        if not g.socket_session.is_member(room):
+            return
+        # Over the limit: dropped, and the sender gets 'slow_down' (see socket_limits.py)
+        if not socket_limits.check(request.sid, str(room), 'chat_message', user_id):
+            return
         
-        # Save message to database for persistence
-        new_chat_message = ChatMessage(board_id=room, user_id=user_id, message=message)
-        db.session.add(new_chat_message)
-        db.session.commit()
-        
-        user = User.query.get(user_id)
-        username = user.username if user else "Guest"
+        # Persisted by the background chat writer; the id and timestamp are assigned now
+        entry = chat_writer.enqueue(room, user_id, message)
+        if entry is None:
+            # The writer is backed up (e.g. the database is down); don't broadcast what won't be kept
+            emit('chat_error', {'msg': 'Chat is temporarily unavailable, try again shortly', 'board_id': room})
+            return
         
         emit('chat_message', {
+            'id': entry['id'],
             'user_id': user_id, 
-            'username': username, 
+            'username': g.socket_session.username, 
             'message': message, 
-            'timestamp': new_chat_message.timestamp.isoformat()
+            'timestamp': entry['timestamp'].isoformat()
         }, room=str(room))
 
     @socketio.on('task_update')
-    @jwt_required()
+    @metrics.timed_event
+    @socket_authenticated
     def on_task_update(data):
         room = data.get('board_id')
+        if not g.socket_session.is_member(room):
+            return
+        if not socket_limits.check(request.sid, str(room), 'task_update', g.socket_session.user_id):
+            return
         # Broadcast the task change to everyone else on the board
         emit('task_update', data, room=str(room))
 
     @socketio.on('whiteboard_update')
-    @jwt_required()
+    @metrics.timed_event
+    @socket_authenticated
     def on_whiteboard_update(data):
+        # Binary clients send the same payload as one msgpack attachment
+        if isinstance(data, (bytes, bytearray)):
+            if codec.msgpack is None:
+                emit('whiteboard_error', {'msg': 'Binary payloads are not supported'})
+                return
+            try:
+                data = codec.unpack(data)
+            except Exception:
+                emit('whiteboard_error', {'msg': 'Malformed binary payload'})
+                return
+            if not isinstance(data, dict):
+                return
+        room = data.get('board_id')
+        # Only sockets that passed the membership check in on_join may write
+        if not room or str(room) not in rooms():
+            return
+
+        try:
+            board_id = int(room)
+        except (TypeError, ValueError):
+            return
+
+        # Tokens first, so a client over its limit can't make us parse its ops
+        raw_ops = data.get('ops')
+        admitted, limited = socket_limits.admit_whiteboard(
+            request.sid, board_id, len(raw_ops) if isinstance(raw_ops, list) else 1
+        )
+        if not admitted:
+            return
+
+        try:
+            ops = validate_ops(raw_ops)
+        except OpValidationError as e:
+            emit('whiteboard_error', {'msg': str(e), 'board_id': room})
+            return
+
+        document = documents.get(room)
+        if not document:
+            emit('whiteboard_error', {'msg': 'Board not found', 'board_id': room})
+            return
+
+        # Over the limit the ops are merged and applied once the buckets refill
+        user_id = g.socket_session.user_id
+        ops = socket_limits.submit_whiteboard(request.sid, document.board_id, user_id, ops, limited)
+        if ops is None:
+            return
+        apply_whiteboard_ops(document.board_id, user_id, ops, origin=request.sid)
+
+    @socketio.on('whiteboard_resync')
+    @metrics.timed_event
+    @socket_authenticated
+    def on_whiteboard_resync(data):
         room = data.get('board_id')
-        update_data = data.get('update_data')
-        # include_self=False prevents the sender from receiving their own drawing data back
-        emit('whiteboard_update', update_data, room=str(room), include_self=False)
\ No newline at end of file
+        if not g.socket_session.is_member(room):
+            return
+
+        document = documents.get(room)
+        if document:
+            emit('whiteboard_state', initial_state(document, data))
@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from extensions import db, socketio
-from models import Task, BoardMember
+from models import Task
+from membership_cache import member_cache
+from board_changes import board_changes
+from serialization import TaskDTO
 
 tasks_bp = Blueprint('task', __name__)
 
@@ -21,7 +24,7 @@ def create_task(board_id):
         return jsonify({"msg": "Task title is required"}), 400
         
     # Check if the user has permission to add tasks to this board
-    is_member = BoardMember.query.filter_by(board_id=board_id, user_id=user_id).first()
+    is_member = member_cache.get(board_id, user_id)
     if not is_member:
         return jsonify({"msg": "You are not a member of this board"}), 403
         
@@ -34,18 +37,15 @@ def create_task(board_id):
     )
     
     db.session.add(new_task)
+    db.session.flush()
+    task_data = TaskDTO.from_model(new_task).to_dict()
+    revision = board_changes.record(board_id, 'task_created', {'task': task_data})
     db.session.commit()
     
     return jsonify({
         "msg": "Task created successfully", 
-        "task": {
-            "id": new_task.id, 
-            "title": new_task.title, 
-            "description": new_task.description, 
-            "assignee_id": new_task.assignee_id, 
-            "status": new_task.status,
-            "board_id": new_task.board_id
-        }
+        "task": task_data,
+        "revision": revision
     }), 201
 
 # PUT /api/tasks/<task_id>
@@ -59,7 +59,7 @@ def update_task(task_id):
     if not task:
         return jsonify({"msg": "Task not found"}), 404
         
-    is_member = BoardMember.query.filter_by(board_id=task.board_id, user_id=user_id).first()
+    is_member = member_cache.get(task.board_id, user_id)
     if not is_member:
         return jsonify({"msg": "You are not a member of this board"}), 403
         
@@ -72,21 +72,15 @@ def update_task(task_id):
     if 'status' in data:
         task.status = data['status']
         
+    updated_task_data = TaskDTO.from_model(task).to_dict()
+    board_id = task.board_id
+    revision = board_changes.record(board_id, 'task_updated', {'task': updated_task_data})
     db.session.commit()
     
-    updated_task_data = {
-        'id': task.id,
-        'title': task.title,
-        'description': task.description,
-        'assignee_id': task.assignee_id,
-        'status': task.status,
-        'board_id': task.board_id
-    }
-    
     # Broadcast to the board's room
-    socketio.emit('task_update', {'task': updated_task_data, 'board_id': task.board_id}, room=str(task.board_id))
+    socketio.emit('task_update', {'task': updated_task_data, 'board_id': board_id, 'revision': revision}, room=str(board_id))
     
-    return jsonify({"msg": "Task updated successfully", "task": updated_task_data}), 200
+    return jsonify({"msg": "Task updated successfully", "task": updated_task_data, "revision": revision}), 200
 
 # DELETE /api/tasks/<task_id>
 @tasks_bp.route('/<int:task_id>', methods=['DELETE'])
@@ -98,15 +92,129 @@ def delete_task(task_id):
     if not task:
         return jsonify({"msg": "Task not found"}), 404
     
-    is_member = BoardMember.query.filter_by(board_id=task.board_id, user_id=user_id).first()
+    is_member = member_cache.get(task.board_id, user_id)
     if not is_member:
         return jsonify({"msg": "You do not have permission to delete this task"}), 403
         
     board_id = task.board_id # Store for the socket emit
     db.session.delete(task)
+    revision = board_changes.record(board_id, 'task_deleted', {'task_id': task_id})
     db.session.commit()
     
     # Broadcast deletion event
-    socketio.emit('task_deleted', {'task_id': task_id, 'board_id': board_id}, room=str(board_id))
+    socketio.emit('task_deleted', {'task_id': task_id, 'board_id': board_id, 'revision': revision}, room=str(board_id))
     
-    return jsonify({"msg": "Task deleted successfully"}), 200
\ No newline at end of file
+    return jsonify({"msg": "Task deleted successfully"}), 200
+
+BATCH_MAX_OPERATIONS = 500
+TASK_FIELDS = ('title', 'description', 'assignee_id', 'status')
+
+# POST /api/task/boards/<board_id>/batch
+# Body: {"operations": [
+#   {"op": "create", "title": "...", "description": "...", "assignee_id": 3, "status": "to_do"},
+#   {"op": "update", "id": 12, "title": "...", ...},
+#   {"op": "move",   "id": 12, "status": "done"},
+#   {"op": "delete", "id": 12}
+# ]}
+# All operations are applied in one transaction or not at all, and the room
+# gets a single 'tasks_changed' event.
+@tasks_bp.route('/boards/<int:board_id>/batch', methods=['POST'])
+@jwt_required()
+def batch_tasks(board_id):
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    operations = data.get('operations')
+
+    is_member = member_cache.get(board_id, user_id)
+    if not is_member:
+        return jsonify({"msg": "You are not a member of this board"}), 403
+
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"msg": "operations must be a non-empty list"}), 400
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        return jsonify({"msg": f"At most {BATCH_MAX_OPERATIONS} operations per batch"}), 400
+
+    # Validate everything before touching the session so a bad op leaves no trace
+    for index, op in enumerate(operations):
+        kind = op.get('op') if isinstance(op, dict) else None
+        if kind not in ('create', 'update', 'move', 'delete'):
+            return jsonify({"msg": f"Operation {index}: unknown op {kind!r}", "index": index}), 400
+        if kind != 'create' and (not isinstance(op.get('id'), int) or isinstance(op.get('id'), bool)):
+            return jsonify({"msg": f"Operation {index}: id must be an integer", "index": index}), 400
+        # Required on create; on update only checked if the title is being changed
+        if (kind == 'create' or (kind == 'update' and 'title' in op)) and (
+                not isinstance(op.get('title'), str) or not op['title']):
+            return jsonify({"msg": f"Operation {index}: task title is required", "index": index}), 400
+        if kind == 'move' and not op.get('status'):
+            return jsonify({"msg": f"Operation {index}: move requires a status", "index": index}), 400
+        if kind == 'delete':
+            continue
+        # A create without a status starts in to_do; anywhere else it's set as sent
+        if (op.get('status') or (kind != 'create' and 'status' in op)) and (
+                not isinstance(op['status'], str) or not op['status']):
+            return jsonify({"msg": f"Operation {index}: status must be a non-empty string", "index": index}), 400
+        if kind == 'move':
+            continue
+        if op.get('description') is not None and not isinstance(op['description'], str):
+            return jsonify({"msg": f"Operation {index}: description must be a string or null", "index": index}), 400
+        if op.get('assignee_id') is not None and (
+                not isinstance(op['assignee_id'], int) or isinstance(op['assignee_id'], bool)):
+            return jsonify({"msg": f"Operation {index}: assignee_id must be an integer or null", "index": index}), 400
+
+    # One query for every task the batch touches, scoped to this board
+    task_ids = {op['id'] for op in operations if op['op'] != 'create'}
+    tasks = {}
+    if task_ids:
+        tasks = {task.id: task for task in Task.query.filter(Task.board_id == board_id, Task.id.in_(task_ids))}
+    for index, op in enumerate(operations):
+        if op['op'] != 'create' and op['id'] not in tasks:
+            return jsonify({"msg": f"Operation {index}: task {op['id']} not found on this board", "index": index}), 404
+
+    created, updated, deleted = [], {}, []
+    for op in operations:
+        kind = op['op']
+        if kind == 'create':
+            task = Task(
+                board_id=board_id,
+                title=op['title'],
+                description=op.get('description'),
+                assignee_id=op.get('assignee_id'),
+                status=op.get('status') or 'to_do'
+            )
+            db.session.add(task)
+            created.append(task)
+        elif kind == 'delete':
+            task = tasks.pop(op['id'], None)
+            if task is not None:
+                db.session.delete(task)
+                updated.pop(task.id, None)
+                deleted.append(task.id)
+        else:
+            task = tasks.get(op['id'])
+            if task is None:  # deleted earlier in this batch
+                continue
+            fields = ('status',) if kind == 'move' else TASK_FIELDS
+            for field in fields:
+                if field in op:
+                    setattr(task, field, op[field])
+            updated[task.id] = task
+
+    # Build the payload after the flush (new ids exist) but before the commit
+    # expires every instance, which would cost one refresh SELECT per task
+    db.session.flush()
+    payload = {
+        'board_id': board_id,
+        'created': [TaskDTO.from_model(task).to_dict() for task in created],
+        'updated': [TaskDTO.from_model(task).to_dict() for task in updated.values()],
+        'deleted': deleted
+    }
+    payload['revision'] = board_changes.record(board_id, 'tasks_changed', {
+        'created': payload['created'], 'updated': payload['updated'], 'deleted': deleted
+    })
+    db.session.commit()
+
+    # One consolidated broadcast instead of one event per task
+    socketio.emit('tasks_changed', payload, room=str(board_id))
+
+    return jsonify(dict(payload, msg="Batch applied successfully")), 200
+
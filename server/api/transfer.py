@@ -0,0 +1,58 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from extensions import db
+from models import Board
+from membership_cache import member_cache
+from chat_writer import chat_writer
+from board_transfer import export_lines, BoardImporter, BoardImportError
+
+transfer_bp = Blueprint('transfer', __name__)
+
+# Rows read (export) or inserted (import) per round trip; see board_transfer.py
+TRANSFER_BATCH_SIZE = 1000
+
+# Note: registered with url_prefix='/api/boards' next to the boards blueprint
+
+
+# GET /api/boards/<board_id>/export -> chunked application/x-ndjson
+@transfer_bp.route('/<int:board_id>/export', methods=['GET'])
+@jwt_required()
+def export_board(board_id):
+    user_id = int(get_jwt_identity())
+    is_member = member_cache.get(board_id, user_id)
+    if not is_member:
+        return jsonify({"msg": "You are not a member of this board"}), 403
+    if not db.session.query(Board.id).filter_by(id=board_id).scalar():
+        return jsonify({"msg": "Board not found"}), 404
+
+    # Include chat messages still queued in the write-behind buffer
+    chat_writer.flush()
+    # No Content-Length, so the body goes out chunked as the generator yields;
+    # the whole export reads from one transaction and so one consistent snapshot
+    response = Response(stream_with_context(export_lines(board_id, TRANSFER_BATCH_SIZE)), mimetype='application/x-ndjson')
+    response.headers['Content-Disposition'] = f'attachment; filename="board-{board_id}.ndjson"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+# POST /api/boards/import with an export as the body; creates a new board owned by the caller
+@transfer_bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_board():
+    user_id = int(get_jwt_identity())
+    importer = BoardImporter(user_id, TRANSFER_BATCH_SIZE)
+    try:
+        # Spooled and checked in full before anything is written (see BoardImporter)
+        board_id = importer.run(request.stream)
+    except BoardImportError as e:
+        db.session.rollback()
+        return jsonify({"msg": str(e)}), 400
+    db.session.commit()
+    member_cache.invalidate(board_id)
+
+    return jsonify({
+        "msg": "Board imported successfully",
+        "board_id": board_id,
+        "imported": importer.counts,
+        "skipped": importer.skipped
+    }), 201
@@ -0,0 +1,16 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from user_search import user_search
+
+users_bp = Blueprint('users', __name__)
+
+
+# GET /api/users/search?q=<prefix>
+# Member picker lookup: users whose username or email starts with q, capped at
+# USER_SEARCH_LIMIT. The caller is left out since they can't add themselves.
+@users_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_users():
+    user_id = int(get_jwt_identity())
+    results = user_search.search(request.args.get('q'))
+    return jsonify([user for user in results if user['id'] != user_id]), 200
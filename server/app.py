@@ -2,33 +2,71 @@ import os
 from flask import Flask, jsonify
 from extensions import db, migrate, jwt, cors, socketio, mail
 from api.auth import auth_bp
-from api.boards import boards_bp
+from api.boards import boards_bp, invites_bp
+from api.chat import chat_bp
+from api.search import search_bp
+from api.transfer import transfer_bp
+from api.users import users_bp
 # 1. Ensure this matches your filename (if it's tasks.py, use tasks_bp)
 from api.task import tasks_bp 
-from api.sockets import register_socket_handlers
+from api.sockets import register_socket_handlers, apply_whiteboard_ops
+from whiteboard_store import store as whiteboard_store
+from whiteboard_fanout import fanout as whiteboard_fanout
+from membership_cache import member_cache
+from user_search import user_search
+from board_changes import board_changes
+from chat_writer import chat_writer
+from socket_limits import socket_limits
+from chat_archive import chat_archive
+from mail_queue import mail_queue
+from password_hasher import password_hasher
+from metrics import metrics
+from socketio_bus import message_queue_options
+from db_profile import db_profile
+import serialization
+import search
 
 def create_app():
     """Application Factory Function"""
     app = Flask(__name__)
 
     # --- Configuration ---
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(os.getcwd(), 'collabboard.db')
+    # Database URL, SQLite PRAGMAs, pooling and read replica (see db_profile.py)
+    db_profile.configure(app)
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = 'your-super-secret-key-that-should-be-in-env'
     
     # Email settings
-    app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-    app.config['MAIL_PORT'] = 587
-    app.config['MAIL_USE_TLS'] = True
+    app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+    app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
+    app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', '1') not in ('0', 'false', 'False')
     app.config['MAIL_USERNAME'] = 'your-email@gmail.com'
     app.config['MAIL_PASSWORD'] = 'your-email-password'
     app.config['MAIL_DEFAULT_SENDER'] = 'your-email@gmail.com'
 
+    # Multi-worker deployments: cross-process room broadcasts (see README.md)
+    app.config['SOCKETIO_MESSAGE_QUEUE'] = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    app.config['WORKER_COUNT'] = int(os.environ.get('WORKER_COUNT', 1))
+    app.config['WORKER_INDEX'] = int(os.environ.get('WORKER_INDEX', 0))
+
+    # Password hashing runs on a bounded native thread pool (see password_hasher.py)
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    app.config['PASSWORD_HASH_POOL_SIZE'] = int(os.environ.get('PASSWORD_HASH_POOL_SIZE', 2))
+    app.config['PASSWORD_HASH_QUEUE_MAX'] = int(os.environ.get('PASSWORD_HASH_QUEUE_MAX', 32))
+
     # --- Initialize Extensions ---
+    # orjson-backed jsonify() and Socket.IO packets when available (see serialization.py)
+    serialization.init_app(app)
     db.init_app(app)
+    db_profile.init_app(app, db)
+    search.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
     mail.init_app(app)
+    member_cache.init_app(app)
+    user_search.init_app(app)
+    board_changes.init_app(app)
+    password_hasher.init_app(app)
     
     # 2. FIX: Explicit CORS configuration to allow Authorization headers
     # In app.py inside create_app()
@@ -36,13 +74,14 @@ def create_app():
     r"/api/*": {
         "origins": ["http://localhost:5173"], # Your Vite frontend URL
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
+        "allow_headers": ["Content-Type", "Authorization", "If-None-Match", "If-Modified-Since"],
+        "expose_headers": ["ETag", "Last-Modified"],
         "supports_credentials": True
     }
 })
     
     # 3. SocketIO Initialization
-    socketio.init_app(app, cors_allowed_origins="*")
+    socketio.init_app(app, cors_allowed_origins="*", **message_queue_options(app), **serialization.socketio_options(app))
 
     # --- Register Blueprints ---
     # Auth handles /api/register and /api/login
@@ -50,6 +89,21 @@ def create_app():
     
     # Boards handles /api/boards
     app.register_blueprint(boards_bp, url_prefix='/api/boards')
+
+    # Chat history handles /api/boards/<id>/chat
+    app.register_blueprint(chat_bp, url_prefix='/api/boards')
+
+    # Search handles /api/boards/<id>/search
+    app.register_blueprint(search_bp, url_prefix='/api/boards')
+
+    # Transfer handles /api/boards/<id>/export and /api/boards/import (NDJSON)
+    app.register_blueprint(transfer_bp, url_prefix='/api/boards')
+
+    # Users handles /api/users/search (member picker)
+    app.register_blueprint(users_bp, url_prefix='/api/users')
+
+    # Invites handles /api/invites/<token> (invite acceptance links)
+    app.register_blueprint(invites_bp, url_prefix='/api/invites')
     
     # Tasks handles /api/tasks
     app.register_blueprint(tasks_bp, url_prefix='/api/task')
@@ -57,21 +111,41 @@ def create_app():
     # --- Register SocketIO Handlers ---
     # We pass 'app' context if needed, but usually just socketio is fine
     register_socket_handlers(socketio)
+    # Per-sid and per-room token buckets on inbound events; releases deferred whiteboard edits
+    socket_limits.init_app(app, apply_whiteboard_ops)
+
+    # Background compaction of the whiteboard op log into board snapshots
+    whiteboard_store.init_app(app)
+    # Tick-based, coalesced broadcast of whiteboard ops per room
+    whiteboard_fanout.init_app(app)
+    # Write-behind, batched persistence of chat messages
+    chat_writer.init_app(app)
+    # Moves chat outside each board's hot window into compressed archive segments
+    chat_archive.init_app(app)
+    # Outbound e-mail (invites) delivered off the request path
+    mail_queue.init_app(app)
+
+    # --- Instrumentation ---
+    # Sampled structured request logs, latency histograms and /metrics
+    metrics.init_app(app, db)
+    # The keys listed after each collector are running totals (counters); the rest are levels
+    metrics.register_collector('membership_cache', member_cache.stats, ('hits', 'misses', 'evictions'))
+    metrics.register_collector('chat_writer', chat_writer.stats, (
+        'enqueued', 'written', 'batches', 'failures', 'inline_flushes', 'rejected', 'dead_lettered'))
+    metrics.register_collector('socket_limits', socket_limits.stats, (
+        'allowed', 'throttled', 'deferred_ops', 'merged_ops', 'dropped_ops'))
+    metrics.register_collector('chat_archive', chat_archive.stats, (
+        'runs', 'archived', 'segments_written', 'segments_read', 'failures'))
+    metrics.register_collector('mail_queue', mail_queue.stats, (
+        'sent', 'failures', 'dead_lettered', 'connect_failures', 'batches'))
+    metrics.register_collector('password_hash', password_hasher.stats, ('rejected', 'rehashed'))
+    metrics.register_collector('user_search', user_search.stats, ('hits', 'misses', 'evictions'))
 
     # --- Global Routes ---
     @app.route('/')
     def home():
         return jsonify({"message": "Collabboard Backend API is running!"}), 200
   
-    @app.before_request
-    def log_request_info():
-        from flask import request
-        print(f"--- Incoming Request ---")
-        print(f"Method: {request.method}")
-        print(f"URL: {request.url}")
-        print(f"Path: {request.path}")
-        print(f"------------------------")
-        
     return app
 
 if __name__ == "__main__":
@@ -0,0 +1,360 @@
+"""Benchmark harness for the REST and Socket.IO hot paths.
+
+Boots create_app() against a throwaway SQLite database, seeds it, then drives
+concurrent simulated clients (green threads over the Flask and Flask-SocketIO
+test clients, so no network or separate server is involved) through each
+scenario in turn:
+
+    login         POST /api/login
+    boards        GET /api/boards
+    board         GET /api/boards/<id>
+    task_update   PUT /api/task/<id>
+    chat          socket 'chat_message'
+    whiteboard    socket 'whiteboard_update'
+
+For every scenario it reports count, errors, throughput and p50/p95/p99
+latency. For chat and whiteboard it also measures fan-out delay, the time from
+a client's emit until each other client in the room has the broadcast.
+
+    python bench.py --clients 20 --duration 5 --out results/before.json
+    python bench.py --clients 20 --duration 5 --out results/after.json --compare results/before.json
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+SCENARIOS = ('login', 'boards', 'board', 'task_update', 'chat', 'whiteboard')
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, errors=0, elapsed=None):
+    values = sorted(samples)
+    result = {'count': len(values), 'errors': errors}
+    if elapsed:
+        result['throughput_per_s'] = round(len(values) / elapsed, 2)
+    if values:
+        result.update({
+            'mean_ms': round(sum(values) / len(values) * 1000, 3),
+            'p50_ms': round(percentile(values, 50) * 1000, 3),
+            'p95_ms': round(percentile(values, 95) * 1000, 3),
+            'p99_ms': round(percentile(values, 99) * 1000, 3),
+            'max_ms': round(values[-1] * 1000, 3),
+        })
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.results = {}
+
+    # --- Setup ---
+
+    def setup(self):
+        # Fresh database in a temp dir (create_app puts collabboard.db in the cwd);
+        # single-process rooms, since the test client cannot use a message queue
+        os.environ.pop('SOCKETIO_MESSAGE_QUEUE', None)
+        os.chdir(tempfile.mkdtemp(prefix='collabboard-bench-'))
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+        from app import create_app
+        from extensions import db, socketio
+        self.db = db
+        self.socketio = socketio
+        self.app = create_app()
+        # Metrics.init_app has already read REQUEST_LOG_SAMPLE_RATE and
+        # REQUEST_LOG_SLOW_MS; set the live values. Logins (password hashing)
+        # alone take longer than the slow threshold.
+        from metrics import metrics
+        metrics.sample_rate = 0
+        metrics.slow_threshold = float('inf')
+        # Clients here send as fast as they can; measure the handlers, not the rate limits
+        from socket_limits import socket_limits
+        socket_limits.enabled = False
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            self.seed()
+
+    def seed(self):
+        from flask_jwt_extended import create_access_token
+        from sqlalchemy import insert
+        from models import Board, BoardMember, ChatMessage, Task, User
+        from password_hasher import password_hasher
+
+        args = self.args
+        db = self.db
+        # One hash shared by every user; hashing thousands of them would dominate setup
+        password_hash = password_hasher.hash('password')
+        db.session.execute(insert(User), [
+            {'username': f'user{i}', 'email': f'user{i}@bench.local', 'password_hash': password_hash}
+            for i in range(1, args.users + 1)
+        ])
+        db.session.execute(insert(Board), [
+            {'name': f'Board {b}', 'owner_id': 1 + (b - 1) % args.users} for b in range(1, args.boards + 1)
+        ])
+        # Every user is a member of every board
+        db.session.execute(insert(BoardMember), [
+            {'board_id': b, 'user_id': u, 'role': 'owner' if u == 1 + (b - 1) % args.users else 'member', 'status': 'member'}
+            for b in range(1, args.boards + 1) for u in range(1, args.users + 1)
+        ])
+        db.session.execute(insert(Task), [
+            {'board_id': b, 'title': f'Task {t}', 'description': 'Seeded by bench.py', 'status': 'to_do'}
+            for b in range(1, args.boards + 1) for t in range(args.tasks)
+        ])
+        now = datetime.utcnow()
+        db.session.execute(insert(ChatMessage), [
+            {'board_id': b, 'user_id': 1 + m % args.users, 'message': f'Message {m}', 'timestamp': now}
+            for b in range(1, args.boards + 1) for m in range(args.messages)
+        ])
+        db.session.commit()
+
+        self.user_ids = list(range(1, args.users + 1))
+        self.board_ids = list(range(1, args.boards + 1))
+        self.task_ids = [row.id for row in db.session.query(Task.id)]
+        self.headers = {
+            user_id: {'Authorization': 'Bearer ' + create_access_token(identity=str(user_id))}
+            for user_id in self.user_ids
+        }
+
+    # --- Runner ---
+
+    def run_clients(self, name, client_factory):
+        """Runs `clients` green threads, each calling its action until the deadline."""
+        import eventlet
+
+        samples, errors = [], [0]
+        deadline = time.perf_counter() + self.args.duration
+
+        def worker(index):
+            action = client_factory(index)
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    ok = action()
+                except Exception:
+                    ok = False
+                if ok:
+                    samples.append(time.perf_counter() - start)
+                else:
+                    errors[0] += 1
+                # Yield so the other clients (and background tasks) get a turn
+                self.socketio.sleep(0)
+
+        started = time.perf_counter()
+        pool = [eventlet.spawn(worker, index) for index in range(self.args.clients)]
+        for thread in pool:
+            thread.wait()
+        self.results[name] = summarize(samples, errors[0], time.perf_counter() - started)
+
+    def scenario_login(self):
+        def factory(index):
+            user_id = self.user_ids[index % len(self.user_ids)]
+            body = {'email': f'user{user_id}@bench.local', 'password': 'password'}
+            return lambda: self.client.post('/api/login', json=body).status_code == 200
+        self.run_clients('login', factory)
+
+    def scenario_boards(self):
+        def factory(index):
+            headers = self.headers[self.user_ids[index % len(self.user_ids)]]
+            return lambda: self.client.get('/api/boards', headers=headers).status_code == 200
+        self.run_clients('boards', factory)
+
+    def scenario_board(self):
+        def factory(index):
+            headers = self.headers[self.user_ids[index % len(self.user_ids)]]
+            return lambda: self.client.get(f'/api/boards/{random.choice(self.board_ids)}', headers=headers).status_code == 200
+        self.run_clients('board', factory)
+
+    def scenario_task_update(self):
+        statuses = itertools.cycle(['to_do', 'in_progress', 'done'])
+
+        def factory(index):
+            headers = self.headers[self.user_ids[index % len(self.user_ids)]]
+            return lambda: self.client.put(
+                f'/api/task/{random.choice(self.task_ids)}', json={'status': next(statuses)}, headers=headers
+            ).status_code == 200
+        self.run_clients('task_update', factory)
+
+    def connect_sockets(self):
+        """One socket per client, spread round-robin over the boards."""
+        sockets = []
+        for index in range(self.args.clients):
+            user_id = self.user_ids[index % len(self.user_ids)]
+            board_id = self.board_ids[index % len(self.board_ids)]
+            headers = self.headers[user_id]
+            sock = self.socketio.test_client(
+                self.app, flask_test_client=self.client, headers=headers,
+                auth={'token': headers['Authorization'][7:]}, query_string=f'board_id={board_id}'
+            )
+            sock.emit('join', {'board_id': board_id})
+            sock.get_received()
+            sockets.append((sock, board_id))
+        return sockets
+
+    def run_socket_scenario(self, name, emit, match):
+        """Times each emit and, via a collector thread, how long each broadcast takes to reach the room."""
+        import eventlet
+
+        sockets = self.connect_sockets()
+        sent = {}  # marker -> emit start time
+        delays = []
+        running = [True]
+
+        def collect():
+            while True:
+                last_pass = not running[0]
+                now = time.perf_counter()
+                for sock, _ in sockets:
+                    for packet in sock.get_received():
+                        for marker in match(packet):
+                            if marker in sent:
+                                delays.append(now - sent[marker])
+                if last_pass:
+                    return
+                self.socketio.sleep(0.001)
+
+        collector = eventlet.spawn(collect)
+        counter = itertools.count()
+
+        def factory(index):
+            sock, board_id = sockets[index]
+
+            def action():
+                marker = f'{index}-{next(counter)}'
+                sent[marker] = time.perf_counter()
+                emit(sock, board_id, marker)
+                return True
+            return action
+
+        self.run_clients(name, factory)
+        # Give tick-based fan-out a moment to flush what is still buffered
+        self.socketio.sleep(0.25)
+        running[0] = False
+        collector.wait()
+        for sock, _ in sockets:
+            sock.disconnect()
+        self.results[name]['fanout'] = summarize(delays)
+
+    def scenario_chat(self):
+        def emit(sock, board_id, marker):
+            sock.emit('chat_message', {'board_id': board_id, 'message': marker})
+
+        def match(packet):
+            if packet['name'] == 'chat_message':
+                return [packet['args'][0]['message']]
+            return []
+        self.run_socket_scenario('chat', emit, match)
+
+    def scenario_whiteboard(self):
+        def emit(sock, board_id, marker):
+            sock.emit('whiteboard_update', {'board_id': board_id, 'ops': [
+                {'op': 'add', 'id': marker, 'object': {'type': 'path', 'left': random.random() * 1000, 'top': random.random() * 1000}}
+            ]})
+
+        def match(packet):
+            if packet['name'] == 'whiteboard_ops':
+                return [op['id'] for op in packet['args'][0]['ops']]
+            return []
+        self.run_socket_scenario('whiteboard', emit, match)
+
+    def run(self):
+        self.setup()
+        for name in self.args.scenarios:
+            getattr(self, f'scenario_{name}')()
+            print(format_row(name, self.results[name]), flush=True)
+        return {
+            'meta': {
+                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'git_revision': git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'args': {k: v for k, v in vars(self.args).items() if k not in ('out', 'compare')},
+            },
+            'scenarios': self.results,
+        }
+
+
+def format_row(name, result):
+    row = f"{name:<12} n={result['count']:<7} err={result['errors']:<4} {result.get('throughput_per_s', 0):>9.1f}/s"
+    if result['count']:
+        row += f"  p50={result['p50_ms']:.2f}ms p95={result['p95_ms']:.2f}ms p99={result['p99_ms']:.2f}ms"
+    fanout = result.get('fanout')
+    if fanout and fanout['count']:
+        row += f"  fanout p50={fanout['p50_ms']:.2f}ms p99={fanout['p99_ms']:.2f}ms"
+    return row
+
+
+def compare(current, baseline):
+    print(f"\nvs {baseline['meta'].get('git_revision')} ({baseline['meta'].get('timestamp')})")
+    for name, result in current['scenarios'].items():
+        base = baseline['scenarios'].get(name)
+        if not base or not base.get('count') or not result.get('count'):
+            continue
+        parts = []
+        for key in ('throughput_per_s', 'p50_ms', 'p99_ms'):
+            if base.get(key):
+                parts.append(f"{key} {base[key]} -> {result[key]} ({(result[key] - base[key]) / base[key] * 100:+.1f}%)")
+        print(f"{name:<12} " + '  '.join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--boards', type=int, default=10)
+    parser.add_argument('--tasks', type=int, default=50, help='tasks per board')
+    parser.add_argument('--messages', type=int, default=500, help='chat messages per board')
+    parser.add_argument('--clients', type=int, default=20, help='concurrent simulated clients')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per scenario')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        type=lambda value: [s.strip() for s in value.split(',') if s.strip()])
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='previous results JSON to compare against')
+    args = parser.parse_args()
+
+    unknown = [s for s in args.scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    random.seed(args.seed)
+
+    out = os.path.abspath(args.out) if args.out else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    results = Bench(args).run()
+
+    if out:
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        with open(out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {out}")
+    if baseline_path:
+        with open(baseline_path) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Micro-benchmark for the board payload: loading a board's tasks and encoding them.
+
+Seeds one board per size into a throwaway SQLite database and times three ways
+of producing the task list GET /api/boards/<id> returns:
+
+    orm+json      Task entities -> hand-built dicts -> stdlib JSON (the old path)
+    dto+json      column-only rows -> TaskDTO -> stdlib JSON
+    dto+orjson    column-only rows -> TaskDTO -> orjson (the default when installed)
+
+Each one is split into load (query and objects) and encode (bytes out), and a
+full GET /api/boards/<id> is timed with each backend as well.
+
+    python bench_serialization.py --tasks 1000,5000,20000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--tasks', default='1000,5000,20000',
+                        type=lambda value: [int(n) for n in value.split(',') if n.strip()])
+    parser.add_argument('--repeat', type=int, default=15)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='collabboard-serialization-'))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import insert
+    from app import create_app
+    from extensions import db
+    from models import Board, BoardMember, Task, User
+    import serialization
+    from metrics import metrics
+
+    app = create_app()
+    metrics.sample_rate = 0
+    metrics.slow_threshold = float('inf')
+    client = app.test_client()
+    stdlib = serialization.FastJSONProvider(app, 'json')
+    fast = serialization.FastJSONProvider(app, 'orjson')
+    if not fast.fast:
+        print("orjson is not installed; the orjson rows use the stdlib encoder too")
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, username='bench', email='bench@example.com', password_hash='-'))
+        boards = {}
+        for count in args.tasks:
+            board = Board(name=f'{count} tasks', owner_id=1)
+            db.session.add(board)
+            db.session.flush()
+            db.session.execute(insert(BoardMember), [{'board_id': board.id, 'user_id': 1, 'role': 'owner', 'status': 'member'}])
+            db.session.execute(insert(Task), [{
+                'board_id': board.id, 'title': f'Task {i}', 'description': 'Lorem ipsum dolor sit amet ' * 4,
+                'assignee_id': 1 if i % 3 else None, 'status': ('to_do', 'in_progress', 'done')[i % 3]
+            } for i in range(count)])
+            boards[count] = board.id
+        db.session.commit()
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity='1')}
+
+    def orm_load(board_id):
+        tasks = Task.query.filter_by(board_id=board_id).all()
+        result = [{
+            'id': task.id, 'title': task.title, 'description': task.description,
+            'assignee_id': task.assignee_id, 'status': task.status, 'board_id': task.board_id
+        } for task in tasks]
+        db.session.expunge_all()  # no identity-map hits across repeats
+        return result
+
+    def get_board(board_id, provider):
+        app.json = provider
+        response = client.get(f'/api/boards/{board_id}', headers=headers)
+        assert response.status_code == 200, response.status_code
+
+    print(f"{'tasks':>7} {'path':<12} {'load':>9} {'encode':>9} {'total':>9}")
+    with app.app_context():
+        for count, board_id in boards.items():
+            rows = {
+                'orm+json': (lambda: orm_load(board_id), stdlib),
+                'dto+json': (lambda: serialization.select_tasks(board_id), stdlib),
+                'dto+orjson': (lambda: serialization.select_tasks(board_id), fast),
+            }
+            baseline = None
+            for name, (load, provider) in rows.items():
+                payload = load()
+                load_ms = timed(load, args.repeat)
+                encode_ms = timed(lambda: provider.dumps({'tasks': payload}), args.repeat)
+                total = load_ms + encode_ms
+                baseline = baseline or total
+                print(f"{count:>7} {name:<12} {load_ms:>7.2f}ms {encode_ms:>7.2f}ms {total:>7.2f}ms  x{baseline / total:.1f}")
+            for name, provider in (('GET json', stdlib), ('GET orjson', fast)):
+                print(f"{count:>7} {name:<12} {'':>9} {'':>9} {timed(lambda: get_board(board_id, provider), args.repeat):>7.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
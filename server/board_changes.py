@@ -0,0 +1,121 @@
+import json
+
+from extensions import db
+from models import Board, BoardEvent, WhiteboardOp
+
+# Per-board change feed for reconnecting clients.
+#
+# Two cursors, one per log:
+# - Board.revision is bumped once per task or membership mutation, which is
+#   stored as a BoardEvent row. Board.changes_floor records the highest
+#   revision pruned from that log.
+# - Whiteboard edits are already stored in whiteboard_op with a per-board seq,
+#   so they are replayed by seq. Bumping the board row for every stroke would
+#   rewrite it (whiteboard_data and all) and take the write lock per op batch.
+# A client whose cursor is behind what either log still holds gets a full
+# snapshot instead of deltas.
+
+PRUNE_EVERY = 100
+
+
+class BoardChanges:
+    def __init__(self):
+        self.retention = 1000
+        self.max_changes = 1000
+
+    def init_app(self, app):
+        app.config.setdefault('BOARD_EVENT_RETENTION', 1000)
+        app.config.setdefault('BOARD_CHANGES_MAX', 1000)
+        self.retention = app.config['BOARD_EVENT_RETENTION']
+        self.max_changes = app.config['BOARD_CHANGES_MAX']
+
+    def record(self, board_id, kind, payload):
+        # Runs inside the caller's transaction; the caller commits
+        revision = Board.bump_revision(board_id)
+        db.session.add(BoardEvent(board_id=board_id, revision=revision, kind=kind, payload=json.dumps(payload)))
+        if revision % PRUNE_EVERY == 0:
+            self.prune(board_id, revision)
+        return revision
+
+    def prune(self, board_id, revision):
+        # Keeps the last `retention` revisions of task/membership events
+        cutoff = revision - self.retention
+        if cutoff <= 0:
+            return
+        BoardEvent.query.filter(
+            BoardEvent.board_id == board_id,
+            BoardEvent.revision <= cutoff
+        ).delete(synchronize_session=False)
+        self.raise_floor(board_id, cutoff)
+
+    def raise_floor(self, board_id, revision):
+        if revision is None:
+            return
+        Board.query.filter(Board.id == board_id, Board.changes_floor < revision).update(
+            {Board.changes_floor: revision}, synchronize_session=False
+        )
+
+    def since(self, board_id, since, whiteboard_since=None):
+        """Task/membership changes after revision `since` and whiteboard changes
+        after seq `whiteboard_since` (skipped when None), oldest first.
+
+        Returns (changes, whiteboard_changes, revision, whiteboard_seq); both
+        lists are None if a snapshot is needed.
+        """
+        row = db.session.query(Board.revision, Board.changes_floor, Board.whiteboard_seq).filter_by(id=board_id).first()
+        if row is None:
+            return None, None, 0, 0
+        revision, floor, folded_seq = row
+        whiteboard_seq, _ = self.whiteboard_head(board_id, folded_seq)
+        if since > revision or since < floor:
+            return None, None, revision, whiteboard_seq
+        if whiteboard_since is not None and whiteboard_since > whiteboard_seq:
+            return None, None, revision, whiteboard_seq
+
+        events = BoardEvent.query.filter(
+            BoardEvent.board_id == board_id,
+            BoardEvent.revision > since
+        ).order_by(BoardEvent.revision).limit(self.max_changes + 1).all()
+        whiteboard_ops = []
+        if whiteboard_since is not None and whiteboard_since < whiteboard_seq:
+            whiteboard_ops = WhiteboardOp.query.filter(
+                WhiteboardOp.board_id == board_id,
+                WhiteboardOp.seq > whiteboard_since
+            ).order_by(WhiteboardOp.seq).limit(self.max_changes + 1).all()
+            # Compaction deleted the ops right after the cursor
+            if not whiteboard_ops or whiteboard_ops[0].seq != whiteboard_since + 1:
+                return None, None, revision, whiteboard_seq
+        if len(events) + len(whiteboard_ops) > self.max_changes:
+            # Replaying this many deltas costs more than a snapshot
+            return None, None, revision, whiteboard_seq
+
+        changes = [
+            {'revision': event.revision, 'kind': event.kind, 'data': json.loads(event.payload)}
+            for event in events
+        ]
+        whiteboard_changes = []
+        for op in whiteboard_ops:
+            if op.kind == 'replace':
+                # Saved canvases are the client's string as sent; an unparseable one loads as empty
+                try:
+                    state = json.loads(op.payload) if op.payload else None
+                except ValueError:
+                    state = None
+                whiteboard_changes.append({'seq': op.seq, 'kind': 'whiteboard_state', 'data': {'state': state}})
+            else:
+                whiteboard_changes.append({'seq': op.seq, 'kind': 'whiteboard_ops', 'data': {'ops': json.loads(op.payload)}})
+        return changes, whiteboard_changes, revision, whiteboard_seq
+
+    def whiteboard_head(self, board_id, folded_seq):
+        """(seq, created_at) of the board's latest whiteboard edit, from the op log.
+
+        folded_seq is Board.whiteboard_seq; it is the seq if every op has been
+        compacted away. created_at is None when no op is logged.
+        """
+        seq, created_at = db.session.query(
+            db.func.max(WhiteboardOp.seq), db.func.max(WhiteboardOp.created_at)
+        ).filter(WhiteboardOp.board_id == board_id).one()
+        return max(folded_seq or 0, seq or 0), created_at
+
+
+board_changes = BoardChanges()
@@ -0,0 +1,351 @@
+import json
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from extensions import db
+from models import Board, BoardMember, ChatMessage, Task, User
+from chat_writer import chat_writer
+from chat_archive import chat_archive
+from whiteboard_sync import documents
+
+# Board export/import as NDJSON: one JSON record per line, in this order
+#
+#   {"type": "board", "format": 1, "board": {...}}
+#   {"type": "member", ...}             one per accepted member
+#   {"type": "task", ...}               one per task, by id
+#   {"type": "message", ...}            chat history, archived then hot, by id
+#   {"type": "whiteboard", "seq": n, "state": {...canvas minus objects...}}
+#   {"type": "whiteboard_object", "object": {...}}
+#   {"type": "end", "counts": {...}}    absent if the stream was cut short
+#
+# Users are referred to by e-mail, since ids differ between environments.
+# Export reads each table through yield_per, so only one batch of rows is in
+# memory at a time; import buffers rows and writes them with executemany in
+# batches of the same size. The exception is the canvas: the live document is
+# already in memory and is stored as one column, so it is rebuilt whole.
+#
+# Import runs in two passes. The upload is first spooled to a temp file
+# (in memory up to SPOOL_MAX_MEMORY) and every record is checked, with no
+# writes. Only then is it replayed into the database, in one transaction, so on
+# SQLite the write lock is held for the inserts and not while the client is
+# still uploading.
+
+EXPORT_FORMAT = 1
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+EMAIL_LOOKUP_BATCH = 500
+
+
+class BoardImportError(ValueError):
+    pass
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _line(record):
+    return json.dumps(record, separators=(',', ':'), default=_json_default) + '\n'
+
+
+def _parse_datetime(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _rows(statement, batch_size):
+    return db.session.execute(statement.execution_options(yield_per=batch_size))
+
+
+def export_lines(board_id, batch_size=1000):
+    """Generator of NDJSON lines for the whole board. Run it inside an app context."""
+    board = db.session.execute(
+        db.select(Board.id, Board.name, Board.created_at, Board.revision, User.email.label('owner_email'))
+        .join(User, User.id == Board.owner_id)
+        .where(Board.id == board_id)
+    ).first()
+    if board is None:
+        return
+    yield _line({'type': 'board', 'format': EXPORT_FORMAT, 'board': board._asdict()})
+    counts = {'members': 0, 'tasks': 0, 'messages': 0, 'whiteboard_objects': 0}
+
+    # Pending invites carry single-use tokens, so only accepted members travel
+    members = _rows(
+        db.select(User.username, User.email, BoardMember.role)
+        .join(User, User.id == BoardMember.user_id)
+        .where(BoardMember.board_id == board_id, BoardMember.status == 'member')
+        .order_by(BoardMember.id),
+        batch_size
+    )
+    for row in members:
+        counts['members'] += 1
+        yield _line(dict(type='member', **row._asdict()))
+
+    tasks = _rows(
+        db.select(Task.id, Task.title, Task.description, Task.status, Task.created_at,
+                  User.email.label('assignee_email'))
+        .outerjoin(User, User.id == Task.assignee_id)
+        .where(Task.board_id == board_id)
+        .order_by(Task.id),
+        batch_size
+    )
+    for row in tasks:
+        counts['tasks'] += 1
+        yield _line(dict(type='task', **row._asdict()))
+
+    # Archived history first, it is all older than what is still hot
+    authors = {}
+    for message in chat_archive.iter_messages(board_id):
+        if message.user_id not in authors:
+            authors[message.user_id] = db.session.query(User.username, User.email).filter_by(id=message.user_id).first()
+        author = authors[message.user_id]
+        if author is None:
+            continue
+        counts['messages'] += 1
+        yield _line({'type': 'message', 'id': message.id, 'message': message.message, 'timestamp': message.timestamp,
+                     'username': author.username, 'user_email': author.email})
+
+    messages = _rows(
+        db.select(ChatMessage.id, ChatMessage.message, ChatMessage.timestamp,
+                  User.username, User.email.label('user_email'))
+        .join(User, User.id == ChatMessage.user_id)
+        .where(ChatMessage.board_id == board_id)
+        .order_by(ChatMessage.id),
+        batch_size
+    )
+    for row in messages:
+        counts['messages'] += 1
+        yield _line(dict(type='message', **row._asdict()))
+
+    snapshot = documents.get(board_id, refresh=True).snapshot()
+    objects = snapshot['state'].pop('objects')
+    yield _line({'type': 'whiteboard', 'seq': snapshot['seq'], 'state': snapshot['state']})
+    for obj in objects:
+        counts['whiteboard_objects'] += 1
+        yield _line({'type': 'whiteboard_object', 'object': obj})
+
+    yield _line({'type': 'end', 'counts': counts})
+
+
+class BoardImporter:
+    """Builds a new board owned by owner_id from export_lines() output, in one transaction."""
+
+    def __init__(self, owner_id, batch_size=1000):
+        self.owner_id = owner_id
+        self.batch_size = batch_size
+        self.board = None
+        self.member_ids = {owner_id}
+        self.counts = {'members': 0, 'tasks': 0, 'messages': 0, 'whiteboard_objects': 0}
+        self.skipped = {'members': 0, 'assignees': 0, 'messages': 0}
+        self._user_ids = {}       # e-mail -> user id here, for the e-mails that exist
+        self._unresolved = set()  # e-mails seen but not looked up yet
+        self._members = []
+        self._tasks = []
+        self._messages = []
+        self._canvas = None
+        self._objects = []
+
+    def run(self, lines):
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, mode='w+b') as spool:
+            self._check_all(lines, spool)
+            spool.seek(0)
+            for raw in spool:
+                if raw.strip():
+                    self._record(json.loads(raw))
+        return self.board.id
+
+    # --- Pass 1: spool and validate, no writes ---
+
+    def _check_all(self, lines, spool):
+        started = ended = False
+        for number, raw in enumerate(lines, 1):
+            if isinstance(raw, str):
+                raw = raw.encode('utf-8')
+            if not raw.strip():
+                continue
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                raise BoardImportError(f"Line {number}: invalid JSON")
+            if not isinstance(record, dict):
+                raise BoardImportError(f"Line {number}: expected an object")
+            if ended:
+                raise BoardImportError(f"Line {number}: data after the end record")
+            if not started:
+                self._check_board(number, record)
+                started = True
+            else:
+                ended = self._check(number, record)
+            spool.write(raw if raw.endswith(b'\n') else raw + b'\n')
+
+        if not started:
+            raise BoardImportError("Empty import")
+        if not ended:
+            raise BoardImportError("Import is truncated (no end record)")
+        self._resolve_emails()
+
+    def _check_board(self, number, record):
+        if record.get('type') != 'board':
+            raise BoardImportError(f"Line {number}: the first record must be the board")
+        if record.get('format') != EXPORT_FORMAT:
+            raise BoardImportError(f"Line {number}: unsupported format {record.get('format')!r}")
+        board = record.get('board')
+        if not isinstance(board, dict):
+            raise BoardImportError(f"Line {number}: 'board' must be an object")
+        if not isinstance(board.get('name'), str) or not board['name'].strip():
+            raise BoardImportError(f"Line {number}: the board record needs a name")
+
+    def _check(self, number, record):
+        # Returns True for the end record
+        kind = record.get('type')
+        if kind == 'member':
+            self._check_fields(number, record, ('email',))
+            self._see_email(record.get('email'))
+        elif kind == 'task':
+            if not isinstance(record.get('title'), str) or not record['title']:
+                raise BoardImportError(f"Line {number}: task without a title")
+            self._check_fields(number, record, ('description', 'status', 'created_at', 'assignee_email'))
+            self._see_email(record.get('assignee_email'))
+        elif kind == 'message':
+            if not isinstance(record.get('message'), str):
+                raise BoardImportError(f"Line {number}: message without text")
+            self._check_fields(number, record, ('timestamp', 'user_email'))
+            self._see_email(record.get('user_email'))
+        elif kind == 'whiteboard':
+            if record.get('state') is not None and not isinstance(record['state'], dict):
+                raise BoardImportError(f"Line {number}: whiteboard state must be an object")
+        elif kind == 'whiteboard_object':
+            pass  # non-object entries are skipped, as before
+        elif kind == 'end':
+            return True
+        else:
+            raise BoardImportError(f"Line {number}: unknown record type {kind!r}")
+        return False
+
+    def _check_fields(self, number, record, fields):
+        for field in fields:
+            if record.get(field) is not None and not isinstance(record[field], str):
+                raise BoardImportError(f"Line {number}: {field} must be a string")
+
+    def _see_email(self, email):
+        # Looked up in batches as they come, so only e-mails of local users are kept
+        if not email or email in self._user_ids:
+            return
+        self._unresolved.add(email)
+        if len(self._unresolved) >= EMAIL_LOOKUP_BATCH:
+            self._resolve_emails()
+
+    def _resolve_emails(self):
+        if self._unresolved:
+            rows = db.session.query(User.email, User.id).filter(User.email.in_(self._unresolved))
+            self._user_ids.update(rows)
+            self._unresolved.clear()
+
+    # --- Pass 2: replay into the database ---
+
+    def _record(self, record):
+        kind = record.get('type')
+        if kind == 'board':
+            self._start(record['board']['name'])
+        elif kind == 'member':
+            self._member(record)
+        elif kind == 'task':
+            self._task(record)
+        elif kind == 'message':
+            self._message(record)
+        elif kind == 'whiteboard':
+            self._canvas = record.get('state') or {}
+        elif kind == 'whiteboard_object':
+            if isinstance(record.get('object'), dict):
+                self._objects.append(record['object'])
+                self.counts['whiteboard_objects'] += 1
+        elif kind == 'end':
+            self._finish()
+
+    def _start(self, name):
+        self.board = Board(name=name, owner_id=self.owner_id)
+        db.session.add(self.board)
+        db.session.flush()
+        db.session.execute(insert(BoardMember), [
+            {'board_id': self.board.id, 'user_id': self.owner_id, 'role': 'owner', 'status': 'member'}
+        ])
+
+    def _user_id(self, email):
+        return self._user_ids.get(email) if email else None
+
+    def _member(self, record):
+        user_id = self._user_id(record.get('email'))
+        if user_id is None:
+            self.skipped['members'] += 1
+            return
+        if user_id in self.member_ids:
+            return
+        # The importer owns the copy; everyone else comes back as a member
+        self._members.append({'board_id': self.board.id, 'user_id': user_id, 'role': 'member', 'status': 'member'})
+        self.member_ids.add(user_id)
+        if len(self._members) >= self.batch_size:
+            self._flush_members()
+
+    def _task(self, record):
+        assignee_id = self._user_id(record.get('assignee_email'))
+        if record.get('assignee_email') and assignee_id is None:
+            self.skipped['assignees'] += 1
+        self._tasks.append({
+            'board_id': self.board.id,
+            'title': record['title'],
+            'description': record.get('description'),
+            'assignee_id': assignee_id,
+            'status': record.get('status') or 'to_do',
+            'created_at': _parse_datetime(record.get('created_at')) or datetime.utcnow(),
+        })
+        if len(self._tasks) >= self.batch_size:
+            self._flush_tasks()
+
+    def _message(self, record):
+        # Messages need an author here; ones by unknown users are dropped
+        user_id = self._user_id(record.get('user_email'))
+        if user_id is None:
+            self.skipped['messages'] += 1
+            return
+        self._messages.append({
+            'id': chat_writer.allocate_id(),
+            'board_id': self.board.id,
+            'user_id': user_id,
+            'message': record['message'],
+            'timestamp': _parse_datetime(record.get('timestamp')) or datetime.utcnow(),
+        })
+        if len(self._messages) >= self.batch_size:
+            self._flush_messages()
+
+    def _flush_members(self):
+        if self._members:
+            db.session.execute(insert(BoardMember), self._members)
+            self.counts['members'] += len(self._members)
+            self._members = []
+
+    def _flush_tasks(self):
+        if self._tasks:
+            db.session.execute(insert(Task), self._tasks)
+            self.counts['tasks'] += len(self._tasks)
+            self._tasks = []
+
+    def _flush_messages(self):
+        if self._messages:
+            db.session.execute(insert(ChatMessage), self._messages)
+            self.counts['messages'] += len(self._messages)
+            self._messages = []
+
+    def _finish(self):
+        self._flush_members()
+        self._flush_tasks()
+        self._flush_messages()
+        if self._canvas is not None or self._objects:
+            self.board.whiteboard_data = json.dumps(dict(self._canvas or {}, objects=self._objects))
+            self._objects = []
@@ -0,0 +1,239 @@
+import gzip
+import json
+import os
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import tuple_
+
+from extensions import db, socketio
+from models import ChatArchiveSegment, ChatMessage
+
+# Chat retention. Each board keeps a hot window of messages in chat_message:
+# those newer than CHAT_HOT_DAYS, and never more than its newest
+# CHAT_HOT_MAX_MESSAGES. A background job moves everything older, oldest
+# first, into gzip-compressed NDJSON segment files under CHAT_ARCHIVE_DIR:
+#
+#   <CHAT_ARCHIVE_DIR>/<board_id>/<first_id>-<last_id>.ndjson.gz
+#
+# Segments are written once and never modified. chat_archive_segment indexes
+# them by board and time range, so GET /api/boards/<id>/chat continues into the
+# archive once it runs out of hot messages, reading only the segments it needs.
+#
+# Each batch is written to its file (fsynced, then renamed into place) before
+# the segment row is inserted and the messages deleted in one transaction. A
+# crash in between leaves the messages hot and a file that the next run
+# rewrites under the same name.
+#
+# Search only covers the hot window: deleting archived rows also removes them
+# from chat_message_fts, and segment files aren't indexed.
+#
+# The job runs every CHAT_ARCHIVE_INTERVAL seconds on worker 0 only, moves at
+# most CHAT_ARCHIVE_MAX_BATCHES batches of CHAT_ARCHIVE_BATCH_SIZE per run, and
+# sleeps CHAT_ARCHIVE_PAUSE seconds between batches so it never holds the
+# SQLite write lock for long.
+
+ArchivedMessage = namedtuple('ArchivedMessage', ['id', 'user_id', 'message', 'timestamp'])
+
+
+class ChatArchive:
+    def __init__(self):
+        self.app = None
+        self.directory = None
+        self.hot_days = 30
+        self.hot_max_messages = 5000
+        self.batch_size = 2000
+        self.max_batches = 20
+        self.interval = 300.0
+        self.pause = 0.5
+        # Metrics
+        self.runs = 0
+        self.archived = 0
+        self.segments_written = 0
+        self.segments_read = 0
+        self.failures = 0
+        self.last_run_seconds = 0.0
+
+    def init_app(self, app):
+        app.config.setdefault('CHAT_ARCHIVE_DIR', os.path.join(os.getcwd(), 'chat_archive'))
+        app.config.setdefault('CHAT_HOT_DAYS', 30)
+        app.config.setdefault('CHAT_HOT_MAX_MESSAGES', 5000)
+        app.config.setdefault('CHAT_ARCHIVE_BATCH_SIZE', 2000)
+        app.config.setdefault('CHAT_ARCHIVE_MAX_BATCHES', 20)
+        app.config.setdefault('CHAT_ARCHIVE_INTERVAL', 300.0)
+        app.config.setdefault('CHAT_ARCHIVE_PAUSE', 0.5)
+        self.app = app
+        self.directory = app.config['CHAT_ARCHIVE_DIR']
+        self.hot_days = app.config['CHAT_HOT_DAYS']
+        self.hot_max_messages = app.config['CHAT_HOT_MAX_MESSAGES']
+        self.batch_size = app.config['CHAT_ARCHIVE_BATCH_SIZE']
+        self.max_batches = app.config['CHAT_ARCHIVE_MAX_BATCHES']
+        self.interval = app.config['CHAT_ARCHIVE_INTERVAL']
+        self.pause = app.config['CHAT_ARCHIVE_PAUSE']
+
+        @app.cli.command('chat-archive')
+        def archive_command():
+            """Move chat messages outside the hot window into archive segments."""
+            total = moved = self.run_once(pause=0)
+            while moved:
+                moved = self.run_once(pause=0)
+                total += moved
+            print(f"Archived {total} message(s).")
+
+        # One archiver is enough; with several workers the others leave it to worker 0
+        if int(app.config.get('WORKER_INDEX', 0)) == 0:
+            socketio.start_background_task(self._run)
+
+    def cutoff(self, board_id):
+        """(timestamp, id) below which this board's messages are outside the hot window, or None."""
+        bounds = []
+        if self.hot_days:
+            bounds.append((datetime.utcnow() - timedelta(days=self.hot_days), 0))
+        if self.hot_max_messages:
+            oldest_kept = db.session.query(ChatMessage.timestamp, ChatMessage.id).filter(
+                ChatMessage.board_id == board_id
+            ).order_by(
+                ChatMessage.timestamp.desc(), ChatMessage.id.desc()
+            ).offset(self.hot_max_messages - 1).limit(1).first()
+            if oldest_kept is not None:
+                bounds.append(tuple(oldest_kept))
+        return max(bounds) if bounds else None
+
+    def due_boards(self):
+        # Boards with anything to move: too many messages, or some past the age limit
+        conditions = []
+        if self.hot_max_messages:
+            conditions.append(db.func.count(ChatMessage.id) > self.hot_max_messages)
+        if self.hot_days:
+            conditions.append(db.func.min(ChatMessage.timestamp) < datetime.utcnow() - timedelta(days=self.hot_days))
+        if not conditions:
+            return []
+        rows = db.session.query(ChatMessage.board_id).group_by(ChatMessage.board_id).having(db.or_(*conditions))
+        return [row.board_id for row in rows]
+
+    def archive_batch(self, board_id, cutoff):
+        rows = db.session.query(
+            ChatMessage.id, ChatMessage.user_id, ChatMessage.message, ChatMessage.timestamp
+        ).filter(
+            ChatMessage.board_id == board_id,
+            tuple_(ChatMessage.timestamp, ChatMessage.id) < cutoff
+        ).order_by(ChatMessage.timestamp, ChatMessage.id).limit(self.batch_size).all()
+        if not rows:
+            return 0
+
+        first, last = rows[0], rows[-1]
+        path = f"{board_id}/{first.id}-{last.id}.ndjson.gz"
+        byte_size = self._write_segment(path, rows)
+        db.session.add(ChatArchiveSegment(
+            board_id=board_id, path=path,
+            first_id=first.id, last_id=last.id,
+            first_timestamp=first.timestamp, last_timestamp=last.timestamp,
+            message_count=len(rows), byte_size=byte_size
+        ))
+        # By id rather than by range: an import may have added old messages since the SELECT.
+        # The chat_message_fts_ad trigger drops them from the search index too.
+        ChatMessage.query.filter(ChatMessage.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+        db.session.commit()
+
+        self.segments_written += 1
+        self.archived += len(rows)
+        return len(rows)
+
+    def _write_segment(self, path, rows):
+        full_path = self._full_path(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        tmp_path = full_path + '.tmp'
+        with open(tmp_path, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as out:
+                for row in rows:
+                    out.write(json.dumps({
+                        'id': row.id, 'user_id': row.user_id, 'message': row.message,
+                        'timestamp': row.timestamp.isoformat()
+                    }, separators=(',', ':')).encode('utf-8') + b'\n')
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, full_path)
+        return os.path.getsize(full_path)
+
+    def _full_path(self, path):
+        return os.path.join(self.directory, *path.split('/'))
+
+    def read_segment(self, segment):
+        self.segments_read += 1
+        with gzip.open(self._full_path(segment.path), 'rt', encoding='utf-8') as lines:
+            return [
+                ArchivedMessage(row['id'], row['user_id'], row['message'], datetime.fromisoformat(row['timestamp']))
+                for row in map(json.loads, lines)
+            ]
+
+    def history(self, board_id, before=None, limit=50):
+        """Archived messages older than the (timestamp, id) `before`, newest first."""
+        query = ChatArchiveSegment.query.filter(ChatArchiveSegment.board_id == board_id)
+        if before is not None:
+            query = query.filter(tuple_(ChatArchiveSegment.first_timestamp, ChatArchiveSegment.first_id) < before)
+        segments = query.order_by(ChatArchiveSegment.last_timestamp.desc(), ChatArchiveSegment.last_id.desc())
+
+        messages = []
+        for segment in segments:
+            # Segments normally cover disjoint ranges, but imported history can
+            # overlap older ones, so stop only once nothing left can be newer
+            if len(messages) >= limit and (segment.last_timestamp, segment.last_id) < (messages[-1].timestamp, messages[-1].id):
+                break
+            messages.extend(m for m in self.read_segment(segment) if before is None or (m.timestamp, m.id) < before)
+            messages.sort(key=lambda m: (m.timestamp, m.id), reverse=True)
+            del messages[limit:]
+        return messages
+
+    def iter_messages(self, board_id):
+        # Every archived message of the board, one segment in memory at a time
+        segments = ChatArchiveSegment.query.filter(ChatArchiveSegment.board_id == board_id).order_by(
+            ChatArchiveSegment.first_timestamp, ChatArchiveSegment.first_id
+        ).all()
+        for segment in segments:
+            yield from self.read_segment(segment)
+
+    def run_once(self, pause=None):
+        pause = self.pause if pause is None else pause
+        started = time.monotonic()
+        moved = batches = 0
+        for board_id in self.due_boards():
+            cutoff = self.cutoff(board_id)
+            while cutoff is not None and batches < self.max_batches:
+                count = self.archive_batch(board_id, cutoff)
+                if not count:
+                    break
+                moved += count
+                batches += 1
+                if pause:
+                    socketio.sleep(pause)
+            if batches >= self.max_batches:
+                break
+        self.runs += 1
+        self.last_run_seconds = time.monotonic() - started
+        return moved
+
+    def stats(self):
+        return {
+            'runs': self.runs,
+            'archived': self.archived,
+            'segments_written': self.segments_written,
+            'segments_read': self.segments_read,
+            'failures': self.failures,
+            'last_run_seconds': self.last_run_seconds,
+        }
+
+    def _run(self):
+        while True:
+            socketio.sleep(self.interval)
+            with self.app.app_context():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    db.session.rollback()
+                    self.failures += 1
+                    self.app.logger.error(f"Chat archival failed: {e}")
+                db.session.remove()
+
+
+chat_archive = ChatArchive()
@@ -0,0 +1,216 @@
+import atexit
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+
+from extensions import db, socketio
+from models import ChatArchiveSegment, ChatMessage
+
+# Write-behind persistence for chat. on_chat_message assigns the id and
+# timestamp here, broadcasts straight away, and leaves the INSERT to a
+# background task that commits whatever has queued up as one transaction.
+#
+# Ids come from an in-process counter seeded from the highest id in
+# chat_message or in the archive segments: chat_archive can move a board's
+# newest rows out of chat_message, and their ids must not be handed out again.
+# With several workers each one takes every WORKER_COUNT-th id starting at its
+# WORKER_INDEX, so their ranges never collide.
+#
+# A batch that fails to insert goes back to the front of the queue. Once it
+# has failed CHAT_FLUSH_MAX_ATTEMPTS times in a row it is split and written one
+# message at a time, and the messages that still fail are dropped and logged
+# (dead-lettered). Connection errors and "database is locked" stop the split and
+# keep everything queued, since nothing would get through. While the queue is at
+# CHAT_QUEUE_MAX and an inline flush can't drain it, new messages are refused.
+
+
+class ChatWriter:
+    def __init__(self):
+        self.app = None
+        self.flush_interval = 0.02
+        self.batch_size = 200
+        self.max_queue = 10000
+        self.max_attempts = 3
+        self.max_message_length = 4000
+        self._queue = deque()
+        self._queue_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._next_id = None
+        self.id_stride = 1
+        self.id_offset = 0
+        # Metrics
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.inline_flushes = 0
+        self.rejected = 0
+        self.dead_lettered = 0
+        self._head_failures = 0
+        self.last_batch_size = 0
+        self.max_lag = 0.0
+
+    def init_app(self, app):
+        app.config.setdefault('CHAT_FLUSH_INTERVAL_MS', 20)
+        app.config.setdefault('CHAT_FLUSH_BATCH_SIZE', 200)
+        app.config.setdefault('CHAT_QUEUE_MAX', 10000)
+        app.config.setdefault('CHAT_FLUSH_MAX_ATTEMPTS', 3)
+        app.config.setdefault('CHAT_MESSAGE_MAX_LENGTH', 4000)
+        self.app = app
+        self.flush_interval = app.config['CHAT_FLUSH_INTERVAL_MS'] / 1000.0
+        self.batch_size = app.config['CHAT_FLUSH_BATCH_SIZE']
+        self.max_queue = app.config['CHAT_QUEUE_MAX']
+        self.max_attempts = app.config['CHAT_FLUSH_MAX_ATTEMPTS']
+        self.max_message_length = app.config['CHAT_MESSAGE_MAX_LENGTH']
+        self.id_stride = max(int(app.config.get('WORKER_COUNT', 1)), 1)
+        self.id_offset = int(app.config.get('WORKER_INDEX', 0)) % self.id_stride
+        socketio.start_background_task(self._run)
+        atexit.register(self.shutdown)
+
+    def allocate_id(self):
+        # Also used by board imports, so their rows never take an id this worker will hand out
+        if self._next_id is None:
+            max_id = max(
+                db.session.query(db.func.max(ChatMessage.id)).scalar() or 0,
+                db.session.query(db.func.max(ChatArchiveSegment.last_id)).scalar() or 0
+            )
+            with self._queue_lock:
+                if self._next_id is None:
+                    # First id above max_id that belongs to this worker
+                    self._next_id = max_id + 1 + (self.id_offset - (max_id + 1)) % self.id_stride
+        with self._queue_lock:
+            message_id = self._next_id
+            self._next_id += self.id_stride
+            return message_id
+
+    def enqueue(self, board_id, user_id, message):
+        """Queues a message and returns its row, or None if the queue is full."""
+        # The writer has fallen behind; persist inline so the queue stays bounded.
+        # Not while inserts are failing: that would stall every sender as well.
+        if len(self._queue) >= self.max_queue:
+            if not self._head_failures:
+                self.inline_flushes += 1
+                self.flush()
+            if len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                return None
+
+        row = {
+            'id': self.allocate_id(),
+            'board_id': int(board_id),
+            'user_id': int(user_id),
+            'message': message,
+            'timestamp': datetime.utcnow(),
+        }
+        with self._queue_lock:
+            self._queue.append((time.monotonic(), row))
+            self.enqueued += 1
+        return row
+
+    def flush(self):
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._queue_lock:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                if not batch:
+                    return written
+
+                try:
+                    db.session.execute(insert(ChatMessage), [row for _, row in batch])
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    self.failures += 1
+                    self._head_failures += 1
+                    if self.app:
+                        self.app.logger.error(f"Chat batch insert failed ({len(batch)} messages): {e}")
+                    if self._head_failures >= self.max_attempts:
+                        count, batch = self._write_singly(batch)
+                        written += count
+                        if batch:
+                            # Still failing as a whole: the database is unreachable or locked
+                            with self._queue_lock:
+                                self._queue.extendleft(reversed(batch))
+                            return written
+                        self._head_failures = 0
+                        continue
+                    # Put the batch back in order and retry on the next tick
+                    with self._queue_lock:
+                        self._queue.extendleft(reversed(batch))
+                    return written
+
+                self._head_failures = 0
+                self._record(batch[0][0], len(batch))
+                written += len(batch)
+
+    def _write_singly(self, batch):
+        # Splits a batch that keeps failing. Returns (messages written, what is
+        # left to retry); the latter is empty unless a connection-level error
+        # means nothing can be written right now.
+        written = 0
+        for index, (enqueued_at, row) in enumerate(batch):
+            try:
+                db.session.execute(insert(ChatMessage), [row])
+                db.session.commit()
+            except OperationalError:
+                db.session.rollback()
+                return written, batch[index:]
+            except Exception as e:
+                db.session.rollback()
+                self.dead_lettered += 1
+                if self.app:
+                    self.app.logger.error(
+                        f"Dropping chat message {row['id']} on board {row['board_id']} "
+                        f"from user {row['user_id']}: {e}"
+                    )
+                continue
+            self._record(enqueued_at, 1)
+            written += 1
+        return written, []
+
+    def _record(self, enqueued_at, count):
+        self.max_lag = max(self.max_lag, time.monotonic() - enqueued_at)
+        self.last_batch_size = count
+        self.batches += 1
+        self.written += count
+
+    def stats(self):
+        with self._queue_lock:
+            depth = len(self._queue)
+            oldest = self._queue[0][0] if depth else None
+        return {
+            'queue_depth': depth,
+            'queue_lag_seconds': time.monotonic() - oldest if oldest is not None else 0.0,
+            'max_lag_seconds': self.max_lag,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'batches': self.batches,
+            'last_batch_size': self.last_batch_size,
+            'failures': self.failures,
+            'inline_flushes': self.inline_flushes,
+            'rejected': self.rejected,
+            'dead_lettered': self.dead_lettered,
+        }
+
+    def shutdown(self):
+        if self.app is None or not self._queue:
+            return
+        with self.app.app_context():
+            self.flush()
+
+    def _run(self):
+        while True:
+            socketio.sleep(self.flush_interval)
+            if not self._queue:
+                continue
+            with self.app.app_context():
+                self.flush()
+                db.session.remove()
+
+
+chat_writer = ChatWriter()
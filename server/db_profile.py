@@ -0,0 +1,95 @@
+import os
+
+from sqlalchemy import event
+
+# Storage profile, driven by the environment:
+#
+#   DATABASE_URL              primary database (default: sqlite:///<cwd>/collabboard.db)
+#   DATABASE_REPLICA_URL      optional read replica for list endpoints (see read_options)
+#
+# SQLite (each connection gets these PRAGMAs on connect):
+#   SQLITE_JOURNAL_MODE       WAL           readers no longer block the writer
+#   SQLITE_SYNCHRONOUS        NORMAL        fsync at checkpoints only; safe with WAL
+#   SQLITE_BUSY_TIMEOUT_MS    5000          wait for the write lock instead of "database is locked"
+#   SQLITE_MMAP_SIZE          268435456     bytes of the file read through mmap
+#
+# Server databases (PostgreSQL, MySQL, ...):
+#   DB_POOL_SIZE 10, DB_MAX_OVERFLOW 20, DB_POOL_TIMEOUT 30, DB_POOL_RECYCLE 1800, DB_POOL_PRE_PING 1
+
+REPLICA_BIND = 'replica'
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, default) not in ('0', 'false', 'False', 'no')
+
+
+class DatabaseProfile:
+    def __init__(self):
+        self.app = None
+        self.replica_engine = None
+
+    def configure(self, app):
+        """Fills in the SQLALCHEMY_* config; call before db.init_app()."""
+        default_url = 'sqlite:///' + os.path.join(os.getcwd(), 'collabboard.db')
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', default_url)
+        app.config['SQLITE_JOURNAL_MODE'] = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+        app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+        app.config['SQLITE_BUSY_TIMEOUT_MS'] = _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)
+        app.config['SQLITE_MMAP_SIZE'] = _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+
+        # Options follow each bind's own dialect, so the primary and the replica
+        # can be different kinds of database
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = self.engine_options(app, app.config['SQLALCHEMY_DATABASE_URI'])
+
+        replica_url = os.environ.get('DATABASE_REPLICA_URL')
+        if replica_url:
+            app.config['SQLALCHEMY_BINDS'] = {
+                REPLICA_BIND: dict(self.engine_options(app, replica_url), url=replica_url)
+            }
+
+    def engine_options(self, app, url):
+        if url.startswith('sqlite'):
+            return {
+                # pysqlite's own lock wait, in seconds; the PRAGMA below covers the rest
+                'connect_args': {'timeout': app.config['SQLITE_BUSY_TIMEOUT_MS'] / 1000.0},
+            }
+        return {
+            'pool_size': _env_int('DB_POOL_SIZE', 10),
+            'max_overflow': _env_int('DB_MAX_OVERFLOW', 20),
+            'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+            'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+            'pool_pre_ping': _env_flag('DB_POOL_PRE_PING', '1'),
+        }
+
+    def init_app(self, app, db):
+        self.app = app
+        with app.app_context():
+            for engine in db.engines.values():
+                if engine.dialect.name == 'sqlite':
+                    event.listen(engine, 'connect', self._sqlite_pragmas)
+            self.replica_engine = db.engines.get(REPLICA_BIND)
+
+    def _sqlite_pragmas(self, dbapi_connection, connection_record):
+        config = self.app.config
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT_MS'])}")
+            cursor.execute(f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}")
+            cursor.execute(f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}")
+            cursor.execute(f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}")
+        finally:
+            cursor.close()
+
+    def read_options(self):
+        # bind_arguments for db.session.execute() on read-only endpoints that can
+        # tolerate replica lag; empty (primary) when no replica is configured
+        if self.replica_engine is None:
+            return {}
+        return {'bind': self.replica_engine}
+
+
+db_profile = DatabaseProfile()
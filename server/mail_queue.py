@@ -0,0 +1,204 @@
+import json
+import random
+import smtplib
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from flask_mail import Message
+
+from extensions import db, mail, socketio
+from models import OutboundMail
+
+# Outbound e-mail queue. Request handlers add an OutboundMail row in their own
+# transaction (so an invite and its e-mail commit or roll back together) and
+# return; a worker thread claims due rows in batches and sends each batch over
+# one SMTP connection.
+#
+# - A claimed row is 'sending' with next_attempt_at set to a lease expiry; if a
+#   worker dies mid-batch the lease runs out and the row is claimed again.
+# - Temporary failures go back to 'pending' with exponential backoff.
+# - Permanent SMTP rejections (5xx) and rows that ran out of attempts end up
+#   'dead' with last_error kept for inspection; `flask mail-retry-dead` requeues them.
+#
+# SMTP is blocking, and the eventlet server does not monkey-patch sockets, so
+# the worker is a real thread rather than a socketio background task.
+
+
+class MailQueue:
+    def __init__(self):
+        self.app = None
+        self.poll_interval = 1.0
+        self.batch_size = 50
+        self.max_attempts = 6
+        self.retry_base = 30.0
+        self.retry_max = 3600.0
+        self.lease = 300.0
+        self._wake = threading.Event()
+        self._thread = None
+        # Metrics
+        self.sent = 0
+        self.failures = 0
+        self.dead = 0
+        self.batches = 0
+        self.connect_failures = 0
+        self.last_batch_size = 0
+
+    def init_app(self, app):
+        app.config.setdefault('MAIL_QUEUE_POLL_INTERVAL', 1.0)
+        app.config.setdefault('MAIL_QUEUE_BATCH_SIZE', 50)
+        app.config.setdefault('MAIL_QUEUE_MAX_ATTEMPTS', 6)
+        app.config.setdefault('MAIL_QUEUE_RETRY_BASE', 30.0)
+        app.config.setdefault('MAIL_QUEUE_RETRY_MAX', 3600.0)
+        app.config.setdefault('MAIL_QUEUE_LEASE', 300.0)
+        self.app = app
+        self.poll_interval = app.config['MAIL_QUEUE_POLL_INTERVAL']
+        self.batch_size = app.config['MAIL_QUEUE_BATCH_SIZE']
+        self.max_attempts = app.config['MAIL_QUEUE_MAX_ATTEMPTS']
+        self.retry_base = app.config['MAIL_QUEUE_RETRY_BASE']
+        self.retry_max = app.config['MAIL_QUEUE_RETRY_MAX']
+        self.lease = app.config['MAIL_QUEUE_LEASE']
+
+        @app.cli.command('mail-retry-dead')
+        def retry_dead_command():
+            """Move dead-lettered mail back to the queue."""
+            print(f"Requeued {self.retry_dead()} message(s).")
+
+        # Started from a background task so CLI commands (flask db upgrade, ...)
+        # never spin up the worker, same as the other background loops
+        socketio.start_background_task(self._start)
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='mail-queue', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, subject, recipients, body):
+        # Added to the caller's session; nothing is sent unless the caller commits
+        row = OutboundMail(recipients=json.dumps(list(recipients)), subject=subject, body=body)
+        db.session.add(row)
+        self._wake.set()
+        return row
+
+    def claim(self):
+        now = datetime.utcnow()
+        token = str(uuid.uuid4())
+        # 'sending' rows past their lease belong to a worker that died mid-batch
+        due = db.select(OutboundMail.id).where(
+            OutboundMail.status.in_(('pending', 'sending')),
+            OutboundMail.next_attempt_at <= now
+        ).order_by(OutboundMail.next_attempt_at).limit(self.batch_size)
+        # The conditions are repeated so two workers can never claim the same row
+        claimed = OutboundMail.query.filter(
+            OutboundMail.id.in_(due),
+            OutboundMail.status.in_(('pending', 'sending')),
+            OutboundMail.next_attempt_at <= now
+        ).update({
+            OutboundMail.status: 'sending',
+            OutboundMail.claim_token: token,
+            OutboundMail.next_attempt_at: now + timedelta(seconds=self.lease),
+            OutboundMail.attempts: OutboundMail.attempts + 1,
+        }, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            return []
+        return OutboundMail.query.filter_by(claim_token=token, status='sending').order_by(OutboundMail.id).all()
+
+    def deliver(self, batch):
+        try:
+            with mail.connect() as conn:
+                for row in batch:
+                    try:
+                        conn.send(Message(row.subject, recipients=json.loads(row.recipients), body=row.body))
+                    except smtplib.SMTPServerDisconnected:
+                        raise
+                    except smtplib.SMTPResponseException as e:
+                        self._failed(row, e, permanent=e.smtp_code >= 500)
+                    except smtplib.SMTPRecipientsRefused as e:
+                        codes = [code for code, _ in e.recipients.values()]
+                        self._failed(row, e, permanent=all(code >= 500 for code in codes))
+                    except Exception as e:
+                        self._failed(row, e)
+                    else:
+                        row.status = 'sent'
+                        row.sent_at = datetime.utcnow()
+                        row.claim_token = None
+                        row.last_error = None
+                        self.sent += 1
+        except Exception as e:
+            # Could not connect, or lost the connection: retry whatever is left
+            self.connect_failures += 1
+            for row in batch:
+                if row.status == 'sending':
+                    self._failed(row, e)
+        db.session.commit()
+        self.batches += 1
+        self.last_batch_size = len(batch)
+
+    def _failed(self, row, error, permanent=False):
+        self.failures += 1
+        row.claim_token = None
+        row.last_error = f"{type(error).__name__}: {error}"[:1000]
+        if permanent or row.attempts >= self.max_attempts:
+            row.status = 'dead'
+            self.dead += 1
+            self.app.logger.warning(f"Mail {row.id} dead-lettered after {row.attempts} attempt(s): {row.last_error}")
+            return
+        # Exponential backoff with a little jitter so a flood of failures spreads out
+        delay = min(self.retry_max, self.retry_base * 2 ** (row.attempts - 1)) * random.uniform(1.0, 1.25)
+        row.status = 'pending'
+        row.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+
+    def retry_dead(self, ids=None):
+        query = OutboundMail.query.filter(OutboundMail.status == 'dead')
+        if ids:
+            query = query.filter(OutboundMail.id.in_(ids))
+        count = query.update({
+            OutboundMail.status: 'pending',
+            OutboundMail.attempts: 0,
+            OutboundMail.next_attempt_at: datetime.utcnow(),
+        }, synchronize_session=False)
+        db.session.commit()
+        self._wake.set()
+        return count
+
+    def drain(self):
+        delivered = 0
+        while True:
+            batch = self.claim()
+            if not batch:
+                return delivered
+            self.deliver(batch)
+            delivered += len(batch)
+
+    def stats(self):
+        counts = dict(db.session.query(OutboundMail.status, db.func.count(OutboundMail.id)).filter(
+            OutboundMail.status.in_(('pending', 'sending', 'dead'))
+        ).group_by(OutboundMail.status).all())
+        return {
+            'pending': counts.get('pending', 0),
+            'sending': counts.get('sending', 0),
+            'dead_letter': counts.get('dead', 0),
+            'sent': self.sent,
+            'failures': self.failures,
+            'dead_lettered': self.dead,
+            'connect_failures': self.connect_failures,
+            'batches': self.batches,
+            'last_batch_size': self.last_batch_size,
+        }
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    self.drain()
+                except Exception as e:
+                    db.session.rollback()
+                    self.app.logger.error(f"Mail queue run failed: {e}")
+                finally:
+                    db.session.remove()
+
+
+mail_queue = MailQueue()
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from extensions import db
+from models import BoardMember
+
+# In-process cache of board memberships keyed by (board_id, user_id), so the
+# permission check at the top of every handler doesn't cost a DB round trip.
+# Non-members are cached too. Entries expire after a TTL, which also bounds how
+# long another worker process can serve a stale answer; within this process the
+# code paths that change membership invalidate explicitly.
+
+Membership = namedtuple('Membership', ['role', 'status'])
+
+_MISSING = object()
+
+
+class MembershipCache:
+    def __init__(self, maxsize=10000, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # (board_id, user_id) -> (expires_at, Membership or None)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('MEMBERSHIP_CACHE_SIZE', 10000)
+        app.config.setdefault('MEMBERSHIP_CACHE_TTL', 60.0)
+        self.maxsize = app.config['MEMBERSHIP_CACHE_SIZE']
+        self.ttl = app.config['MEMBERSHIP_CACHE_TTL']
+        self.clear()
+
+    def get(self, board_id, user_id):
+        try:
+            key = (int(board_id), int(user_id))
+        except (TypeError, ValueError):
+            return None
+
+        cached = self._lookup(key)
+        if cached is not _MISSING:
+            return cached
+
+        rows = db.session.query(BoardMember.role, BoardMember.status).filter_by(
+            board_id=key[0], user_id=key[1]
+        ).all()
+        # A user can have both an invite row and a member row; the member row wins
+        row = next((r for r in rows if r.status == 'member'), rows[0] if rows else None)
+        membership = Membership(row.role, row.status) if row else None
+        self._store(key, membership)
+        return membership
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _store(self, key, membership):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, membership)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, board_id, user_id=None):
+        with self._lock:
+            if user_id is not None:
+                self._entries.pop((int(board_id), int(user_id)), None)
+                return
+            for key in [k for k in self._entries if k[0] == int(board_id)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+            }
+
+
+member_cache = MembershipCache()
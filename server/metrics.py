@@ -0,0 +1,273 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+from functools import wraps
+
+from flask import Response, g, has_app_context, request
+from sqlalchemy import event
+
+# Request/socket instrumentation and a Prometheus text endpoint.
+#
+# - HTTP requests and socket events are timed into histograms per endpoint/event.
+# - SQLAlchemy cursor events count queries and their time per request.
+# - Request logs are structured (one JSON object per line), sampled, and go
+#   through a QueueHandler so the eventlet loop never blocks on stdout.
+# - GET /metrics renders everything in Prometheus text format (loopback only
+#   unless METRICS_ALLOW_REMOTE is set).
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+LOCAL_ADDRESSES = ('127.0.0.1', '::1', 'localhost')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + (list(extra) if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted(self._series.items())
+        for label_values, series in items:
+            labels = list(zip(self.label_names, label_values))
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{_format_labels(labels, [("le", bound)])} {count}')
+            lines.append(f'{self.name}_bucket{_format_labels(labels, [("le", "+Inf")])} {series[-1]}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {series[-2]}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {series[-1]}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f'{self.name}{_format_labels(zip(self.label_names, label_values))} {value}')
+        return lines
+
+
+class Metrics:
+    def __init__(self):
+        self.app = None
+        self.sample_rate = 0.01
+        self.slow_threshold = 0.5
+        self.logger = logging.getLogger('collabboard.requests')
+        self._listener = None
+        self._collectors = []
+
+        self.http_latency = Histogram(
+            'collabboard_http_request_duration_seconds', 'HTTP request latency.', ('endpoint', 'method', 'status'))
+        self.http_db_queries = Histogram(
+            'collabboard_http_request_db_queries', 'SQL statements executed per HTTP request.', ('endpoint',), COUNT_BUCKETS)
+        self.http_db_time = Histogram(
+            'collabboard_http_request_db_duration_seconds', 'Time spent in SQL per HTTP request.', ('endpoint',))
+        self.socket_latency = Histogram(
+            'collabboard_socket_event_duration_seconds', 'Socket.IO event handler latency.', ('event',))
+        self.socket_db_queries = Histogram(
+            'collabboard_socket_event_db_queries', 'SQL statements executed per socket event.', ('event',), COUNT_BUCKETS)
+        self.socket_errors = Counter(
+            'collabboard_socket_event_errors_total', 'Socket.IO event handlers that raised.', ('event',))
+        self.socket_throttled = Counter(
+            'collabboard_socket_throttled_total', 'Socket events rejected or deferred by rate limits.', ('event', 'scope', 'board_id'))
+        self.db_queries = Counter(
+            'collabboard_db_queries_total', 'SQL statements executed, by context.', ('context',))
+        self.password_hash_duration = Histogram(
+            'collabboard_password_hash_duration_seconds', 'Time spent hashing or verifying a password.', ('operation',))
+        self.password_hash_wait = Histogram(
+            'collabboard_password_hash_queue_seconds', 'Time a password hash job waited for a pool thread.', ('operation',))
+
+    def init_app(self, app, db):
+        app.config.setdefault('REQUEST_LOG_SAMPLE_RATE', 0.01)
+        app.config.setdefault('REQUEST_LOG_SLOW_MS', 500)
+        app.config.setdefault('METRICS_ALLOW_REMOTE', False)
+        self.app = app
+        self.sample_rate = app.config['REQUEST_LOG_SAMPLE_RATE']
+        self.slow_threshold = app.config['REQUEST_LOG_SLOW_MS'] / 1000.0
+        self._setup_logging()
+
+        with app.app_context():
+            # Every engine, including the read replica when one is configured
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def register_collector(self, prefix, collect, counters=()):
+        # collect() returns a flat dict of numbers. Keys in counters only ever go up
+        # and are exported as counters <prefix>_<key>_total, the rest as gauges <prefix>_<key>
+        self._collectors.append((prefix, collect, frozenset(counters)))
+
+    def _setup_logging(self):
+        if self._listener is not None:
+            return
+        log_queue = queue.SimpleQueue()
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self._listener = logging.handlers.QueueListener(log_queue, handler)
+        self._listener.start()
+        atexit.register(self._listener.stop)
+
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    # --- SQLAlchemy ---
+
+    # The start time rides on the statement's execution context, so a statement
+    # that fails (no after_cursor_execute) leaves nothing behind on the connection
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_query_start', None)
+        elapsed = time.perf_counter() - start if start is not None else 0.0
+        if has_app_context() and 'db_queries' in g:
+            g.db_queries += 1
+            g.db_time += elapsed
+            self.db_queries.inc(g.metrics_context)
+        else:
+            self.db_queries.inc('background')
+
+    # --- HTTP ---
+
+    def _start_request(self):
+        g.request_start = time.perf_counter()
+        g.db_queries = 0
+        g.db_time = 0.0
+        g.metrics_context = 'http'
+
+    def _finish_request(self, response):
+        if 'request_start' not in g:
+            return response
+        elapsed = time.perf_counter() - g.request_start
+        endpoint = request.endpoint or 'unmatched'
+        self.http_latency.observe(elapsed, endpoint, request.method, str(response.status_code))
+        self.http_db_queries.observe(g.db_queries, endpoint)
+        self.http_db_time.observe(g.db_time, endpoint)
+
+        if response.status_code >= 500 or elapsed >= self.slow_threshold or random.random() < self.sample_rate:
+            self.logger.info(json.dumps({
+                'ts': time.time(),
+                'type': 'http',
+                'method': request.method,
+                'path': request.path,
+                'endpoint': endpoint,
+                'status': response.status_code,
+                'duration_ms': round(elapsed * 1000, 3),
+                'db_queries': g.db_queries,
+                'db_ms': round(g.db_time * 1000, 3),
+            }))
+        return response
+
+    # --- Socket.IO ---
+
+    def timed_event(self, f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            name = request.event['message'] if getattr(request, 'event', None) else f.__name__
+            g.db_queries = 0
+            g.db_time = 0.0
+            g.metrics_context = 'socket'
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            except Exception:
+                self.socket_errors.inc(name)
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                self.socket_latency.observe(elapsed, name)
+                self.socket_db_queries.observe(g.db_queries, name)
+                if elapsed >= self.slow_threshold or random.random() < self.sample_rate:
+                    self.logger.info(json.dumps({
+                        'ts': time.time(),
+                        'type': 'socket',
+                        'event': name,
+                        'sid': request.sid,
+                        'duration_ms': round(elapsed * 1000, 3),
+                        'db_queries': g.db_queries,
+                        'db_ms': round(g.db_time * 1000, 3),
+                    }))
+        return decorated
+
+    # --- Exposition ---
+
+    def render(self):
+        lines = []
+        for metric in (self.http_latency, self.http_db_queries, self.http_db_time,
+                       self.socket_latency, self.socket_db_queries, self.socket_errors, self.socket_throttled, self.db_queries,
+                       self.password_hash_duration, self.password_hash_wait):
+            lines.extend(metric.render())
+        for prefix, collect, counters in self._collectors:
+            try:
+                values = collect()
+            except Exception:
+                continue
+            for key, value in sorted(values.items()):
+                if key in counters:
+                    name = f'collabboard_{prefix}_{key}_total'
+                    lines.append(f'# TYPE {name} counter')
+                else:
+                    name = f'collabboard_{prefix}_{key}'
+                    lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        if not self.app.config['METRICS_ALLOW_REMOTE'] and request.remote_addr not in LOCAL_ADDRESSES:
+            return Response('Not Found\n', status=404, mimetype='text/plain')
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+metrics = Metrics()
@@ -0,0 +1,28 @@
+"""Board revision and updated_at
+
+Revision ID: 3e8a6d2b91f4
+Revises: 7b1f0c9d4e2a
+Create Date: 2026-10-18 10:41:55.127840
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e8a6d2b91f4'
+down_revision = '7b1f0c9d4e2a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('board', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revision', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('board', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('revision')
@@ -0,0 +1,40 @@
+"""Membership, task and chat indexes
+
+Revision ID: 7b1f0c9d4e2a
+Revises: ce25be41277c
+Create Date: 2026-10-18 10:04:17.902311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b1f0c9d4e2a'
+down_revision = 'ce25be41277c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('board_member', schema=None) as batch_op:
+        batch_op.create_index('ix_board_member_board_id_user_id', ['board_id', 'user_id'], unique=False)
+        batch_op.create_index('ix_board_member_user_id', ['user_id'], unique=False)
+
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.create_index('ix_task_board_id', ['board_id'], unique=False)
+
+    with op.batch_alter_table('chat_message', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_message_board_id_timestamp', ['board_id', 'timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('chat_message', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_message_board_id_timestamp')
+
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_board_id')
+
+    with op.batch_alter_table('board_member', schema=None) as batch_op:
+        batch_op.drop_index('ix_board_member_user_id')
+        batch_op.drop_index('ix_board_member_board_id_user_id')
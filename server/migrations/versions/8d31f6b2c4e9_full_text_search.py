@@ -0,0 +1,65 @@
+"""Full-text search over tasks and chat
+
+Revision ID: 8d31f6b2c4e9
+Revises: 5c2f8e71a0d6
+Create Date: 2026-10-18 14:12:09.733150
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d31f6b2c4e9'
+down_revision = '5c2f8e71a0d6'
+branch_labels = None
+depends_on = None
+
+
+# SQLite FTS5 external-content indexes, kept in sync by triggers (see search.py)
+FTS_DDL = [
+    """CREATE VIRTUAL TABLE task_fts USING fts5(
+        title, description, content='task', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER task_fts_ai AFTER INSERT ON task BEGIN
+        INSERT INTO task_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER task_fts_ad AFTER DELETE ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER task_fts_au AFTER UPDATE OF title, description ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO task_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE VIRTUAL TABLE chat_message_fts USING fts5(
+        message, content='chat_message', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER chat_message_fts_ai AFTER INSERT ON chat_message BEGIN
+        INSERT INTO chat_message_fts(rowid, message) VALUES (new.id, new.message);
+    END""",
+    """CREATE TRIGGER chat_message_fts_ad AFTER DELETE ON chat_message BEGIN
+        INSERT INTO chat_message_fts(chat_message_fts, rowid, message) VALUES ('delete', old.id, old.message);
+    END""",
+    """CREATE TRIGGER chat_message_fts_au AFTER UPDATE OF message ON chat_message BEGIN
+        INSERT INTO chat_message_fts(chat_message_fts, rowid, message) VALUES ('delete', old.id, old.message);
+        INSERT INTO chat_message_fts(rowid, message) VALUES (new.id, new.message);
+    END""",
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in FTS_DDL:
+        op.execute(statement)
+    # Index the rows that already exist
+    op.execute("INSERT INTO task_fts(task_fts) VALUES ('rebuild')")
+    op.execute("INSERT INTO chat_message_fts(chat_message_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for trigger in ('task_fts_ai', 'task_fts_ad', 'task_fts_au',
+                    'chat_message_fts_ai', 'chat_message_fts_ad', 'chat_message_fts_au'):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS task_fts")
+    op.execute("DROP TABLE IF EXISTS chat_message_fts")
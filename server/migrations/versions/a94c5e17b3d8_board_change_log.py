@@ -0,0 +1,47 @@
+"""Board change log
+
+Revision ID: a94c5e17b3d8
+Revises: 3e8a6d2b91f4
+Create Date: 2026-10-18 12:27:03.561942
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a94c5e17b3d8'
+down_revision = '3e8a6d2b91f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('board_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('board_id', sa.Integer(), nullable=False),
+    sa.Column('revision', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=40), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['board_id'], ['board.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('board_id', 'revision', name='uq_board_event_board_revision')
+    )
+    with op.batch_alter_table('board', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('changes_floor', sa.Integer(), nullable=False, server_default='0'))
+
+    with op.batch_alter_table('whiteboard_op', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revision', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_whiteboard_op_board_id_revision', ['board_id', 'revision'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('whiteboard_op', schema=None) as batch_op:
+        batch_op.drop_index('ix_whiteboard_op_board_id_revision')
+        batch_op.drop_column('revision')
+
+    with op.batch_alter_table('board', schema=None) as batch_op:
+        batch_op.drop_column('changes_floor')
+
+    op.drop_table('board_event')
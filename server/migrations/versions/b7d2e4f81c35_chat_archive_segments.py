@@ -0,0 +1,42 @@
+"""Chat archive segment index
+
+Revision ID: b7d2e4f81c35
+Revises: e6b4a9d03f17
+Create Date: 2026-10-18 16:27:53.504219
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e4f81c35'
+down_revision = 'e6b4a9d03f17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('chat_archive_segment',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('board_id', sa.Integer(), nullable=False),
+    sa.Column('path', sa.String(length=255), nullable=False),
+    sa.Column('first_id', sa.Integer(), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('first_timestamp', sa.DateTime(), nullable=False),
+    sa.Column('last_timestamp', sa.DateTime(), nullable=False),
+    sa.Column('message_count', sa.Integer(), nullable=False),
+    sa.Column('byte_size', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['board_id'], ['board.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('chat_archive_segment', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_archive_segment_board_id_last_timestamp', ['board_id', 'last_timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('chat_archive_segment', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_archive_segment_board_id_last_timestamp')
+
+    op.drop_table('chat_archive_segment')
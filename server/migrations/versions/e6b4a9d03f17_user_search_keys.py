@@ -0,0 +1,62 @@
+"""Lowercased, indexed username/email for user search
+
+Revision ID: e6b4a9d03f17
+Revises: 8d31f6b2c4e9
+Create Date: 2026-10-18 15:02:41.318604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b4a9d03f17'
+down_revision = '8d31f6b2c4e9'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('username_search', sa.String(length=80), nullable=True))
+        batch_op.add_column(sa.Column('email_search', sa.String(length=120), nullable=True))
+
+    # In Python, with the model's own function: SQLite's lower() only folds ASCII,
+    # and the search query is lowercased in Python
+    from models import search_key
+
+    user = sa.table('user', sa.column('id', sa.Integer), sa.column('username', sa.String),
+                    sa.column('email', sa.String), sa.column('username_search', sa.String),
+                    sa.column('email_search', sa.String))
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(user.c.id, user.c.username, user.c.email)
+            .where(user.c.id > last_id).order_by(user.c.id).limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            user.update().where(user.c.id == sa.bindparam('user_id')).values(
+                username_search=sa.bindparam('username_key'), email_search=sa.bindparam('email_key')),
+            [{'user_id': row.id, 'username_key': search_key(row.username), 'email_key': search_key(row.email)}
+             for row in rows]
+        )
+        last_id = rows[-1].id
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('username_search', existing_type=sa.String(length=80), nullable=False)
+        batch_op.alter_column('email_search', existing_type=sa.String(length=120), nullable=False)
+        batch_op.create_index('ix_user_username_search', ['username_search'], unique=False)
+        batch_op.create_index('ix_user_email_search', ['email_search'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_email_search')
+        batch_op.drop_index('ix_user_username_search')
+        batch_op.drop_column('email_search')
+        batch_op.drop_column('username_search')
@@ -0,0 +1,30 @@
+"""Whiteboard ops no longer carry a board revision
+
+Revision ID: f3a8c61d20b7
+Revises: b7d2e4f81c35
+Create Date: 2026-10-18 19:12:40.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8c61d20b7'
+down_revision = 'b7d2e4f81c35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # /changes replays whiteboard ops by seq now; appending an op no longer
+    # bumps board.revision
+    with op.batch_alter_table('whiteboard_op', schema=None) as batch_op:
+        batch_op.drop_index('ix_whiteboard_op_board_id_revision')
+        batch_op.drop_column('revision')
+
+
+def downgrade():
+    with op.batch_alter_table('whiteboard_op', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revision', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_whiteboard_op_board_id_revision', ['board_id', 'revision'], unique=False)
@@ -1,23 +1,55 @@
 from app import db
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.orm import validates
+from whiteboard_codec import CompressedText
+
+def search_key(value):
+    # What username_search / email_search hold; the migration backfill and user_search use it too
+    return (value or '').lower()
+
+def _search_key(source):
+    # Column default deriving the key from the inserted row, so Core INSERTs get it too
+    return lambda context: search_key(context.get_current_parameters().get(source))
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
+    # Lowercased copies for the member picker's prefix search (see user_search.py)
+    username_search = db.Column(db.String(80), nullable=False, index=True, default=_search_key('username'))
+    email_search = db.Column(db.String(120), nullable=False, index=True, default=_search_key('email'))
     password_hash = db.Column(db.String(128), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     tasks_rel = db.relationship('Task', backref='board', lazy='dynamic', cascade="all, delete-orphan")
 
+    @validates('username', 'email')
+    def _sync_search_key(self, key, value):
+        setattr(self, key + '_search', search_key(value))
+        return value
+
 class Board(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    whiteboard_data = db.Column(db.Text, nullable=True) 
+    whiteboard_data = db.Column(CompressedText, nullable=True) # zlib-compressed once large, see whiteboard_codec
+    whiteboard_seq = db.Column(db.Integer, nullable=False, default=0) # Last op seq folded into whiteboard_data
+    revision = db.Column(db.Integer, nullable=False, default=0) # Bumped on every task and membership change
+    changes_floor = db.Column(db.Integer, nullable=False, default=0) # Highest revision pruned from board_event
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
     tasks_rel = db.relationship('Task', backref='parent_board', lazy='dynamic', cascade="all, delete-orphan")
 
+    @staticmethod
+    def bump_revision(board_id):
+        # Plain UPDATE so the (possibly large) whiteboard_data column is never loaded.
+        # The UPDATE holds the row's write lock, so the value read back is ours.
+        Board.query.filter_by(id=board_id).update(
+            {Board.revision: Board.revision + 1, Board.updated_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        return db.session.query(Board.revision).filter_by(id=board_id).scalar()
+
 class BoardMember(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     board_id = db.Column(db.Integer, db.ForeignKey('board.id'), nullable=False)
@@ -25,6 +57,10 @@ class BoardMember(db.Model):
     role = db.Column(db.String(20), default='member')
     status = db.Column(db.String(20), default='invited') # New column: 'invited' or 'member'
     invite_token = db.Column(db.String(120), unique=True, nullable=True) # New column for invite links
+    __table_args__ = (
+        db.Index('ix_board_member_board_id_user_id', 'board_id', 'user_id'),
+        db.Index('ix_board_member_user_id', 'user_id'),
+    )
     
 
 class Task(db.Model):
@@ -35,11 +71,62 @@ class Task(db.Model):
     assignee_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     status = db.Column(db.String(50), nullable=False, default='to_do')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    pass
+    __table_args__ = (db.Index('ix_task_board_id', 'board_id'),)
 
 class ChatMessage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     board_id = db.Column(db.Integer, db.ForeignKey('board.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     message = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.Index('ix_chat_message_board_id_timestamp', 'board_id', 'timestamp'),)
+
+class ChatArchiveSegment(db.Model):
+    # Index of the compressed files chat_archive moves old messages into; one row per file
+    id = db.Column(db.Integer, primary_key=True)
+    board_id = db.Column(db.Integer, db.ForeignKey('board.id'), nullable=False)
+    path = db.Column(db.String(255), nullable=False) # Relative to CHAT_ARCHIVE_DIR
+    first_id = db.Column(db.Integer, nullable=False)
+    last_id = db.Column(db.Integer, nullable=False)
+    first_timestamp = db.Column(db.DateTime, nullable=False)
+    last_timestamp = db.Column(db.DateTime, nullable=False)
+    message_count = db.Column(db.Integer, nullable=False)
+    byte_size = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.Index('ix_chat_archive_segment_board_id_last_timestamp', 'board_id', 'last_timestamp'),)
+
+class WhiteboardOp(db.Model):
+    # Append-only log of whiteboard edits not yet folded into Board.whiteboard_data
+    id = db.Column(db.Integer, primary_key=True)
+    board_id = db.Column(db.Integer, db.ForeignKey('board.id'), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    kind = db.Column(db.String(20), nullable=False, default='ops') # 'ops' or 'replace' (full canvas save)
+    payload = db.Column(CompressedText, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.UniqueConstraint('board_id', 'seq', name='uq_whiteboard_op_board_seq'),)
+
+class BoardEvent(db.Model):
+    # Bounded log of task and membership changes, read by GET /api/boards/<id>/changes
+    id = db.Column(db.Integer, primary_key=True)
+    board_id = db.Column(db.Integer, db.ForeignKey('board.id'), nullable=False)
+    revision = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(40), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.UniqueConstraint('board_id', 'revision', name='uq_board_event_board_revision'),)
+
+class OutboundMail(db.Model):
+    # Mail queued by request handlers and delivered by mail_queue's background worker
+    id = db.Column(db.Integer, primary_key=True)
+    recipients = db.Column(db.Text, nullable=False) # JSON list of addresses
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending') # 'pending', 'sending', 'sent' or 'dead'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow) # Retry time, or lease expiry while 'sending'
+    claim_token = db.Column(db.String(36), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    __table_args__ = (db.Index('ix_outbound_mail_status_next_attempt_at', 'status', 'next_attempt_at'),)
\ No newline at end of file
@@ -0,0 +1,106 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from extensions import socketio
+from metrics import metrics
+
+# Password hashing off the eventlet hub. scrypt/pbkdf2 take ~100ms+ of CPU by
+# design; called inline they stall every socket and request on the process.
+# Here they run on a small pool of native threads (hashlib releases the GIL)
+# while the calling green thread yields until the result is ready.
+#
+# The pool is bounded: once PASSWORD_HASH_QUEUE_MAX jobs are waiting or
+# running, new ones are refused with PasswordHasherBusy (auth returns 503)
+# instead of piling up behind a login burst.
+#
+# PASSWORD_HASH_METHOD sets the cost for new hashes (werkzeug syntax, e.g.
+# 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'). Old hashes keep verifying and
+# are upgraded on the next successful login.
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.method = 'scrypt'
+        self.pool_size = 2
+        self.max_pending = 32
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.rehashed = 0
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt')
+        app.config.setdefault('PASSWORD_HASH_POOL_SIZE', 2)
+        app.config.setdefault('PASSWORD_HASH_QUEUE_MAX', 32)
+        self.method = app.config['PASSWORD_HASH_METHOD']
+        self.pool_size = app.config['PASSWORD_HASH_POOL_SIZE']
+        self.max_pending = app.config['PASSWORD_HASH_QUEUE_MAX']
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='password-hash')
+
+    def hash(self, password):
+        return self._run('hash', generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run('verify', check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        # werkzeug stores "<method>$<salt>$<hash>". A bare method name ('scrypt')
+        # means werkzeug's default parameters, so only the algorithm is compared.
+        stored = pwhash.split('$', 1)[0]
+        if ':' in self.method:
+            return stored != self.method
+        return stored.split(':', 1)[0] != self.method
+
+    def _run(self, operation, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self._pending += 1
+
+        submitted = time.perf_counter()
+        timing = {}
+
+        def job():
+            timing['start'] = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                timing['end'] = time.perf_counter()
+
+        try:
+            future = self._executor.submit(job)
+            # Poll instead of future.result() so the hub keeps serving other green threads
+            delay = 0.001
+            while not future.done():
+                socketio.sleep(delay)
+                delay = min(delay * 2, 0.01)
+            return future.result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+            if 'end' in timing:
+                metrics.password_hash_wait.observe(timing['start'] - submitted, operation)
+                metrics.password_hash_duration.observe(timing['end'] - timing['start'], operation)
+
+    def stats(self):
+        return {
+            'pool_size': self.pool_size,
+            'queue_max': self.max_pending,
+            'in_flight': self._pending,
+            'rejected': self.rejected,
+            'rehashed': self.rehashed,
+        }
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,129 @@
+import html
+import re
+
+from sqlalchemy import DateTime, event, text
+
+from extensions import db
+
+# Full-text search over task titles/descriptions and chat history.
+#
+# Both use SQLite FTS5 external-content tables: the index stores only tokens
+# and reads the text back from task / chat_message, so nothing is duplicated.
+# Triggers keep the index in sync, which also covers the chat writer's bulk
+# Core INSERTs that ORM events would miss.
+#
+# The same DDL ships in migration 8d31f6b2c4e9; install() is for databases
+# built with db.create_all() (bench.py, scratch setups).
+
+FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS task_fts USING fts5(
+        title, description, content='task', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_ai AFTER INSERT ON task BEGIN
+        INSERT INTO task_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_ad AFTER DELETE ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_au AFTER UPDATE OF title, description ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO task_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS chat_message_fts USING fts5(
+        message, content='chat_message', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS chat_message_fts_ai AFTER INSERT ON chat_message BEGIN
+        INSERT INTO chat_message_fts(rowid, message) VALUES (new.id, new.message);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS chat_message_fts_ad AFTER DELETE ON chat_message BEGIN
+        INSERT INTO chat_message_fts(chat_message_fts, rowid, message) VALUES ('delete', old.id, old.message);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS chat_message_fts_au AFTER UPDATE OF message ON chat_message BEGIN
+        INSERT INTO chat_message_fts(chat_message_fts, rowid, message) VALUES ('delete', old.id, old.message);
+        INSERT INTO chat_message_fts(rowid, message) VALUES (new.id, new.message);
+    END""",
+]
+
+# Private-use markers around matched terms; swapped for <mark> after escaping
+MARK_OPEN, MARK_CLOSE = '\ue000', '\ue001'
+
+# Each kind walks its matches newest first (FTS5 iterates rowids in order, so
+# this stops early), keeps the first :candidates on the board, and only those
+# are ranked by bm25. Ranking every match of a common word would cost time
+# proportional to the whole table. Titles weigh 10x descriptions.
+SEARCH_SQL = {
+    'tasks': f"""
+        SELECT 'task' AS kind, id, status, NULL AS user_id, NULL AS timestamp, title, snippet, rank FROM (
+            SELECT task.id AS id, task.status AS status,
+                   highlight(task_fts, 0, '{MARK_OPEN}', '{MARK_CLOSE}') AS title,
+                   snippet(task_fts, 1, '{MARK_OPEN}', '{MARK_CLOSE}', '…', 12) AS snippet,
+                   bm25(task_fts, 10.0, 1.0) AS rank
+            FROM task_fts JOIN task ON task.id = task_fts.rowid
+            WHERE task_fts MATCH :query AND task.board_id = :board_id
+            ORDER BY task_fts.rowid DESC LIMIT :candidates
+        )""",
+    'messages': f"""
+        SELECT 'message' AS kind, id, NULL AS status, user_id, timestamp, NULL AS title, snippet, rank FROM (
+            SELECT chat_message.id AS id, chat_message.user_id AS user_id, chat_message.timestamp AS timestamp,
+                   snippet(chat_message_fts, 0, '{MARK_OPEN}', '{MARK_CLOSE}', '…', 12) AS snippet,
+                   bm25(chat_message_fts) AS rank
+            FROM chat_message_fts JOIN chat_message ON chat_message.id = chat_message_fts.rowid
+            WHERE chat_message_fts MATCH :query AND chat_message.board_id = :board_id
+            ORDER BY chat_message_fts.rowid DESC LIMIT :candidates
+        )""",
+}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def install(connection):
+    if connection.dialect.name != 'sqlite':
+        return
+    for statement in FTS_DDL:
+        connection.exec_driver_sql(statement)
+    # Index anything that existed before the triggers did
+    connection.exec_driver_sql("INSERT INTO task_fts(task_fts) VALUES ('rebuild')")
+    connection.exec_driver_sql("INSERT INTO chat_message_fts(chat_message_fts) VALUES ('rebuild')")
+
+
+def _after_create(target, connection, **kw):
+    install(connection)
+
+
+def init_app(app):
+    # db.create_all() builds the plain tables only; add the FTS side afterwards
+    if not event.contains(db.metadata, 'after_create', _after_create):
+        event.listen(db.metadata, 'after_create', _after_create)
+
+
+def available():
+    return db.session.get_bind().dialect.name == 'sqlite'
+
+
+def match_expression(q, prefix=False):
+    """FTS5 query for free text: every word must match; with prefix, the last one may be partial."""
+    words = TOKEN_RE.findall(q or '')
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    # Prefix terms merge the doclists of every matching token, which costs
+    # several times an exact lookup on common words, so they are opt-in
+    if prefix:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def render_snippet(snippet):
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(MARK_OPEN, '<mark>').replace(MARK_CLOSE, '</mark>')
+
+
+def search(board_id, q, kinds, limit, offset, candidates, prefix=False):
+    expression = match_expression(q, prefix)
+    if expression is None:
+        return [], False
+    sql = ' UNION ALL '.join(SEARCH_SQL[kind] for kind in kinds)
+    rows = db.session.execute(
+        text(f"{sql} ORDER BY rank LIMIT :limit OFFSET :offset").columns(timestamp=DateTime),
+        {'query': expression, 'board_id': board_id, 'candidates': candidates, 'limit': limit + 1, 'offset': offset}
+    ).all()
+    return rows[:limit], len(rows) > limit
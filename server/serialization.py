@@ -0,0 +1,169 @@
+import os
+from dataclasses import dataclass
+
+from flask.json.provider import DefaultJSONProvider
+
+from extensions import db
+from models import BoardMember, Task, User
+
+try:
+    import orjson
+except ImportError:  # optional; falls back to the stdlib encoder
+    orjson = None
+
+# Payload shapes shared by the REST endpoints, socket emits and the change log,
+# and the JSON encoder they go through.
+#
+# DTOs are slotted dataclasses filled straight from column-only SELECTs
+# (select_tasks() etc.), so listing a board's tasks never builds ORM entities,
+# identity-map entries or attribute-instrumentation state. to_dict() gives the
+# wire shape; the JSON encoders call it themselves, so DTOs can be passed to
+# jsonify() and socket emits as they are.
+#
+# JSON_BACKEND picks the encoder for jsonify() and Socket.IO packets: 'orjson'
+# (the default when it is installed) or 'json' for the stdlib one. Output is the
+# same either way, apart from key order and whitespace.
+
+
+@dataclass(slots=True)
+class TaskDTO:
+    id: int
+    title: str
+    description: str
+    assignee_id: int
+    status: str
+    board_id: int
+
+    @classmethod
+    def from_model(cls, task):
+        return cls(task.id, task.title, task.description, task.assignee_id, task.status, task.board_id)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'assignee_id': self.assignee_id,
+            'status': self.status,
+            'board_id': self.board_id
+        }
+
+
+@dataclass(slots=True)
+class MemberDTO:
+    # GET /api/boards/<id>/members
+    id: int
+    username: str
+    role: str
+
+    def to_dict(self):
+        return {'id': self.id, 'username': self.username, 'role': self.role}
+
+
+@dataclass(slots=True)
+class MembershipDTO:
+    # Membership entries in the change log and change snapshots
+    user_id: int
+    role: str
+    status: str
+
+    def to_dict(self):
+        return {'user_id': self.user_id, 'role': self.role, 'status': self.status}
+
+
+TASK_COLUMNS = (Task.id, Task.title, Task.description, Task.assignee_id, Task.status, Task.board_id)
+
+
+def select_tasks(board_id, bind_arguments=None):
+    rows = db.session.execute(
+        db.select(*TASK_COLUMNS).where(Task.board_id == board_id).order_by(Task.id),
+        bind_arguments=bind_arguments
+    )
+    return [TaskDTO(*row) for row in rows]
+
+
+def select_members(board_id, bind_arguments=None):
+    rows = db.session.execute(
+        db.select(User.id, User.username, BoardMember.role).join(
+            BoardMember, BoardMember.user_id == User.id
+        ).where(BoardMember.board_id == board_id).order_by(BoardMember.id),
+        bind_arguments=bind_arguments
+    )
+    return [MemberDTO(*row) for row in rows]
+
+
+def select_memberships(board_id):
+    rows = db.session.execute(
+        db.select(BoardMember.user_id, BoardMember.role, BoardMember.status)
+        .where(BoardMember.board_id == board_id).order_by(BoardMember.id)
+    )
+    return [MembershipDTO(*row) for row in rows]
+
+
+# --- Encoding ---
+
+# Datetimes go through Flask's default hook (HTTP dates), as they did before.
+# DTOs go through to_dict(): orjson's generic path for slotted dataclasses
+# looks every field up by name and is slower than the hand-written dict.
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+) if orjson else 0
+
+
+def _default(obj):
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    return DefaultJSONProvider.default(obj)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson when JSON_BACKEND is 'orjson'."""
+
+    def __init__(self, app, backend):
+        super().__init__(app)
+        self.fast = backend == 'orjson' and orjson is not None
+
+    def dumps(self, obj, **kwargs):
+        if self.fast and not kwargs:
+            return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS).decode('utf-8')
+        kwargs.setdefault('default', _default)
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.fast and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if not self.fast or self._app.debug:
+            # The stdlib path keeps pretty-printing in debug mode
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE),
+            mimetype=self.mimetype
+        )
+
+
+class SocketJSON:
+    """json-module stand-in for Socket.IO packets (SocketIO(json=...))."""
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS).decode('utf-8')
+
+    @staticmethod
+    def loads(s, *args, **kwargs):
+        return orjson.loads(s)
+
+
+def init_app(app):
+    app.config.setdefault('JSON_BACKEND', os.environ.get('JSON_BACKEND', 'orjson' if orjson else 'json'))
+    app.json = FastJSONProvider(app, app.config['JSON_BACKEND'])
+
+
+def socketio_options(app):
+    # Extra SocketIO.init_app() kwargs for the configured backend
+    if app.json.fast:
+        return {'json': SocketJSON}
+    return {}
@@ -0,0 +1,96 @@
+import threading
+import time
+from functools import wraps
+
+from flask import g, request
+from flask_jwt_extended import decode_token
+from flask_socketio import disconnect, emit
+
+from extensions import db
+from models import BoardMember, User
+from membership_cache import member_cache
+
+# Socket connections authenticate once: handle_connect decodes the JWT from
+# `auth.token` and binds the identity and the user's board memberships to the
+# sid. Event handlers wrapped in @socket_authenticated read that session from
+# `g.socket_session` instead of decoding and verifying the token again; only
+# the cached expiry is checked per event.
+
+
+class SocketSession:
+    __slots__ = ('user_id', 'username', 'expires_at', 'boards')
+
+    def __init__(self, user_id, username, expires_at, boards):
+        self.user_id = user_id
+        self.username = username
+        self.expires_at = expires_at
+        self.boards = boards
+
+    @property
+    def expired(self):
+        return self.expires_at is not None and time.time() >= self.expires_at
+
+    def is_member(self, board_id):
+        try:
+            board_id = int(board_id)
+        except (TypeError, ValueError):
+            return False
+        if board_id in self.boards:
+            return True
+        # Memberships gained after connecting (e.g. an accepted invite)
+        membership = member_cache.get(board_id, self.user_id)
+        if membership and membership.status == 'member':
+            self.boards.add(board_id)
+            return True
+        return False
+
+
+class SocketSessions:
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def bind(self, sid, token):
+        # Raises if the token is invalid or expired
+        claims = decode_token(token)
+        user_id = int(claims['sub'])
+        user = db.session.get(User, user_id)
+        if user is None:
+            raise ValueError("Unknown user")
+
+        board_ids = db.session.query(BoardMember.board_id).filter_by(user_id=user_id, status='member')
+        session = SocketSession(user_id, user.username, claims.get('exp'), {row.board_id for row in board_ids})
+        with self._lock:
+            self._sessions[sid] = session
+        return session
+
+    def get(self, sid):
+        return self._sessions.get(sid)
+
+    def drop(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+socket_sessions = SocketSessions()
+
+
+def socket_authenticated(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        session = socket_sessions.get(request.sid)
+        if session is None:
+            disconnect()
+            return
+        if session.expired:
+            # The client has to reconnect with a fresh token
+            socket_sessions.drop(request.sid)
+            emit('auth_expired', {'msg': 'Token has expired'})
+            disconnect()
+            return
+        g.socket_session = session
+        return f(*args, **kwargs)
+    return decorated
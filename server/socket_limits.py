@@ -0,0 +1,292 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from extensions import db, socketio
+from metrics import metrics
+from whiteboard_fanout import RoomBuffer
+from whiteboard_sync import MAX_OPS_PER_MESSAGE
+
+# Token-bucket limits on inbound socket events, per connection (sid) and per
+# board room, configured per event in SOCKET_RATE_LIMITS:
+#
+#   event: (sid rate/s, sid burst, room rate/s, room burst)
+#
+# A zero rate turns that scope off. An event is let through only if both of its
+# buckets have a token, so one tab can't use up its room's budget on its own
+# and one busy room can't starve the rest of the process.
+#
+# Over the limit:
+# - whiteboard_update ops are not dropped but deferred: they are merged per
+#   object id (like whiteboard_fanout does) and applied as one batch once the
+#   buckets refill. A draw loop re-sending the same objects collapses to its
+#   latest state. If a sender piles up more than MAX_OPS_PER_MESSAGE distinct
+#   objects, the backlog is dropped and the client is told to resync.
+#   The tokens are taken before the ops are parsed (admit_whiteboard), and once
+#   a throttled sender has sent DEFER_MAX_OPS ops since its backlog was last
+#   released, further events are dropped unread with the same resync.
+# - chat_message and task_update are dropped.
+# In both cases the sender gets a 'slow_down' event (at most once per
+# retry_after) saying which event, which scope and when to try again.
+#
+# Throttled events are counted per event, scope and board in /metrics
+# (collabboard_socket_throttled_total). Only the first METRIC_MAX_BOARDS boards
+# to be throttled get their own series; the rest share board_id="other". The
+# first throttle of each burst is logged with the user and sid.
+
+DEFAULT_LIMITS = {
+    'whiteboard_update': (30, 60, 300, 600),
+    'chat_message': (5, 15, 50, 100),
+    'task_update': (10, 30, 100, 200),
+}
+DEFER_MAX_OPS = 4 * MAX_OPS_PER_MESSAGE
+METRIC_MAX_BOARDS = 100
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens
+
+    def wait(self):
+        # Seconds until the next token
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class SocketRateLimiter:
+    def __init__(self):
+        self.app = None
+        self.enabled = True
+        self.limits = dict(DEFAULT_LIMITS)
+        self.flush_interval = 0.1
+        self.idle_after = 300.0
+        self._buckets = {}           # (scope, key, event) -> TokenBucket
+        self._notified = {}          # (sid, event) -> monotonic time of the last slow_down
+        self._deferred = OrderedDict()  # (sid, board_id) -> [user_id, RoomBuffer, ops received]
+        self._metric_boards = set()
+        self._disconnected = set()   # sids gone with deferred edits still to release
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        # Metrics
+        self.allowed = 0
+        self.throttled = 0
+        self.deferred = 0
+        self.merged = 0
+        self.dropped = 0
+
+    def init_app(self, app, apply_deferred):
+        app.config.setdefault('SOCKET_RATE_LIMIT_ENABLED', True)
+        app.config.setdefault('SOCKET_RATE_LIMITS', DEFAULT_LIMITS)
+        app.config.setdefault('SOCKET_DEFERRED_FLUSH_MS', 100)
+        self.app = app
+        self.enabled = app.config['SOCKET_RATE_LIMIT_ENABLED']
+        self.limits = dict(DEFAULT_LIMITS, **app.config['SOCKET_RATE_LIMITS'])
+        self.flush_interval = app.config['SOCKET_DEFERRED_FLUSH_MS'] / 1000.0
+        # apply_deferred(board_id, user_id, ops, origin) applies a released whiteboard batch
+        self.apply_deferred = apply_deferred
+        socketio.start_background_task(self._run)
+
+    def _bucket(self, scope, key, event, rate, burst, now):
+        bucket = self._buckets.get((scope, key, event))
+        if bucket is None:
+            bucket = self._buckets[(scope, key, event)] = TokenBucket(rate, burst, now)
+        bucket.refill(now)
+        return bucket
+
+    def _take(self, sid, board_id, event, now):
+        """Consumes a token from both buckets, or returns (scope, retry_after) of the one that is empty."""
+        limits = self.limits.get(event)
+        if not self.enabled or limits is None:
+            return None
+        sid_rate, sid_burst, room_rate, room_burst = limits
+        buckets = []
+        if sid_rate and sid is not None:
+            buckets.append(('sid', self._bucket('sid', sid, event, sid_rate, sid_burst, now)))
+        if room_rate and board_id is not None:
+            buckets.append(('room', self._bucket('room', board_id, event, room_rate, room_burst, now)))
+        for scope, bucket in buckets:
+            if bucket.tokens < 1:
+                return scope, bucket.wait()
+        for _, bucket in buckets:
+            bucket.tokens -= 1
+        return None
+
+    def check(self, sid, board_id, event, user_id=None):
+        """True if the event may go through now; otherwise counts it and signals the sender."""
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            limited = self._take(sid, board_id, event, now)
+            if limited is None:
+                self.allowed += 1
+                return True
+            self.throttled += 1
+        self._throttled(sid, board_id, event, user_id, *limited, now=now)
+        return False
+
+    def admit_whiteboard(self, sid, board_id, op_count):
+        """Takes the tokens for a whiteboard_update before its ops are parsed.
+
+        Returns (admitted, limited). If admitted is False the event is dropped
+        unread. Otherwise validate the ops and pass limited on to submit_whiteboard.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            limited = self._take(sid, board_id, 'whiteboard_update', now)
+            pending = self._deferred.get((sid, board_id))
+            if limited is None or pending is None or pending[2] + op_count <= DEFER_MAX_OPS:
+                return True, limited
+            # Over the limit with a full backlog: drop it all without parsing anything
+            self.throttled += 1
+            self.dropped += len(pending[1].ops) + op_count
+            del self._deferred[(sid, board_id)]
+        self._count_throttled('whiteboard_update', limited[0], board_id)
+        self._signal(sid, board_id, 'whiteboard_update', *limited, resync=True)
+        return False, limited
+
+    def submit_whiteboard(self, sid, board_id, user_id, ops, limited=None):
+        """Ops to apply right away, or None if they were deferred (or dropped) by the limiter."""
+        now = time.monotonic()
+        with self._lock:
+            pending = self._deferred.get((sid, board_id))
+            if limited is None and pending is None:
+                self.allowed += 1
+                return ops
+            if limited is not None:
+                self.throttled += 1
+            if pending is None:
+                pending = self._deferred[(sid, board_id)] = [user_id, RoomBuffer(0), 0]
+            pending[2] += len(ops)
+            buffer = pending[1]
+            before = len(buffer.ops)
+            for op in ops:
+                buffer.merge(op, sid)
+            self.deferred += len(ops)
+            self.merged += before + len(ops) - len(buffer.ops)
+            overflow = len(buffer.ops) > MAX_OPS_PER_MESSAGE
+            if overflow:
+                self.dropped += len(buffer.ops)
+                del self._deferred[(sid, board_id)]
+            elif limited is None:
+                # Tokens are back but older edits are still queued; send them together, in order
+                del self._deferred[(sid, board_id)]
+                self.allowed += 1
+                return list(buffer.ops.values())
+
+        if overflow:
+            self._signal(sid, board_id, 'whiteboard_update', 'sid', 1.0, resync=True)
+        else:
+            self._throttled(sid, board_id, 'whiteboard_update', user_id, *limited, now=now)
+        return None
+
+    def release(self):
+        """Deferred whiteboard batches whose buckets have refilled, as (sid, board_id, user_id, ops)."""
+        now = time.monotonic()
+        released = []
+        with self._lock:
+            for key, (user_id, buffer, _) in list(self._deferred.items()):
+                sid, board_id = key
+                # Only the room bucket once the sender is gone, so its sid buckets stay dropped
+                bucket_sid = None if sid in self._disconnected else sid
+                if self._take(bucket_sid, board_id, 'whiteboard_update', now) is None:
+                    del self._deferred[key]
+                    if buffer.ops:
+                        released.append((sid, board_id, user_id, list(buffer.ops.values())))
+            self._disconnected.intersection_update(sid for sid, _ in self._deferred)
+        return released
+
+    def _count_throttled(self, event, scope, board_id):
+        # Bounded label set: one series per board for the first METRIC_MAX_BOARDS boards
+        label = str(board_id)
+        with self._lock:
+            if label not in self._metric_boards:
+                if len(self._metric_boards) >= METRIC_MAX_BOARDS:
+                    label = 'other'
+                else:
+                    self._metric_boards.add(label)
+        metrics.socket_throttled.inc(event, scope, label)
+
+    def _throttled(self, sid, board_id, event, user_id, scope, retry_after, now):
+        self._count_throttled(event, scope, board_id)
+        # One signal (and log line) per burst rather than one per rejected event
+        with self._lock:
+            last = self._notified.get((sid, event))
+            if last is not None and now - last < max(retry_after, 0.25):
+                return
+            self._notified[(sid, event)] = now
+        metrics.logger.info(json.dumps({
+            'ts': time.time(),
+            'type': 'socket_throttled',
+            'event': event,
+            'scope': scope,
+            'board_id': board_id,
+            'user_id': user_id,
+            'sid': sid,
+        }))
+        self._signal(sid, board_id, event, scope, retry_after)
+
+    def _signal(self, sid, board_id, event, scope, retry_after, resync=False):
+        payload = {'event': event, 'scope': scope, 'board_id': board_id, 'retry_after_ms': int(retry_after * 1000) + 1}
+        if resync:
+            payload['resync'] = True
+        socketio.emit('slow_down', payload, to=sid)
+
+    def drop_sid(self, sid):
+        # Deferred edits still go out; only the connection's own buckets go away
+        with self._lock:
+            for key in [k for k in self._buckets if k[0] == 'sid' and k[1] == sid]:
+                del self._buckets[key]
+            for key in [k for k in self._notified if k[0] == sid]:
+                del self._notified[key]
+            if any(key[0] == sid for key in self._deferred):
+                self._disconnected.add(sid)
+
+    def _sweep(self, now):
+        # Forget buckets that have sat idle long enough to be full again
+        if now - self._last_sweep < self.idle_after:
+            return
+        self._last_sweep = now
+        for key in [k for k, b in self._buckets.items() if now - b.updated >= self.idle_after]:
+            del self._buckets[key]
+        for key in [k for k, t in self._notified.items() if now - t >= self.idle_after]:
+            del self._notified[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'allowed': self.allowed,
+                'throttled': self.throttled,
+                'deferred_ops': self.deferred,
+                'merged_ops': self.merged,
+                'dropped_ops': self.dropped,
+                'deferred_batches': len(self._deferred),
+                'buckets': len(self._buckets),
+            }
+
+    def _run(self):
+        while True:
+            socketio.sleep(self.flush_interval)
+            if not self._deferred:
+                continue
+            with self.app.app_context():
+                for sid, board_id, user_id, ops in self.release():
+                    try:
+                        self.apply_deferred(board_id, user_id, ops, origin=sid)
+                    except Exception as e:
+                        db.session.rollback()
+                        self.app.logger.error(f"Deferred whiteboard ops for board {board_id} failed: {e}")
+                db.session.remove()
+
+
+socket_limits = SocketRateLimiter()
@@ -0,0 +1,80 @@
+import sqlite3
+import time
+
+import socketio
+
+# Cross-process fan-out for Socket.IO rooms.
+#
+# SOCKETIO_MESSAGE_QUEUE selects the backend:
+#   unset                      single process, rooms live in memory (default)
+#   redis://, kafka://, amqp:// handled by Flask-SocketIO's built-in managers
+#   sqlite:////path/to/bus.db  SQLiteBusManager below, a local stand-in for
+#                              running several workers on one box without a
+#                              broker
+# Every worker (and anything else calling socketio.emit, e.g. REST handlers)
+# publishes room broadcasts to the bus; each worker delivers them to its own
+# connected clients.
+
+
+class SQLiteBusManager(socketio.PubSubManager):
+    """Pub/sub over a shared SQLite file: publishers INSERT, listeners poll."""
+
+    name = 'sqlitebus'
+
+    def __init__(self, url='sqlite:///socketio-bus.db', channel='flask-socketio', write_only=False,
+                 logger=None, poll_interval=0.01, retention=60.0):
+        self.path = url[len('sqlite:///'):]
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._conn = None
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS socketio_bus ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, '
+            'payload TEXT NOT NULL, created REAL NOT NULL)'
+        )
+        return conn
+
+    def _publish(self, data):
+        if self._conn is None:
+            self._conn = self._connect()
+        self._conn.execute(
+            'INSERT INTO socketio_bus (channel, payload, created) VALUES (?, ?, ?)',
+            (self.channel, self.json.dumps(data), time.time())
+        )
+
+    def _listen(self):
+        conn = self._connect()
+        # Only messages published after this worker started listening
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM socketio_bus').fetchone()[0]
+        last_prune = time.monotonic()
+        while True:
+            rows = conn.execute(
+                'SELECT id, payload FROM socketio_bus WHERE id > ? AND channel = ? ORDER BY id',
+                (last_id, self.channel)
+            ).fetchall()
+            for row_id, payload in rows:
+                last_id = row_id
+                yield payload
+
+            if time.monotonic() - last_prune > self.retention:
+                conn.execute('DELETE FROM socketio_bus WHERE created < ?', (time.time() - self.retention,))
+                last_prune = time.monotonic()
+            if not rows:
+                self.server.sleep(self.poll_interval)
+
+
+def message_queue_options(app):
+    """Keyword arguments for socketio.init_app() based on SOCKETIO_MESSAGE_QUEUE."""
+    url = app.config.get('SOCKETIO_MESSAGE_QUEUE')
+    if not url:
+        return {}
+    channel = app.config.get('SOCKETIO_CHANNEL', 'flask-socketio')
+    if url.startswith('sqlite://'):
+        return {'client_manager': SQLiteBusManager(url, channel=channel)}
+    return {'message_queue': url, 'channel': channel}
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# models.py imports db from app, so app has to be imported first
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+from metrics import metrics  # noqa: E402
+from whiteboard_sync import documents  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # In-memory SQLite; background workers write under tmp_path (e.g. chat_archive/)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DATABASE_URL', 'sqlite://')
+    app = create_app()
+    app.config['TESTING'] = True
+    metrics.sample_rate = 0
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        # Board ids restart with every database; drop documents cached by this test
+        documents._documents.clear()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
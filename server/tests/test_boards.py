@@ -0,0 +1,122 @@
+from contextlib import contextmanager
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, insert
+
+from extensions import db
+from membership_cache import member_cache
+from models import Board, BoardMember, User, WhiteboardOp
+from whiteboard_sync import documents
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def make_users(count, start=1):
+    db.session.execute(insert(User), [
+        {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': '-'}
+        for i in range(start, start + count)
+    ])
+    db.session.commit()
+
+
+def make_board(owner_id, member_ids):
+    board = Board(name=f'board of {len(member_ids)}', owner_id=owner_id)
+    db.session.add(board)
+    db.session.flush()
+    db.session.execute(insert(BoardMember), [
+        {'board_id': board.id, 'user_id': user_id, 'role': 'owner' if user_id == owner_id else 'member', 'status': 'member'}
+        for user_id in [owner_id] + [i for i in member_ids if i != owner_id]
+    ])
+    db.session.commit()
+    return board.id
+
+
+def auth(user_id):
+    return {'Authorization': 'Bearer ' + create_access_token(identity=str(user_id))}
+
+
+def test_board_list_query_count_is_constant(client):
+    make_users(2)
+    make_board(1, [])
+    for _ in range(25):
+        make_board(2, [])
+
+    with count_queries() as few:
+        response = client.get('/api/boards', headers=auth(1))
+    assert response.status_code == 200 and len(response.json) == 1
+
+    with count_queries() as many:
+        response = client.get('/api/boards', headers=auth(2))
+    assert response.status_code == 200 and len(response.json) == 25
+
+    assert len(many) == len(few)
+
+
+def test_board_members_query_count_is_constant(client):
+    make_users(40)
+    small = make_board(1, [2])
+    large = make_board(1, range(2, 41))
+    member_cache.clear()
+
+    with count_queries() as few:
+        response = client.get(f'/api/boards/{small}/members', headers=auth(1))
+    assert response.status_code == 200 and len(response.json) == 2
+
+    with count_queries() as many:
+        response = client.get(f'/api/boards/{large}/members', headers=auth(1))
+    assert response.status_code == 200 and len(response.json) == 40
+
+    assert len(many) == len(few)
+
+
+def test_board_members_requires_membership(client):
+    make_users(2)
+    board_id = make_board(1, [])
+
+    response = client.get(f'/api/boards/{board_id}/members', headers=auth(2))
+    assert response.status_code == 403
+
+
+def test_board_reads_pick_up_ops_logged_by_other_workers(client):
+    make_users(1)
+    board_id = make_board(1, [])
+    assert client.get(f'/api/boards/{board_id}/whiteboard', headers=auth(1)).json['seq'] == 0
+
+    # Another worker applied and logged an op; this process still has seq 0 cached
+    db.session.add(WhiteboardOp(board_id=board_id, seq=1, kind='ops',
+                                payload='[{"op": "add", "id": "a", "object": {"type": "rect"}}]'))
+    db.session.commit()
+
+    response = client.get(f'/api/boards/{board_id}/whiteboard', headers=auth(1))
+    assert response.json['seq'] == 1
+    assert [obj['id'] for obj in response.json['state']['objects']] == ['a']
+
+
+def test_board_etag_tracks_whiteboard_ops_without_loading_the_canvas(client):
+    make_users(1)
+    board_id = make_board(1, [])
+    etag = client.get(f'/api/boards/{board_id}', headers=auth(1)).headers['ETag']
+
+    documents.discard(board_id)
+    response = client.get(f'/api/boards/{board_id}', headers=dict(auth(1), **{'If-None-Match': etag}))
+    assert response.status_code == 304
+    assert board_id not in documents._documents
+
+    db.session.add(WhiteboardOp(board_id=board_id, seq=1, kind='ops',
+                                payload='[{"op": "add", "id": "a", "object": {"type": "rect"}}]'))
+    db.session.commit()
+    response = client.get(f'/api/boards/{board_id}', headers=dict(auth(1), **{'If-None-Match': etag}))
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from flask_jwt_extended import create_access_token
+
+from chat_writer import ChatWriter, chat_writer
+from extensions import db, socketio
+from models import Board, BoardMember, ChatArchiveSegment, ChatMessage, User
+
+
+def test_ids_continue_after_archived_messages(app):
+    # Every message of the board has been archived; chat_message is empty
+    db.session.add(ChatArchiveSegment(
+        board_id=1, path='1/1-500.ndjson.gz', first_id=1, last_id=500,
+        first_timestamp=datetime(2020, 1, 1), last_timestamp=datetime(2020, 1, 2),
+        message_count=500, byte_size=1
+    ))
+    db.session.commit()
+    assert db.session.query(ChatMessage.id).count() == 0
+
+    writer = ChatWriter()
+    assert writer.allocate_id() == 501
+
+
+def test_non_members_cannot_post_to_a_board(app):
+    db.session.add(User(id=1, username='owner', email='owner@example.com', password_hash='-'))
+    db.session.add(User(id=2, username='outsider', email='outsider@example.com', password_hash='-'))
+    db.session.add(Board(id=1, name='Board', owner_id=1))
+    db.session.add(BoardMember(board_id=1, user_id=1, role='owner', status='member'))
+    db.session.commit()
+
+    enqueued = chat_writer.stats()['enqueued']
+    outsider = socketio.test_client(app, auth={'token': create_access_token(identity='2')})
+    outsider.emit('chat_message', {'board_id': 1, 'message': 'hi'})
+    outsider.emit('task_update', {'board_id': 1, 'task': {'id': 1}})
+    assert outsider.get_received() == []
+    assert chat_writer.stats()['enqueued'] == enqueued
+
+
+def test_non_numeric_board_id_gets_chat_error(app):
+    db.session.add(User(id=1, username='owner', email='owner@example.com', password_hash='-'))
+    db.session.commit()
+
+    client = socketio.test_client(app, auth={'token': create_access_token(identity='1')})
+    client.emit('chat_message', {'board_id': 'abc', 'message': 'hi'})
+    received = client.get_received()
+    assert [packet['name'] for packet in received] == ['chat_error']
@@ -0,0 +1,12 @@
+from metrics import Metrics
+
+
+def test_collector_totals_are_exported_as_counters():
+    metrics = Metrics()
+    metrics.register_collector('queue', lambda: {'sent': 3, 'depth': 1}, ('sent',))
+    lines = metrics.render().splitlines()
+
+    assert '# TYPE collabboard_queue_sent_total counter' in lines
+    assert 'collabboard_queue_sent_total 3' in lines
+    assert '# TYPE collabboard_queue_depth gauge' in lines
+    assert 'collabboard_queue_depth 1' in lines
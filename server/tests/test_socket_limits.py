@@ -0,0 +1,72 @@
+import time
+
+from socket_limits import DEFER_MAX_OPS, METRIC_MAX_BOARDS, SocketRateLimiter
+from metrics import metrics
+from whiteboard_sync import MAX_OPS_PER_MESSAGE
+
+
+def limiter(monkeypatch, limits=(0.001, 1, 0, 0)):
+    rate_limiter = SocketRateLimiter()
+    rate_limiter.limits['whiteboard_update'] = limits
+    signals = []
+    monkeypatch.setattr(rate_limiter, '_signal', lambda *args, **kwargs: signals.append((args, kwargs)))
+    return rate_limiter, signals
+
+
+def test_throttled_sender_is_dropped_unread_once_backlog_is_full(monkeypatch):
+    limits, signals = limiter(monkeypatch)
+    # Same object ids every time, so the merged backlog never overflows on its own
+    ops = [{'op': 'modify', 'id': f'o{i}', 'object': {}} for i in range(MAX_OPS_PER_MESSAGE)]
+
+    admitted, limited = limits.admit_whiteboard('sid', 1, len(ops))
+    assert admitted and limited is None
+    assert limits.submit_whiteboard('sid', 1, 7, ops, limited) == ops
+
+    for _ in range(DEFER_MAX_OPS // len(ops)):
+        admitted, limited = limits.admit_whiteboard('sid', 1, len(ops))
+        assert admitted and limited is not None
+        assert limits.submit_whiteboard('sid', 1, 7, ops, limited) is None
+
+    admitted, _ = limits.admit_whiteboard('sid', 1, len(ops))
+    assert not admitted
+    assert signals[-1] == (('sid', 1, 'whiteboard_update', 'sid', signals[-1][0][4]), {'resync': True})
+    assert limits.stats()['deferred_batches'] == 0
+
+
+def test_throttle_metric_board_labels_are_bounded(monkeypatch):
+    limits, _ = limiter(monkeypatch)
+    before = len(metrics.socket_throttled._values)
+    for board_id in range(METRIC_MAX_BOARDS + 50):
+        limits.check('sid', board_id, 'whiteboard_update')
+        limits.check('sid', board_id, 'whiteboard_update')
+
+    labels = {key[2] for key in metrics.socket_throttled._values}
+    assert 'other' in labels
+    assert len(metrics.socket_throttled._values) - before <= METRIC_MAX_BOARDS + 1
+
+
+def test_full_backlog_drop_reports_the_empty_bucket(monkeypatch):
+    limits, signals = limiter(monkeypatch, (0, 0, 0.001, 1))
+    ops = [{'op': 'modify', 'id': f'o{i}', 'object': {}} for i in range(MAX_OPS_PER_MESSAGE)]
+    for _ in range(DEFER_MAX_OPS // len(ops) + 1):
+        admitted, limited = limits.admit_whiteboard('sid', 1, len(ops))
+        limits.submit_whiteboard('sid', 1, 7, ops, limited)
+
+    admitted, _ = limits.admit_whiteboard('sid', 1, len(ops))
+    assert not admitted
+    args, kwargs = signals[-1]
+    assert args[3] == 'room' and args[4] > 1 and kwargs == {'resync': True}
+
+
+def test_release_after_disconnect_leaves_sid_buckets_dropped(monkeypatch):
+    limits, _ = limiter(monkeypatch, (1000, 1, 1000, 10))
+    ops = [{'op': 'add', 'id': 'a', 'object': {}}]
+    for _ in range(2):
+        admitted, limited = limits.admit_whiteboard('sid', 1, 1)
+        limits.submit_whiteboard('sid', 1, 7, ops, limited)
+    assert limits.stats()['deferred_batches'] == 1
+
+    limits.drop_sid('sid')
+    time.sleep(0.01)
+    assert [batch[0] for batch in limits.release()] == ['sid']
+    assert not [key for key in limits._buckets if key[0] == 'sid']
@@ -0,0 +1,61 @@
+import pytest
+from flask_jwt_extended import create_access_token
+
+from extensions import db
+from models import Board, BoardMember, Task, User
+
+
+@pytest.fixture
+def board(app):
+    db.session.add(User(id=1, username='owner', email='owner@example.com', password_hash='-'))
+    db.session.add(Board(id=1, name='Board', owner_id=1))
+    db.session.add(BoardMember(board_id=1, user_id=1, role='owner', status='member'))
+    db.session.add(Task(id=1, board_id=1, title='Existing', status='to_do'))
+    db.session.commit()
+    return 1
+
+
+def batch(client, board_id, operations):
+    headers = {'Authorization': 'Bearer ' + create_access_token(identity='1')}
+    return client.post(f'/api/task/boards/{board_id}/batch', json={'operations': operations}, headers=headers)
+
+
+def test_batch_applies_all_operations(client, board):
+    response = batch(client, board, [
+        {'op': 'create', 'title': 'New'},
+        {'op': 'update', 'id': 1, 'title': 'Renamed'},
+    ])
+    assert response.status_code == 200
+    assert [task['title'] for task in response.json['created']] == ['New']
+    assert [task['title'] for task in response.json['updated']] == ['Renamed']
+
+
+@pytest.mark.parametrize('operation', [
+    {'op': 'update', 'id': [1], 'title': 'x'},
+    {'op': 'delete', 'id': {'id': 1}},
+    {'op': 'update', 'id': 1, 'title': None},
+    {'op': 'update', 'id': 1, 'title': ''},
+    {'op': 'create', 'title': ['x']},
+    {'op': 'update', 'id': 1, 'status': None},
+    {'op': 'update', 'id': 1, 'status': ''},
+    {'op': 'move', 'id': 1, 'status': ['x']},
+    {'op': 'create', 'title': 'x', 'status': {'s': 1}},
+    {'op': 'update', 'id': 1, 'description': {'text': 'x'}},
+    {'op': 'create', 'title': 'x', 'description': 5},
+    {'op': 'update', 'id': 1, 'assignee_id': 'me'},
+    {'op': 'create', 'title': 'x', 'assignee_id': True},
+])
+def test_batch_rejects_invalid_operation(client, board, operation):
+    response = batch(client, board, [{'op': 'create', 'title': 'Fine'}, operation])
+    assert response.status_code == 400
+    assert response.json['index'] == 1
+    assert db.session.query(Task.id).count() == 1
+
+
+def test_batch_accepts_null_optional_fields(client, board):
+    response = batch(client, board, [
+        {'op': 'create', 'title': 'New', 'status': None, 'description': None, 'assignee_id': None},
+        {'op': 'update', 'id': 1, 'description': None, 'assignee_id': None},
+    ])
+    assert response.status_code == 200
+    assert response.json['created'][0]['status'] == 'to_do'
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from extensions import db
+from models import Board, User
+
+
+def auth(user_id):
+    return {'Authorization': 'Bearer ' + create_access_token(identity=str(user_id)), 'Content-Type': 'application/x-ndjson'}
+
+
+@pytest.fixture
+def owner(app):
+    db.session.add(User(id=1, username='owner', email='owner@example.com', password_hash='-'))
+    db.session.commit()
+    return 1
+
+
+def ndjson(*records):
+    return ''.join(json.dumps(record) + '\n' for record in records)
+
+
+BOARD = {'type': 'board', 'format': 1, 'board': {'name': 'Imported'}}
+END = {'type': 'end', 'counts': {}}
+
+
+def test_import_creates_board(client, owner):
+    body = ndjson(BOARD, {'type': 'task', 'title': 'One', 'assignee_email': 'owner@example.com'},
+                  {'type': 'task', 'title': 'Two', 'assignee_email': 'nobody@example.com'}, END)
+    response = client.post('/api/boards/import', data=body, headers=auth(owner))
+    assert response.status_code == 201
+    assert response.json['imported']['tasks'] == 2
+    assert response.json['skipped']['assignees'] == 1
+
+
+@pytest.mark.parametrize('records', [
+    [{'type': 'board', 'format': 1, 'board': 'Imported'}, END],
+    [BOARD, {'type': 'task', 'title': ['not', 'a', 'string']}, END],
+    [BOARD, {'type': 'member', 'email': {'not': 'a string'}}, END],
+    [BOARD, {'type': 'task', 'title': 'No end record'}],
+])
+def test_invalid_import_writes_nothing(client, owner, records):
+    response = client.post('/api/boards/import', data=ndjson(*records), headers=auth(owner))
+    assert response.status_code == 400
+    assert db.session.query(Board.id).count() == 0
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from extensions import db
+from models import Board, BoardMember, User, WhiteboardOp
+from whiteboard_codec import compress_text, decompress_text
+from whiteboard_store import store
+from whiteboard_sync import documents
+
+
+@pytest.fixture
+def board(app):
+    db.session.add(User(id=1, username='owner', email='owner@example.com', password_hash='-'))
+    db.session.add(Board(id=1, name='Board', owner_id=1))
+    db.session.add(BoardMember(board_id=1, user_id=1, role='owner', status='member'))
+    db.session.commit()
+    return 1
+
+
+def put(client, board_id, state):
+    headers = {'Authorization': 'Bearer ' + create_access_token(identity='1')}
+    return client.put(f'/api/boards/{board_id}/whiteboard', json={'whiteboard_state': state}, headers=headers)
+
+
+@pytest.mark.parametrize('value', ['z1:garbage', 'z0:plain', 'z1:' + 'A' * 600, '{"objects": []}', 'x' * 600, ''])
+def test_stored_text_round_trips(value):
+    assert decompress_text(compress_text(value)) == value
+
+
+@pytest.mark.parametrize('state', ['z1:garbage', 'not json', '[1, 2]', '"text"', 12])
+def test_put_rejects_non_object_state(client, board, state):
+    response = put(client, board, state)
+    assert response.status_code == 400
+    assert WhiteboardOp.query.count() == 0
+
+
+def test_marker_like_values_read_back_unchanged(client, board):
+    db.session.get(Board, board).whiteboard_data = 'z1:garbage'
+    db.session.add(WhiteboardOp(board_id=board, seq=1, kind='replace', payload='z1:garbage'))
+    db.session.commit()
+    db.session.expire_all()
+
+    assert db.session.get(Board, board).whiteboard_data == 'z1:garbage'
+    assert WhiteboardOp.query.one().payload == 'z1:garbage'
+    # An unreadable canvas loads as empty rather than breaking the board
+    headers = {'Authorization': 'Bearer ' + create_access_token(identity='1')}
+    assert client.get(f'/api/boards/{board}', headers=headers).status_code == 200
+
+
+def test_put_saves_object_state(client, board):
+    state = {'objects': [{'id': 'a', 'left': 1}]}
+    assert put(client, board, json.dumps(state)).status_code == 200
+    documents.discard(board)
+    assert documents.get(board).snapshot()['state'] == state
+
+
+def test_idle_documents_are_evicted_once_compacted(app, board, monkeypatch):
+    monkeypatch.setattr(store, 'document_idle_after', 0)
+    ops = [{'op': 'add', 'id': 'a', 'object': {'left': 1}}]
+    store.append(board, documents.get(board).apply(ops), ops)
+
+    # Waiting for compaction: kept in memory
+    assert store.evict_idle() == 0
+    store.request_compaction(board)
+    assert store.due_boards() == [board]
+    # Not folded into the snapshot yet: kept, and queued for compaction again
+    assert store.evict_idle() == 0
+    assert store.due_boards() == [board]
+    store.compact(board)
+
+    assert store.evict_idle() == 1
+    assert board not in documents._documents
+    assert documents.get(board).snapshot()['state']['objects'] == [{'id': 'a', 'left': 1}]
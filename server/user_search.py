@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+
+from extensions import db
+from models import User, search_key
+
+# Prefix search over users for the member picker, which fires a request on
+# every keystroke.
+#
+# username_search / email_search hold lowercased copies of the columns with
+# plain B-tree indexes, and a prefix is matched as the half-open range
+# [prefix, next_prefix). That is an index range scan on SQLite and any server
+# database alike (LIKE 'x%' only uses an index under specific collations), and
+# with a LIMIT it reads at most `limit` index entries per column, so latency
+# does not grow with the user table.
+#
+# Results for recent prefixes are kept in a small LRU with a short TTL:
+# consecutive keystrokes and several people typing the same names hit the same
+# few keys. Registration clears it, so new users are searchable immediately in
+# this process; other workers see them once the TTL runs out.
+
+
+def prefix_upper_bound(prefix):
+    # Smallest string greater than every string starting with prefix
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class UserSearch:
+    def __init__(self, maxsize=2048, ttl=30.0, limit=10, min_chars=1):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.limit = limit
+        self.min_chars = min_chars
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init_app(self, app):
+        app.config.setdefault('USER_SEARCH_CACHE_SIZE', self.maxsize)
+        app.config.setdefault('USER_SEARCH_CACHE_TTL', self.ttl)
+        app.config.setdefault('USER_SEARCH_LIMIT', self.limit)
+        app.config.setdefault('USER_SEARCH_MIN_CHARS', self.min_chars)
+        self.maxsize = app.config['USER_SEARCH_CACHE_SIZE']
+        self.ttl = app.config['USER_SEARCH_CACHE_TTL']
+        self.limit = app.config['USER_SEARCH_LIMIT']
+        self.min_chars = app.config['USER_SEARCH_MIN_CHARS']
+        self.clear()
+
+    def search(self, q):
+        """Up to self.limit users whose username or email starts with q (case-insensitive)."""
+        prefix = search_key((q or '').strip())
+        if len(prefix) < self.min_chars:
+            return []
+        # Capped so arbitrarily long input can't create arbitrarily many keys
+        prefix = prefix[:User.email_search.type.length]
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(prefix)
+            if entry is not None and entry[0] >= now:
+                self._entries.move_to_end(prefix)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        results = self._query(prefix)
+        with self._lock:
+            self._entries[prefix] = (now + self.ttl, results)
+            self._entries.move_to_end(prefix)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return results
+
+    def _query(self, prefix):
+        upper = prefix_upper_bound(prefix)
+        columns = (User.id, User.username, User.email)
+        # Username matches first, then email matches, each read straight off its index
+        by_username = db.session.execute(
+            db.select(*columns)
+            .where(User.username_search >= prefix, User.username_search < upper)
+            .order_by(User.username_search)
+            .limit(self.limit)
+        ).all()
+        by_email = db.session.execute(
+            db.select(*columns)
+            .where(User.email_search >= prefix, User.email_search < upper)
+            .order_by(User.email_search)
+            .limit(self.limit)
+        ).all()
+
+        results, seen = [], set()
+        for row in by_username + by_email:
+            if row.id not in seen:
+                seen.add(row.id)
+                results.append({'id': row.id, 'username': row.username, 'email': row.email})
+        return tuple(results[:self.limit])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+            }
+
+
+user_search = UserSearch()
@@ -0,0 +1,75 @@
+import base64
+import binascii
+import zlib
+
+from sqlalchemy.types import Text, TypeDecorator
+
+try:
+    import msgpack
+except ImportError:  # optional; binary socket frames are disabled without it
+    msgpack = None
+
+# Encodings for whiteboard payloads.
+#
+# Storage: Fabric path data is highly repetitive, so whiteboard snapshots and
+# logged ops are zlib-compressed before they hit the database. Compressed values
+# are stored as text ("z1:" + base64) so the columns stay TEXT and rows written
+# before compression existed read back unchanged. Values under
+# COMPRESS_MIN_CHARS are stored as-is; small op batches don't shrink enough to
+# be worth it. A plain value that itself starts with one of the markers is
+# stored behind "z0:", so stored data can't pass for compressed data; an old row
+# that does look compressed but doesn't decode is returned as it is.
+#
+# Sockets: clients that join with {'encoding': 'msgpack'} receive
+# 'whiteboard_ops' frames as one msgpack-encoded binary attachment, and may send
+# 'whiteboard_update' the same way.
+
+COMPRESSED_PREFIX = 'z1:'
+PLAIN_PREFIX = 'z0:'
+COMPRESS_MIN_CHARS = 512
+COMPRESS_LEVEL = 6
+
+
+def compress_text(value):
+    if value is None:
+        return value
+    if len(value) < COMPRESS_MIN_CHARS:
+        if value.startswith((COMPRESSED_PREFIX, PLAIN_PREFIX)):
+            return PLAIN_PREFIX + value
+        return value
+    packed = zlib.compress(value.encode('utf-8'), COMPRESS_LEVEL)
+    return COMPRESSED_PREFIX + base64.b64encode(packed).decode('ascii')
+
+
+def decompress_text(value):
+    if value is None:
+        return value
+    if value.startswith(PLAIN_PREFIX):
+        return value[len(PLAIN_PREFIX):]
+    if not value.startswith(COMPRESSED_PREFIX):
+        return value
+    try:
+        return zlib.decompress(base64.b64decode(value[len(COMPRESSED_PREFIX):], validate=True)).decode('utf-8')
+    except (binascii.Error, zlib.error, UnicodeDecodeError):
+        return value
+
+
+class CompressedText(TypeDecorator):
+    """TEXT column that transparently compresses large values (see compress_text)."""
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
+
+
+def pack(data):
+    return msgpack.packb(data, use_bin_type=True)
+
+
+def unpack(data):
+    return msgpack.unpackb(bytes(data), raw=False)
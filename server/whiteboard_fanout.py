@@ -0,0 +1,117 @@
+import threading
+from collections import OrderedDict
+
+import whiteboard_codec as codec
+from extensions import socketio
+
+# Per-room outbound buffer for whiteboard ops. Instead of one broadcast per
+# incoming event, ops are merged per object id and flushed to the room once
+# per tick as a single `whiteboard_ops` frame covering seqs from_seq..seq.
+#
+# Frames go to a per-encoding room next to the board room (see frame_room):
+# JSON for most clients, msgpack for clients that asked for binary frames.
+# Binary frames need the msgpack package and are disabled behind a message
+# queue, whose pub/sub carries JSON only.
+
+
+def frame_room(board_id, binary=False):
+    return f'{board_id}:wb:msgpack' if binary else f'{board_id}:wb'
+
+
+class RoomBuffer:
+    def __init__(self, from_seq):
+        self.from_seq = from_seq
+        self.seq = from_seq
+        self.ops = OrderedDict()   # object id -> op
+        self.origins = {}          # object id -> sid of the only writer, or None if mixed
+
+    def merge(self, op, origin):
+        object_id = op['id']
+        current = self.ops.get(object_id)
+        if object_id in self.origins and self.origins[object_id] != origin:
+            self.origins[object_id] = None
+        else:
+            self.origins[object_id] = origin
+
+        if current is None:
+            self.ops[object_id] = op
+        elif op['op'] == 'remove':
+            if current['op'] == 'add':
+                # Never broadcast, so nobody needs to hear about it
+                del self.ops[object_id]
+                del self.origins[object_id]
+            else:
+                self.ops[object_id] = op
+        elif op['op'] == 'modify' and current['op'] in ('add', 'modify'):
+            self.ops[object_id] = dict(current, object=dict(current['object'], **op['object']))
+        else:
+            self.ops[object_id] = op
+
+    def to_frame(self, board_id):
+        ops = []
+        for object_id, op in self.ops.items():
+            origin = self.origins.get(object_id)
+            ops.append(dict(op, origin=origin) if origin else op)
+        return {'board_id': board_id, 'from_seq': self.from_seq, 'seq': self.seq, 'ops': ops}
+
+
+class WhiteboardFanout:
+    def __init__(self):
+        self.tick = 0.04
+        self.max_ops = 1000
+        self.binary_frames = False
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('WHITEBOARD_FANOUT_TICK_MS', 40)
+        app.config.setdefault('WHITEBOARD_FANOUT_MAX_OPS', 1000)
+        self.tick = app.config['WHITEBOARD_FANOUT_TICK_MS'] / 1000.0
+        self.max_ops = app.config['WHITEBOARD_FANOUT_MAX_OPS']
+        self.binary_frames = codec.msgpack is not None and not app.config.get('SOCKETIO_MESSAGE_QUEUE')
+        socketio.start_background_task(self._run)
+
+    def push(self, board_id, seq, ops, origin=None):
+        with self._lock:
+            buffer = self._buffers.get(board_id)
+            if buffer is None:
+                buffer = self._buffers[board_id] = RoomBuffer(seq)
+            for op in ops:
+                buffer.merge(op, origin)
+            buffer.seq = seq
+            overflow = len(buffer.ops) >= self.max_ops
+            if overflow:
+                del self._buffers[board_id]
+
+        # A full buffer goes out right away rather than growing until the tick
+        if overflow:
+            self._emit(board_id, buffer)
+
+    def discard(self, board_id):
+        # Used when a full state supersedes whatever is still buffered
+        with self._lock:
+            self._buffers.pop(board_id, None)
+
+    def flush(self):
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+        for board_id, buffer in buffers.items():
+            self._emit(board_id, buffer)
+        return len(buffers)
+
+    def _emit(self, board_id, buffer):
+        frame = buffer.to_frame(board_id)
+        socketio.emit('whiteboard_ops', frame, room=frame_room(board_id))
+        if self.binary_frames:
+            room = frame_room(board_id, binary=True)
+            # Encoded once per room, and only when a binary client is listening
+            if next(iter(socketio.server.manager.get_participants('/', room)), None) is not None:
+                socketio.emit('whiteboard_ops', codec.pack(frame), room=room)
+
+    def _run(self):
+        while True:
+            socketio.sleep(self.tick)
+            self.flush()
+
+
+fanout = WhiteboardFanout()
@@ -0,0 +1,185 @@
+import math
+from collections import defaultdict
+from itertools import product
+
+# Spatial index over a whiteboard's objects, for viewport loading.
+#
+# The canvas is cut into TILE_SIZE x TILE_SIZE tiles and every object is listed
+# under each tile its bounding box touches, so a viewport query only looks at
+# the objects near it. Bounding boxes are worked out from the stored Fabric
+# properties (position, origin, size, scale, stroke, skew and rotation). They
+# can be a little larger than what Fabric draws, never smaller.
+#
+# Objects whose bounds can't be worked out, or that would cover more than
+# MAX_TILES_PER_OBJECT tiles, are kept in a separate list. That list is checked
+# on every query, and those objects are left out of the tile counts.
+
+TILE_SIZE = 512
+MAX_TILES_PER_OBJECT = 1024
+
+ORIGIN_OFFSETS = {'left': 0.0, 'top': 0.0, 'center': 0.5, 'right': 1.0, 'bottom': 1.0}
+
+
+def parse_bbox(value):
+    # "x0,y0,x1,y1" (query string) or a 4-item list (socket payloads)
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, (list, tuple)) or len(value) != 4:
+        raise ValueError("bbox must be x0,y0,x1,y1")
+    try:
+        x0, y0, x1, y1 = (float(v) for v in value)
+    except (TypeError, ValueError):
+        raise ValueError("bbox must be x0,y0,x1,y1")
+    if not all(math.isfinite(v) for v in (x0, y0, x1, y1)) or x1 < x0 or y1 < y0:
+        raise ValueError("bbox must be finite, with x0 <= x1 and y0 <= y1")
+    return x0, y0, x1, y1
+
+
+def _number(obj, key, default):
+    value = obj.get(key, default)
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(key)
+    return float(value)
+
+
+def _origin(obj, key, default):
+    value = obj.get(key, default)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return ORIGIN_OFFSETS.get(value, 0.0)
+
+
+def object_bounds(obj):
+    """Axis-aligned (x0, y0, x1, y1) of a serialized Fabric object, or None."""
+    try:
+        left = _number(obj, 'left', 0)
+        top = _number(obj, 'top', 0)
+        stroke = _number(obj, 'strokeWidth', 1) if obj.get('stroke') else 0
+        width = abs(_number(obj, 'width', 0)) + stroke
+        height = abs(_number(obj, 'height', 0)) + stroke
+        scale_x = abs(_number(obj, 'scaleX', 1))
+        scale_y = abs(_number(obj, 'scaleY', 1))
+        skew_x = _number(obj, 'skewX', 0)
+        skew_y = _number(obj, 'skewY', 0)
+        angle = _number(obj, 'angle', 0)
+    except ValueError:
+        return None
+
+    # Skew widens the box before scaling and rotation are applied
+    if skew_x:
+        width += abs(math.tan(math.radians(skew_x))) * height
+    if skew_y:
+        height += abs(math.tan(math.radians(skew_y))) * width
+    width *= scale_x
+    height *= scale_y
+
+    # Corners relative to the origin point, which sits at (left, top)
+    ox = _origin(obj, 'originX', 'left') * width
+    oy = _origin(obj, 'originY', 'top') * height
+    if not angle % 360:
+        bounds = (left - ox, top - oy, left - ox + width, top - oy + height)
+    else:
+        cos, sin = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+        corners = ((-ox, -oy), (width - ox, -oy), (-ox, height - oy), (width - ox, height - oy))
+        xs = [left + x * cos - y * sin for x, y in corners]
+        ys = [top + x * sin + y * cos for x, y in corners]
+        bounds = (min(xs), min(ys), max(xs), max(ys))
+    if not all(math.isfinite(v) for v in bounds):
+        return None
+    return bounds
+
+
+def _intersects(box, bbox):
+    return box is None or not (box[2] < bbox[0] or box[0] > bbox[2] or box[3] < bbox[1] or box[1] > bbox[3])
+
+
+class SpatialIndex:
+    """Uniform grid of object ids, keyed by tile; queries come back in z-order."""
+
+    def __init__(self, tile_size=TILE_SIZE):
+        self.tile_size = tile_size
+        self._tiles = defaultdict(set)  # (tx, ty) -> object ids
+        self._boxes = {}                # object id -> bounds, or None
+        self._order = {}                # object id -> z-order key
+        self._loose = set()             # ids kept out of the grid (see above)
+        self._next_order = 0
+
+    def __len__(self):
+        return len(self._order)
+
+    def _tile_span(self, box):
+        size = self.tile_size
+        return (math.floor(box[0] / size), math.floor(box[1] / size),
+                math.floor(box[2] / size), math.floor(box[3] / size))
+
+    def _tile_keys(self, box):
+        tx0, ty0, tx1, ty1 = self._tile_span(box)
+        return product(range(tx0, tx1 + 1), range(ty0, ty1 + 1))
+
+    def insert(self, object_id, obj):
+        # Re-inserting an id (add over an existing object, modify) keeps its z-order
+        if object_id in self._order:
+            self._unplace(object_id)
+        else:
+            self._order[object_id] = self._next_order
+            self._next_order += 1
+
+        box = object_bounds(obj)
+        self._boxes[object_id] = box
+        if box is None:
+            self._loose.add(object_id)
+            return
+        tx0, ty0, tx1, ty1 = self._tile_span(box)
+        if (tx1 - tx0 + 1) * (ty1 - ty0 + 1) > MAX_TILES_PER_OBJECT:
+            self._loose.add(object_id)
+            return
+        for key in self._tile_keys(box):
+            self._tiles[key].add(object_id)
+
+    def remove(self, object_id):
+        if object_id not in self._order:
+            return
+        self._unplace(object_id)
+        del self._order[object_id]
+        del self._boxes[object_id]
+
+    def _unplace(self, object_id):
+        if object_id in self._loose:
+            self._loose.discard(object_id)
+            return
+        for key in self._tile_keys(self._boxes[object_id]):
+            ids = self._tiles.get(key)
+            if ids is not None:
+                ids.discard(object_id)
+                if not ids:
+                    del self._tiles[key]
+
+    def query(self, bbox):
+        tx0, ty0, tx1, ty1 = self._tile_span(bbox)
+        found = set(self._loose)
+        if (tx1 - tx0 + 1) * (ty1 - ty0 + 1) > len(self._tiles):
+            # Region bigger than the occupied part of the board: walk what's there
+            for (tx, ty), ids in self._tiles.items():
+                if tx0 <= tx <= tx1 and ty0 <= ty <= ty1:
+                    found.update(ids)
+        else:
+            for key in product(range(tx0, tx1 + 1), range(ty0, ty1 + 1)):
+                ids = self._tiles.get(key)
+                if ids:
+                    found.update(ids)
+        hits = [object_id for object_id in found if _intersects(self._boxes[object_id], bbox)]
+        hits.sort(key=self._order.__getitem__)
+        return hits
+
+    def tiles(self):
+        # Object count per occupied tile, e.g. for a minimap or placeholders
+        return [{'x': tx, 'y': ty, 'count': len(ids)} for (tx, ty), ids in sorted(self._tiles.items())]
+
+    def bounds(self):
+        boxes = [box for box in self._boxes.values() if box is not None]
+        if not boxes:
+            return None
+        return [min(b[0] for b in boxes), min(b[1] for b in boxes),
+                max(b[2] for b in boxes), max(b[3] for b in boxes)]
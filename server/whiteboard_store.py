@@ -0,0 +1,157 @@
+import json
+import threading
+import time
+
+from extensions import db, socketio
+from models import Board, WhiteboardOp
+from whiteboard_sync import documents
+
+# Whiteboard persistence: every accepted op batch is appended to the
+# whiteboard_op table, and a background task periodically folds the log into
+# Board.whiteboard_data (the snapshot). The newest WHITEBOARD_OP_RETENTION ops
+# are kept after folding so GET /api/boards/<id>/changes can still replay them
+# by seq; anything older is dropped. Appending never touches the board row.
+#
+# The same task evicts idle documents from the registry: boards with no one in
+# their room and no fetch for WHITEBOARD_DOCUMENT_IDLE_SECONDS are dropped from
+# memory once compaction has folded in all their ops, so a worker only holds
+# the canvases of boards that are actually in use.
+
+
+class WhiteboardStore:
+    def __init__(self):
+        self.app = None
+        self.compact_every_ops = 200
+        self.compact_interval = 30.0
+        self.op_retention = 500
+        self.document_idle_after = 300.0
+        # board_id -> [ops since last compaction, monotonic time of the first one]
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('WHITEBOARD_COMPACT_EVERY_OPS', 200)
+        app.config.setdefault('WHITEBOARD_COMPACT_INTERVAL', 30.0)
+        app.config.setdefault('WHITEBOARD_OP_RETENTION', 500)
+        app.config.setdefault('WHITEBOARD_DOCUMENT_IDLE_SECONDS', 300.0)
+        self.app = app
+        self.compact_every_ops = app.config['WHITEBOARD_COMPACT_EVERY_OPS']
+        self.compact_interval = app.config['WHITEBOARD_COMPACT_INTERVAL']
+        self.op_retention = app.config['WHITEBOARD_OP_RETENTION']
+        self.document_idle_after = app.config['WHITEBOARD_DOCUMENT_IDLE_SECONDS']
+        socketio.start_background_task(self._run)
+
+    def append(self, board_id, seq, payload, user_id=None, kind='ops'):
+        if not isinstance(payload, str):
+            payload = json.dumps(payload)
+        db.session.add(WhiteboardOp(board_id=board_id, seq=seq, user_id=user_id, kind=kind, payload=payload))
+        db.session.commit()
+
+        with self._lock:
+            entry = self._pending.setdefault(board_id, [0, time.monotonic()])
+            entry[0] += 1
+
+    def compact(self, board_id):
+        document = documents.get(board_id, touch=False)
+        board = db.session.get(Board, board_id)
+        if document is None or board is None:
+            return False
+
+        snapshot = document.snapshot()
+        if snapshot['seq'] <= (board.whiteboard_seq or 0):
+            return False
+
+        board.whiteboard_data = json.dumps(snapshot['state'])
+        board.whiteboard_seq = snapshot['seq']
+        # Ops up to whiteboard_seq are now in the snapshot and skipped on load;
+        # only the ones past the retention window are actually deleted
+        cutoff = snapshot['seq'] - self.op_retention
+        WhiteboardOp.query.filter(
+            WhiteboardOp.board_id == board_id, WhiteboardOp.seq <= cutoff
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return True
+
+    def request_compaction(self, board_id):
+        # Makes the board due on the next tick regardless of thresholds
+        with self._lock:
+            entry = self._pending.setdefault(board_id, [0, time.monotonic()])
+            entry[0] = max(entry[0], self.compact_every_ops)
+
+    def due_boards(self):
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                board_id for board_id, (count, since) in self._pending.items()
+                if count >= self.compact_every_ops or now - since >= self.compact_interval
+            ]
+            for board_id in due:
+                del self._pending[board_id]
+        return due
+
+    def evict_idle(self):
+        before = time.monotonic() - self.document_idle_after
+        with self._lock:
+            pending = set(self._pending)
+        idle = [
+            (board_id, document) for board_id, document in documents.idle(before)
+            if board_id not in pending
+            and next(iter(socketio.server.manager.get_participants('/', str(board_id))), None) is None
+        ]
+        if not idle:
+            return 0
+
+        compacted = dict(db.session.query(Board.id, Board.whiteboard_seq).filter(
+            Board.id.in_([board_id for board_id, _ in idle])
+        ))
+        evicted = 0
+        for board_id, document in idle:
+            if document.seq > (compacted.get(board_id) or 0):
+                # Not folded in yet (e.g. edits logged before a restart); evicted after the next compaction
+                self.request_compaction(board_id)
+            elif documents.evict(board_id, before):
+                evicted += 1
+        return evicted
+
+    def _seed_pending(self):
+        # Ops left over from a previous run still need folding
+        rows = db.session.query(WhiteboardOp.board_id, db.func.count(WhiteboardOp.id)).join(
+            Board, Board.id == WhiteboardOp.board_id
+        ).filter(WhiteboardOp.seq > Board.whiteboard_seq).group_by(WhiteboardOp.board_id).all()
+        with self._lock:
+            for board_id, count in rows:
+                self._pending.setdefault(board_id, [count, time.monotonic()])
+
+    def _run(self):
+        with self.app.app_context():
+            try:
+                self._seed_pending()
+            except Exception as e:
+                self.app.logger.warning(f"Could not read pending whiteboard ops: {e}")
+                db.session.rollback()
+
+        last_eviction = time.monotonic()
+        while True:
+            socketio.sleep(min(1.0, self.compact_interval))
+            due = self.due_boards()
+            evict = time.monotonic() - last_eviction >= self.compact_interval
+            if not due and not evict:
+                continue
+            with self.app.app_context():
+                for board_id in due:
+                    try:
+                        self.compact(board_id)
+                    except Exception as e:
+                        db.session.rollback()
+                        self.app.logger.error(f"Whiteboard compaction failed for board {board_id}: {e}")
+                if evict:
+                    last_eviction = time.monotonic()
+                    try:
+                        self.evict_idle()
+                    except Exception as e:
+                        db.session.rollback()
+                        self.app.logger.error(f"Whiteboard document eviction failed: {e}")
+                db.session.remove()
+
+
+store = WhiteboardStore()
@@ -0,0 +1,233 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from extensions import db
+from models import Board, WhiteboardOp
+from whiteboard_index import SpatialIndex
+
+# Delta protocol for the whiteboard socket layer.
+#
+# Clients send `whiteboard_update` with a list of object-level ops:
+#   {"op": "add",    "id": "<object id>", "object": {...fabric object...}}
+#   {"op": "modify", "id": "<object id>", "object": {...changed props...}}
+#   {"op": "remove", "id": "<object id>"}
+# Every accepted batch bumps the board's sequence number by one and is relayed
+# to the room in a `whiteboard_ops` frame covering seqs from_seq..seq (see
+# whiteboard_fanout). The full canvas (`whiteboard_state`) is only sent on join
+# and when a client asks for a resync after spotting a gap. Clients that pass a
+# `bbox` there get just the objects in that region (see WhiteboardDocument.region).
+
+OP_TYPES = ('add', 'modify', 'remove')
+MAX_OPS_PER_MESSAGE = 500
+MAX_OBJECT_ID_LENGTH = 64
+
+
+class OpValidationError(ValueError):
+    pass
+
+
+def validate_ops(ops):
+    if not isinstance(ops, list) or not ops:
+        raise OpValidationError("ops must be a non-empty list")
+    if len(ops) > MAX_OPS_PER_MESSAGE:
+        raise OpValidationError(f"At most {MAX_OPS_PER_MESSAGE} ops per message")
+
+    cleaned = []
+    for op in ops:
+        if not isinstance(op, dict):
+            raise OpValidationError("Each op must be an object")
+        kind = op.get('op')
+        object_id = op.get('id')
+        if kind not in OP_TYPES:
+            raise OpValidationError(f"Unknown op type: {kind!r}")
+        if not isinstance(object_id, str) or not object_id or len(object_id) > MAX_OBJECT_ID_LENGTH:
+            raise OpValidationError("Each op needs a string id")
+
+        if kind == 'remove':
+            cleaned.append({'op': kind, 'id': object_id})
+            continue
+
+        obj = op.get('object')
+        if not isinstance(obj, dict):
+            raise OpValidationError(f"'{kind}' op requires an object")
+        cleaned.append({'op': kind, 'id': object_id, 'object': obj})
+    return cleaned
+
+
+class WhiteboardDocument:
+    """In-memory canvas for one board: objects keyed by id, in z-order."""
+
+    def __init__(self, board_id, state=None, seq=0):
+        self.board_id = board_id
+        self.seq = seq
+        self.updated_at = None
+        self.last_used = time.monotonic()  # last registry get(), for idle eviction
+        self.lock = threading.Lock()
+        self.objects = OrderedDict()
+        self.extra = {}
+        self.index = None
+        self._load(state)
+
+    def _load(self, state):
+        self.objects.clear()
+        self.extra = {}
+        self.index = None
+        if isinstance(state, str):
+            try:
+                state = json.loads(state) if state else None
+            except ValueError:
+                state = None
+        if not isinstance(state, dict):
+            return
+
+        self.extra = {k: v for k, v in state.items() if k != 'objects'}
+        for index, obj in enumerate(state.get('objects') or []):
+            if not isinstance(obj, dict):
+                continue
+            # Canvases saved before the delta protocol have no object ids
+            object_id = obj.get('id') or f"legacy-{index}"
+            self.objects[object_id] = dict(obj, id=object_id)
+
+    def apply(self, ops):
+        with self.lock:
+            for op in ops:
+                object_id = op['id']
+                if op['op'] == 'add':
+                    self.objects[object_id] = dict(op['object'], id=object_id)
+                elif op['op'] == 'modify':
+                    current = self.objects.get(object_id)
+                    if current is None:
+                        self.objects[object_id] = dict(op['object'], id=object_id)
+                    else:
+                        current.update(op['object'])
+                        current['id'] = object_id
+                else:
+                    self.objects.pop(object_id, None)
+                if self.index is not None:
+                    if object_id in self.objects:
+                        self.index.insert(object_id, self.objects[object_id])
+                    else:
+                        self.index.remove(object_id)
+            self.seq += 1
+            self.updated_at = datetime.utcnow()
+            return self.seq
+
+    def replace(self, state):
+        with self.lock:
+            self._load(state)
+            self.seq += 1
+            self.updated_at = datetime.utcnow()
+            return self.seq
+
+    def snapshot(self):
+        with self.lock:
+            state = dict(self.extra)
+            state['objects'] = list(self.objects.values())
+            return {'board_id': self.board_id, 'seq': self.seq, 'state': state}
+
+    def _spatial_index(self):
+        # Built on the first region query, then kept up to date by apply();
+        # boards nobody loads by viewport never pay for it
+        if self.index is None:
+            self.index = SpatialIndex()
+            for object_id, obj in self.objects.items():
+                self.index.insert(object_id, obj)
+        return self.index
+
+    def region(self, bbox=None, tiles=False):
+        """Like snapshot(), with only the objects whose bounds meet bbox."""
+        with self.lock:
+            index = self._spatial_index()
+            state = dict(self.extra)
+            if bbox is None:
+                state['objects'] = list(self.objects.values())
+            else:
+                state['objects'] = [self.objects[object_id] for object_id in index.query(bbox)]
+            region = {
+                'board_id': self.board_id,
+                'seq': self.seq,
+                'state': state,
+                'bbox': list(bbox) if bbox is not None else None,
+                'total': len(self.objects)
+            }
+            if tiles:
+                region['tile_size'] = index.tile_size
+                region['bounds'] = index.bounds()
+                region['tiles'] = index.tiles()
+            return region
+
+
+class DocumentRegistry:
+    def __init__(self):
+        self._documents = {}
+        self._lock = threading.Lock()
+
+    def get(self, board_id, refresh=False, touch=True):
+        """The board's document, loaded on first use.
+
+        refresh=True first applies ops other processes have logged since, for
+        REST reads that may not be routed to the worker that owns the board.
+        touch=False (the compactor) doesn't count as a use for idle eviction.
+        """
+        board_id = int(board_id)
+        document = self._documents.get(board_id)
+        if document is not None:
+            if touch:
+                document.last_used = time.monotonic()
+            if refresh:
+                self._catch_up(document)
+            return document
+
+        board = db.session.get(Board, board_id)
+        if board is None:
+            return None
+        # Latest snapshot plus the tail of ops logged since it was taken
+        document = WhiteboardDocument(board_id, board.whiteboard_data, seq=board.whiteboard_seq or 0)
+        if not touch:
+            document.last_used = 0.0
+        self._catch_up(document)
+
+        with self._lock:
+            # Another handler may have loaded it while we were querying
+            return self._documents.setdefault(board_id, document)
+
+    def _catch_up(self, document):
+        tail = WhiteboardOp.query.filter(
+            WhiteboardOp.board_id == document.board_id,
+            WhiteboardOp.seq > document.seq
+        ).order_by(WhiteboardOp.seq).all()
+        for entry in tail:
+            # Skip anything applied locally while the query ran
+            if entry.seq <= document.seq:
+                continue
+            if entry.kind == 'replace':
+                document.replace(entry.payload)
+            else:
+                document.apply(json.loads(entry.payload))
+            document.seq = entry.seq
+            document.updated_at = entry.created_at
+
+    def discard(self, board_id):
+        with self._lock:
+            self._documents.pop(int(board_id), None)
+
+    def idle(self, before):
+        # (board_id, document) for documents nobody has fetched since `before` (monotonic)
+        with self._lock:
+            return [(board_id, document) for board_id, document in self._documents.items()
+                    if document.last_used < before]
+
+    def evict(self, board_id, before):
+        # Unless it was fetched again in the meantime; the next get() reloads it from the database
+        with self._lock:
+            document = self._documents.get(board_id)
+            if document is not None and document.last_used < before:
+                del self._documents[board_id]
+                return True
+        return False
+
+
+documents = DocumentRegistry()